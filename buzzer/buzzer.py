@@ -19,7 +19,7 @@ import sys
 from time import sleep
 
 # threads
-from threading import Thread, Timer, BoundedSemaphore, RLock, Condition
+from threading import Thread, Timer, Condition
 
 # get open sprinkler signals
 from blinker import signal
@@ -29,6 +29,13 @@ import traceback
 
 # to determine how much time as elapsed (for timeout purposes)
 import time
+try:
+    from time import monotonic
+except ImportError:
+    from time import time as monotonic
+
+# compiled buzz patterns
+from collections import namedtuple
 
 # Load the Raspberry Pi GPIO (General Purpose Input Output) library
 try:
@@ -46,6 +53,11 @@ BUZZER_PIN = 32
 # True if buzzer sounds when pin is HIGH; False if buzzer sounds when pin is LOW
 BUZZER_ACTIVE_HIGH = True
 
+# Buzzer types
+BUZZER_TYPE_ACTIVE = u"active"  # Sounds on its own when powered; the pin is switched on and off
+BUZZER_TYPE_PASSIVE = u"passive"  # Piezo which needs a tone; the pin is driven with PWM
+BUZZER_TYPES = [BUZZER_TYPE_ACTIVE, BUZZER_TYPE_PASSIVE]
+
 # Add new URLs to access classes in this plugin.
 urls.extend(
     [
@@ -57,10 +69,277 @@ urls.extend(
 # Add this plugin to the PLUGINS menu ['Menu Name', 'URL'], (Optional)
 gv.plugin_menu.append([u"Buzzer Plugin", u"/buzzer-sp"])
 
+# Buzz priorities; a buzz preempts a playing pattern of lower priority and is queued otherwise
+BUZZ_PRIORITY_LOW = 0  # e.g. key clicks; first to be dropped when the queue backs up
+BUZZ_PRIORITY_NORMAL = 1  # e.g. acknowledgements
+BUZZ_PRIORITY_HIGH = 2  # e.g. errors
+BUZZ_PRIORITY_ALARM = 3  # alarms
+
+# A queued buzz request; sequence orders requests of equal priority
+BuzzRequest = namedtuple("BuzzRequest", ["priority", "sequence", "pattern"])
+
+# A compiled buzz pattern
+#   name - Name the pattern is registered under (None if not registered)
+#   edges - Tuple of (offset in seconds from the start of the pattern, level) where level is False
+#           for off, True for on, or a tone frequency in Hz
+#   duration - Total length of the pattern in seconds, including any trailing off time
+BuzzPattern = namedtuple("BuzzPattern", ["name", "edges", "duration"])
+
+def compile_pattern(time_list, name=None):
+    """
+    Compiles a beep list into a BuzzPattern
+    Inputs: time_list - Time values in seconds in the format [on time, off time, on time, ...]
+                        Any entry may instead be a (frequency, duration) pair which plays a tone
+                        of the given frequency in Hz (0 for silence); plain time values alternate
+                        between on and off, ignoring the pairs
+            name - Name of the pattern
+    Returns: The compiled BuzzPattern
+    """
+    edges = []
+    offset = 0.0
+    buzz_on = True
+    for v in time_list:
+        if isinstance(v, (list, tuple)):
+            frequency, duration = v
+            level = int(frequency) if frequency > 0 else False
+        else:
+            duration = v
+            level = buzz_on
+            buzz_on = not buzz_on
+        duration = float(duration)
+        if duration > 0:
+            # Only changes are kept; zero-length steps and leading off time are dropped
+            if (level and not edges) or (edges and edges[-1][1] != level):
+                edges.append((offset, level))
+            offset += duration
+    return BuzzPattern(name, tuple(edges), offset)
+
+class BuzzPlayer:
+    """
+    Drives the buzzer pin. Patterns are timed in software: the buzzer thread waits for each edge of
+    the pattern against a monotonic deadline and calls set_output.
+    """
+    def __init__(self, pin, active_high):
+        """
+        Inputs: pin - The board pin the buzzer is connected to
+                active_high - True if buzzer sounds when pin is HIGH; False if LOW
+        """
+        self.pin = pin
+        self.active_high = active_high
+
+    def init(self):
+        """
+        Initializes the buzzer pin and turns the buzzer off
+        """
+        if gv.use_pigpio:
+            pi.set_mode(gv.pin_map[self.pin], pigpio.OUTPUT)
+        else:
+            GPIO.setmode(GPIO.BOARD)
+            GPIO.setup(self.pin, GPIO.OUT)
+        self.set_output(False)
+
+    def set_output(self, is_on):
+        """
+        Sets the state of the buzzer pin to ON or OFF
+        Inputs: is_on - A pattern level; any tone frequency is ON
+        """
+        pin_value = self.active_high if is_on else not self.active_high
+        if gv.use_pigpio:
+            pi.write(gv.pin_map[self.pin], pin_value)
+        else:
+            GPIO.output(self.pin, pin_value)
+
+    def start(self, pattern):
+        """
+        Starts playing a pattern
+        Returns: The edges of the pattern which must still be driven by the buzzer thread
+        """
+        return pattern.edges
+
+    def stop(self):
+        """
+        Stops playback and turns the buzzer off
+        """
+        self.set_output(False)
+
+    def close(self):
+        """
+        Stops playback and releases the pin so that another player may take it over
+        """
+        self.stop()
+
+class WaveBuzzPlayer(BuzzPlayer):
+    """
+    Plays patterns as pigpio waveforms. The pin is then toggled by DMA with microsecond timing,
+    no matter how busy the Python process is.
+    """
+    # Waveforms kept on the pigpio daemon before they are deleted
+    MAX_CACHED_WAVES = 16
+
+    def __init__(self, pin, active_high):
+        BuzzPlayer.__init__(self, pin, active_high)
+        # Wave IDs by pattern
+        self._waves = {}
+
+    def _create_wave(self, pattern):
+        """
+        Creates the waveform for a pattern on the pigpio daemon
+        Returns: The wave ID
+        """
+        mask = 1 << gv.pin_map[self.pin]
+        pulses = []
+        # Patterns which start with an off time begin with the buzzer off for that long
+        start_us = int(round(pattern.edges[0][0] * 1000000))
+        if start_us > 0:
+            if self.active_high:
+                pulses.append(pigpio.pulse(0, mask, start_us))
+            else:
+                pulses.append(pigpio.pulse(mask, 0, start_us))
+        for i, (offset, is_on) in enumerate(pattern.edges):
+            if i + 1 < len(pattern.edges):
+                end = pattern.edges[i + 1][0]
+            else:
+                end = pattern.duration
+            delay_us = int(round((end - offset) * 1000000))
+            if bool(is_on) == self.active_high:
+                pulses.append(pigpio.pulse(mask, 0, delay_us))
+            else:
+                pulses.append(pigpio.pulse(0, mask, delay_us))
+        # Always end with the buzzer off
+        if self.active_high:
+            pulses.append(pigpio.pulse(0, mask, 0))
+        else:
+            pulses.append(pigpio.pulse(mask, 0, 0))
+        pi.wave_add_new()
+        pi.wave_add_generic(pulses)
+        return pi.wave_create()
+
+    def _delete_waves(self):
+        for wave_id in self._waves.values():
+            try:
+                pi.wave_delete(wave_id)
+            except Exception:
+                pass
+        self._waves = {}
+
+    def init(self):
+        BuzzPlayer.init(self)
+        self._delete_waves()
+
+    def start(self, pattern):
+        if not pattern.edges:
+            return ()
+        try:
+            wave_id = self._waves.get(pattern)
+            if wave_id is None:
+                if len(self._waves) >= WaveBuzzPlayer.MAX_CACHED_WAVES:
+                    self._delete_waves()
+                wave_id = self._create_wave(pattern)
+                self._waves[pattern] = wave_id
+            pi.wave_send_once(wave_id)
+            return ()
+        except Exception as e:
+            print(u"Buzzer plugin: waveform failed; timing pattern in software:\n{}".format(e))
+            return pattern.edges
+
+    def stop(self):
+        try:
+            # Leave alone any wave which another user of the pigpio daemon is sending
+            if pi.wave_tx_at() in self._waves.values():
+                pi.wave_tx_stop()
+        finally:
+            BuzzPlayer.stop(self)
+
+class PwmBuzzPlayer(BuzzPlayer):
+    """
+    Plays tones on a passive buzzer with PWM. The tone is generated by hardware PWM (pigpio) or by
+    the RPi.GPIO PWM thread; only the changes between tones are timed by the buzzer thread.
+    """
+    # Broadcom pins with hardware PWM; pigpio DMA-timed PWM is used on other pins
+    HARDWARE_PWM_PINS = [12, 13, 18, 19]
+    # 50% duty cycle
+    HARDWARE_PWM_DUTY = 500000
+    PWM_DUTY_PERCENT = 50
+
+    def __init__(self, pin, active_high, frequency):
+        """
+        Inputs: pin - The board pin the buzzer is connected to
+                active_high - True if the pin idles LOW; False if it idles HIGH
+                frequency - Tone frequency in Hz for plain (non-tone) pattern steps
+        """
+        BuzzPlayer.__init__(self, pin, active_high)
+        self.frequency = frequency
+        # RPi.GPIO PWM object and its current frequency (0 when stopped)
+        self._pwm = None
+        self._tone = 0
+        # Frequencies already compared with what pigpio actually plays
+        self._checked_frequencies = set()
+
+    def init(self):
+        BuzzPlayer.init(self)
+        if not gv.use_pigpio and self._pwm is None:
+            self._pwm = GPIO.PWM(self.pin, self.frequency)
+
+    def set_output(self, is_on):
+        """
+        Plays a tone or silences the buzzer
+        Inputs: is_on - A pattern level: False for off, True for the default tone, or a frequency
+        """
+        if not is_on:
+            self.stop()
+            return
+        frequency = self.frequency if is_on is True else int(is_on)
+        if gv.use_pigpio:
+            bcm_pin = gv.pin_map[self.pin]
+            if bcm_pin in PwmBuzzPlayer.HARDWARE_PWM_PINS:
+                pi.hardware_PWM(bcm_pin, frequency, PwmBuzzPlayer.HARDWARE_PWM_DUTY)
+            else:
+                pi.set_PWM_frequency(bcm_pin, frequency)
+                pi.set_PWM_dutycycle(bcm_pin, 128)
+                if frequency not in self._checked_frequencies:
+                    self._checked_frequencies.add(frequency)
+                    # Without hardware PWM, pigpio picks the nearest of a few fixed frequencies
+                    actual = pi.get_PWM_frequency(bcm_pin)
+                    if actual != frequency:
+                        print(u"Buzzer plugin: Tone of {} Hz played at {} Hz; use a hardware PWM "
+                              u"pin for exact tones".format(frequency, actual))
+        else:
+            self._pwm.ChangeFrequency(frequency)
+            if not self._tone:
+                self._pwm.start(PwmBuzzPlayer.PWM_DUTY_PERCENT)
+        self._tone = frequency
+
+    def stop(self):
+        try:
+            if gv.use_pigpio:
+                bcm_pin = gv.pin_map[self.pin]
+                if bcm_pin in PwmBuzzPlayer.HARDWARE_PWM_PINS:
+                    pi.hardware_PWM(bcm_pin, 0, 0)
+                else:
+                    pi.set_PWM_dutycycle(bcm_pin, 0)
+            elif self._tone:
+                self._pwm.stop()
+        finally:
+            self._tone = 0
+            # Leave the pin at its idle level
+            BuzzPlayer.set_output(self, False)
+
+    def close(self):
+        try:
+            self.stop()
+        finally:
+            # RPi.GPIO only allows one PWM object per pin; it is freed once no longer referenced
+            self._pwm = None
+
 class Buzzer(Thread):
     """
     This class handles the buzzer hardware
     """
+    # Beep lists compiled on the fly are cached up to this many patterns
+    MAX_COMPILED_PATTERNS = 64
+    # Buzz requests waiting behind the playing pattern
+    MAX_QUEUED_BUZZES = 4
+
     def __init__(self, pin, active_high):
         """
         Initializes a Buzzer object
@@ -73,15 +352,27 @@ class Buzzer(Thread):
         self.pin = pin
         # True if buzzer sounds when pin is HIGH; False if buzzer sounds when pin is LOW
         self.active_high = active_high
+        # Registered patterns by name
+        self._patterns = {}
+        # Patterns compiled from beep lists by tuple of times
+        self._compiled_patterns = {}
         # Set all default settings
         self._set_default_settings()
-        # Used in buzz thread
-        self._current_buzz_list = []
-        self._buzz_sem = BoundedSemaphore(1)
-        self._buzz_sem.acquire()
-        self._buzz_cancel = False
-        self._buzz_data_lock = RLock()
+        # Plays patterns on the buzzer pin; a pending player is swapped in by the buzzer thread
+        self._player_config = (self.buzzer_type, self.tone_frequency)
+        self._player = self._create_player()
+        self._pending_player = None
+        # Used in buzz thread; guarded by the condition
+        self._buzz_queue = []
+        self._buzz_sequence = 0
+        self._playing = None  # BuzzRequest being played
+        self._preempt = False  # Set to stop the playing pattern
         self._buzz_condition = Condition()
+        # Statistics
+        self._played_count = 0
+        self._merged_count = 0
+        self._dropped_count = 0
+        self._preempted_count = 0
         # Running flag just to ensure that we stop buzzing when shutting down
         self._running = True
 
@@ -89,14 +380,95 @@ class Buzzer(Thread):
         """
         Sets the json settings to their defaults
         """
+        self.buzzer_type = BUZZER_TYPE_ACTIVE
+        self.tone_frequency = 2000  # Hz; used for plain beeps on a passive buzzer
         self.startup_beep = [0.050, 0.050, 0.050, 0.050, 0.050, 0.050, 0.100]
+        self.register_pattern(u"startup", self.startup_beep)
+        # Sounded when an alarm is signaled (empty to disable)
+        self.alarm_beep = []
+        self.register_pattern(u"alarm", self.alarm_beep)
+
+    def _create_player(self):
+        """
+        Returns a new player for the current buzzer type
+        """
+        if self.buzzer_type == BUZZER_TYPE_PASSIVE:
+            return PwmBuzzPlayer(self.pin, self.active_high, self.tone_frequency)
+        elif gv.use_pigpio:
+            return WaveBuzzPlayer(self.pin, self.active_high)
+        return BuzzPlayer(self.pin, self.active_high)
+
+    def _apply_player_settings(self):
+        """
+        Switches to a new player if the buzzer type or tone changed
+        """
+        config = (self.buzzer_type, self.tone_frequency)
+        if config != self._player_config:
+            type_changed = config[0] != self._player_config[0]
+            self._player_config = config
+            self._buzz_condition.acquire()
+            try:
+                player = self._pending_player or self._player
+                if not type_changed and isinstance(player, PwmBuzzPlayer):
+                    # Only the tone changed; it is used from the next tone played
+                    player.frequency = self.tone_frequency
+                    return
+                self._pending_player = self._create_player()
+                self._preempt = self._playing is not None
+                self._buzz_condition.notify_all()
+            finally:
+                self._buzz_condition.release()
+
+    def register_pattern(self, name, time_list):
+        """
+        Compiles a beep list and registers it under a name which may then be passed to buzz()
+        Inputs: name - Name of the pattern
+                time_list - Time values in seconds in the format [on time, off time, on time, ...]
+        Returns: The compiled BuzzPattern
+        """
+        pattern = compile_pattern(time_list, name)
+        self._patterns[name] = pattern
+        return pattern
+
+    def get_pattern(self, time):
+        """
+        Returns the compiled pattern for a buzz request
+        Inputs: time - A BuzzPattern, the name of a registered pattern, an on time in seconds, or a
+                       list of time values in seconds in the format [on time, off time, on time, ...]
+        Returns: The BuzzPattern or None if invalid
+        """
+        if isinstance(time, BuzzPattern):
+            return time
+        if isinstance(time, (type(u""), str)):
+            return self._patterns.get(time)
+        if isinstance(time, (list, tuple)):
+            key = tuple(tuple(v) if isinstance(v, list) else v for v in time)
+        else:
+            key = (time,)
+        pattern = self._compiled_patterns.get(key)
+        if pattern is None:
+            try:
+                pattern = compile_pattern(key)
+            except (TypeError, ValueError):
+                print(u"Buzzer plugin: invalid beep list: {}".format(time))
+                return None
+            if len(self._compiled_patterns) >= Buzzer.MAX_COMPILED_PATTERNS:
+                self._compiled_patterns = {}
+            self._compiled_patterns[key] = pattern
+        return pattern
 
     @staticmethod
     def _beep_list_to_string(l):
         """
-        Returns the string representation of the given beep list
+        Returns the string representation of the given beep list; tones are written as Hz:ms
         """
-        return ", ".join(str(e * 1000) for e in l)
+        str_list = []
+        for e in l:
+            if isinstance(e, (list, tuple)):
+                str_list.append(u"{}:{}".format(e[0], int(round(e[1] * 1000))))
+            else:
+                str_list.append(str(int(round(e * 1000))))
+        return ", ".join(str_list)
 
     @staticmethod
     def _string_to_beep_list(s):
@@ -108,7 +480,8 @@ class Buzzer(Thread):
         total_time = 0
         for x in str_list:
             try:
-                value = int(x) / 1000.0
+                tone = x.split(":")
+                value = int(tone[-1]) / 1000.0
                 # single value cannot be more than 5 seconds
                 if value > 5:
                     value = 5
@@ -116,7 +489,10 @@ class Buzzer(Thread):
                 total_time += value
                 if total_time > 10:
                     break
-                beep_list.append(value)
+                if len(tone) == 2:
+                    beep_list.append((int(tone[0]), value))
+                else:
+                    beep_list.append(value)
             except ValueError:
                 # do nothing
                 pass
@@ -128,9 +504,22 @@ class Buzzer(Thread):
         """
         self._set_default_settings()
         if settings is None:
+            self._apply_player_settings()
             return
+        if settings.get(u"buzzer_type") in BUZZER_TYPES:
+            self.buzzer_type = settings[u"buzzer_type"]
+        if u"tone_frequency" in settings:
+            try:
+                self.tone_frequency = max(int(settings[u"tone_frequency"]), 1)
+            except ValueError:
+                print(u"Buzzer plugin: Invalid tone frequency")
         if u"startup_beep" in settings:
             self.startup_beep = Buzzer._string_to_beep_list(settings["startup_beep"])
+            self.register_pattern(u"startup", self.startup_beep)
+        if u"alarm_beep" in settings:
+            self.alarm_beep = Buzzer._string_to_beep_list(settings["alarm_beep"])
+            self.register_pattern(u"alarm", self.alarm_beep)
+        self._apply_player_settings()
         return
 
     def _load_settings(self):
@@ -143,13 +532,17 @@ class Buzzer(Thread):
                 self.load_from_dict(json.load(f))
         except:
             self._set_default_settings()
+            self._apply_player_settings()
         return
 
     def save_settings(self):
         """
         Saves these settings to the json file for this plugin
         """
-        settings = {u"startup_beep": Buzzer._beep_list_to_string(self.startup_beep)}
+        settings = {u"buzzer_type": self.buzzer_type,
+                    u"tone_frequency": str(self.tone_frequency),
+                    u"startup_beep": Buzzer._beep_list_to_string(self.startup_beep),
+                    u"alarm_beep": Buzzer._beep_list_to_string(self.alarm_beep)}
         with open(u"./data/buzzer.json", u"w") as f:
             json.dump(settings, f)  # save to file
         return
@@ -166,14 +559,22 @@ class Buzzer(Thread):
         """
         try:
             if self.pin >= 0:
-                # Initialize buzzer pin
-                if gv.use_pigpio:
-                    pi.set_mode(gv.pin_map[self.pin], pigpio.OUTPUT)
-                else:
-                    GPIO.setmode(GPIO.BOARD)
-                    GPIO.setup(self.pin, GPIO.OUT)
-                # Output OFF
-                self._set_buzzer_pin(False)
+                # Swap in a new player if the buzzer type changed
+                self._buzz_condition.acquire()
+                try:
+                    if self._pending_player is not None:
+                        old_player = self._player
+                        self._player = self._pending_player
+                        self._pending_player = None
+                        try:
+                            old_player.close()
+                        except Exception:
+                            pass
+                        del old_player
+                finally:
+                    self._buzz_condition.release()
+                # Initialize buzzer pin with output OFF
+                self._player.init()
                 # Done!
                 self.pin_initialized = True
             else:
@@ -191,69 +592,125 @@ class Buzzer(Thread):
         """
         if self._running or force:
             try:
-                pin_value = self.active_high if is_on else not self.active_high
-                if gv.use_pigpio:
-                    pi.write(gv.pin_map[self.pin], pin_value)
+                if is_on:
+                    self._player.set_output(True)
                 else:
-                    GPIO.output(self.pin, pin_value)
+                    self._player.stop()
             except Exception as e:
                 self.pin_initialized = False
                 print(u"Buzzer plugin: set failed:\n{}".format(e))
                 return False
+        return True
 
-    def _execute_buzz(self, time_list):
-        """
-        Execute buzzer sequence (blocking)
-        Inputs: time_list - Time values in seconds in the format [on time, off time, on time, ...]
-        """
-        # First value is buzzer on
-        buzz_on = True
-        # Loop through each time in list
-        for v in time_list:
-            if not self._running or self._buzz_cancel:
-                break
-            # If this value is on time, turn on the buzzer
-            if buzz_on and v > 0:
-                self._set_buzzer_pin(True)
-            # Suspend for the given time
-            if v > 0:
-                self._buzz_condition.acquire()
-                self._buzz_condition.wait(v)
-                self._buzz_condition.release()
-            # Always shut off buzzer before next iteration
-            self._set_buzzer_pin(False)
-            # Invert
-            buzz_on = not buzz_on
+    def _wait_until(self, deadline):
+        """
+        Waits until the given monotonic time unless preempted
+        Returns: True if the deadline was reached; False if preempted by another buzz or stopped
+        """
+        self._buzz_condition.acquire()
+        try:
+            while self._running and not self._preempt:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    return True
+                self._buzz_condition.wait(remaining)
+            return False
+        finally:
+            self._buzz_condition.release()
 
-    def buzz(self, time=0.010):
+    def _execute_buzz(self, pattern):
+        """
+        Plays a pattern until it ends or another buzz preempts it (blocking)
+        Inputs: pattern - The BuzzPattern to play
+        """
+        start_time = monotonic()
+        try:
+            # Each edge is timed from the start of the pattern so waits don't accumulate error
+            for offset, is_on in self._player.start(pattern):
+                if not self._wait_until(start_time + offset):
+                    break
+                self._player.set_output(is_on)
+            else:
+                self._wait_until(start_time + pattern.duration)
+        except Exception as e:
+            self.pin_initialized = False
+            print(u"Buzzer plugin: buzz failed:\n{}".format(e))
+        # Always shut off buzzer when done
+        self._set_buzzer_pin(False)
+
+    def buzz(self, time=0.010, priority=BUZZ_PRIORITY_NORMAL):
         """
         Activate the buzzer for the given time (non-blocking)
         Inputs: time - Time value(s) in seconds
                 If single value, on time for buzzer
                 If array, time values in the format [on time, off time, on time, ...]
+                If string, name of a registered pattern
+                If BuzzPattern, the compiled pattern
+                priority - BUZZ_PRIORITY_* value; a buzz preempts a playing pattern of lower
+                           priority and is queued behind one of the same or higher priority
         Returns: True always
         """
         if self.pin >= 0 and self.pin_initialized and time is not None:
-            # Generate the list of times
-            if isinstance(time, list):
-                time_list = time
-            else:
-                time_list = [time]
-            self._buzz_data_lock.acquire()
-            # Spin off an execute thread so this call is non-blocking
-            self._current_buzz_list = time_list
-            self._buzz_cancel = True # To cancel current buzz
-            self._buzz_condition.acquire()
-            self._buzz_condition.notify_all()
-            self._buzz_condition.release()
-            self._buzz_data_lock.release()
-            try:
-                self._buzz_sem.release()
-            except ValueError:
-                # This is fine; something else already released it
-                pass
+            pattern = self.get_pattern(time)
+            if pattern is not None and pattern.edges:
+                self._buzz_condition.acquire()
+                try:
+                    self._queue_buzz(pattern, priority)
+                    self._buzz_condition.notify_all()
+                finally:
+                    self._buzz_condition.release()
         return True
 
+    def _queue_buzz(self, pattern, priority):
+        """
+        Adds a buzz request to the queue; must be called with the buzz condition acquired
+        """
+        if self._playing is not None and priority > self._playing.priority and not self._preempt:
+            self._preempt = True
+            self._preempted_count += 1
+        for i, request in enumerate(self._buzz_queue):
+            if request.pattern == pattern:
+                # Identical pattern already waiting; it is played once at the higher priority
+                if priority > request.priority:
+                    self._buzz_queue[i] = request._replace(priority=priority)
+                self._merged_count += 1
+                return
+        self._buzz_sequence += 1
+        new_request = BuzzRequest(priority, self._buzz_sequence, pattern)
+        if len(self._buzz_queue) >= Buzzer.MAX_QUEUED_BUZZES:
+            # Queue backed up; drop the newest request of the lowest priority
+            lowest = min(self._buzz_queue, key=lambda r: (r.priority, -r.sequence))
+            self._dropped_count += 1
+            if lowest.priority >= priority:
+                return
+            self._buzz_queue.remove(lowest)
+        self._buzz_queue.append(new_request)
+
+    def _next_buzz(self):
+        """
+        Removes and returns the highest priority (then oldest) request from the queue; must be
+        called with the buzz condition acquired
+        """
+        request = max(self._buzz_queue, key=lambda r: (r.priority, -r.sequence))
+        self._buzz_queue.remove(request)
+        return request
+
+    def get_statistics(self):
+        """
+        Returns a dictionary of buzz request counts
+        """
+        self._buzz_condition.acquire()
+        try:
+            return {
+                u"played": self._played_count,
+                u"merged": self._merged_count,
+                u"dropped": self._dropped_count,
+                u"preempted": self._preempted_count,
+                u"queued": len(self._buzz_queue)
+            }
+        finally:
+            self._buzz_condition.release()
+
     def _wait_for_ready(self):
         """
         Waits up to 15 seconds for hardware to be ready
@@ -289,7 +746,7 @@ class Buzzer(Thread):
         # Wait for hardware init
         self._wait_for_ready()
         # Ring startup beep
-        self.buzz(self.startup_beep)
+        self.buzz(u"startup")
 
     def run(self):
         """
@@ -297,13 +754,30 @@ class Buzzer(Thread):
         """
         self._buzzer_init_task()
         while self._running:
-            self._buzz_sem.acquire()
-            self._buzz_data_lock.acquire()
-            buzz_list = self._current_buzz_list
-            self._buzz_cancel = False
-            self._buzz_data_lock.release()
-            if self._running:
-                self._execute_buzz(buzz_list)
+            self._buzz_condition.acquire()
+            try:
+                while self._running and not self._buzz_queue and self._pending_player is None:
+                    self._buzz_condition.wait()
+                if not self._running:
+                    break
+                if self._pending_player is None:
+                    request = self._next_buzz()
+                    self._playing = request
+                    self._preempt = False
+                    self._played_count += 1
+                else:
+                    request = None
+            finally:
+                self._buzz_condition.release()
+            if request is None:
+                # Buzzer type changed
+                if not self._init_pins():
+                    print(u"Buzzer plugin: Could not initialize buzzer for new settings")
+                continue
+            self._execute_buzz(request.pattern)
+            self._buzz_condition.acquire()
+            self._playing = None
+            self._buzz_condition.release()
 
     ### Restart ###
     # Restart signal needs to be handled in 1 second or less
@@ -312,11 +786,11 @@ class Buzzer(Thread):
         self._running = False
         self._set_buzzer_pin(is_on=False, force=True)
         # Release the thread
+        self._buzz_condition.acquire()
         try:
-            self._buzz_sem.release()
-        except ValueError:
-            # This is fine; something else already released it
-            pass
+            self._buzz_condition.notify_all()
+        finally:
+            self._buzz_condition.release()
 
 
 # Our main Buzzer object for this module
@@ -324,12 +798,19 @@ buzzer = Buzzer(BUZZER_PIN, BUZZER_ACTIVE_HIGH)
 
 # Setup buzzer signal notification
 def notify_buzzer_beep(time, **kw):
-    return buzzer.buzz(time)
+    return buzzer.buzz(time, kw.get(u"priority", BUZZ_PRIORITY_NORMAL))
 
 # Tell the notification system what to call on buzzer_beep
 buzzer_beep = signal(u"buzzer_beep")
 buzzer_beep.connect(notify_buzzer_beep)
 
+# Sound the alarm beep when another plugin (e.g. pump_control) raises an alarm
+def notify_alarm_toggled(name, **kw):
+    return buzzer.buzz(u"alarm", BUZZ_PRIORITY_ALARM)
+
+alarm_toggled = signal(u"alarm_toggled")
+alarm_toggled.connect(notify_alarm_toggled)
+
 # Attach to restart signal
 restart = signal("restart")
 restart.connect(buzzer.notify_restart)
@@ -354,7 +835,7 @@ class settings(ProtectedPage):
                 settings = json.load(f)
         except IOError:  # If file does not exist return empty value
             settings = {}  # Default settings. can be list, dictionary, etc.
-        return template_render.buzzer(settings)  # open settings page
+        return template_render.buzzer(settings, buzzer.get_statistics())  # open settings page
 
 
 class save_settings(ProtectedPage):
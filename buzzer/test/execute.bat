@@ -0,0 +1,4 @@
+REM Windows regression test execution file.
+REM pytest module is required for this (pip install pytest)
+REM To run, cd to the test directory, and then execute this file.
+python -B -m pytest -c test.cfg
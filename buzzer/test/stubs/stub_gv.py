@@ -0,0 +1,4 @@
+plugin_menu = []
+use_pigpio = False
+# Board pin to Broadcom GPIO number
+pin_map = {12: 18, 32: 12, 36: 16}
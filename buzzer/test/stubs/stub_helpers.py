@@ -0,0 +1 @@
+# The buzzer plugin doesn't use any helpers
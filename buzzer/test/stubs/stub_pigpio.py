@@ -0,0 +1,83 @@
+# Stand-in for the pigpio module which records pin levels and keeps track of waveforms
+from collections import namedtuple
+
+INPUT = 0
+OUTPUT = 1
+# Returned by wave_tx_at() when no wave is being sent
+NO_TX_WAVE = 9998
+WAVE_NOT_FOUND = 9999
+
+# Frequencies available without hardware PWM at the default sample rate of 5 us
+PWM_FREQUENCIES = [8000, 4000, 2000, 1600, 1000, 800, 500, 400, 320, 250, 200, 160, 100, 80, 50,
+                   40, 20, 10]
+
+pulse = namedtuple(u"pulse", [u"gpio_on", u"gpio_off", u"delay"])
+
+class pi:
+    def __init__(self, *args, **kwargs):
+        self.connected = True
+        # Levels written to each Broadcom pin, in order, as (pin, level)
+        self.writes = []
+        # Pulses of each wave by wave ID
+        self.waves = {}
+        self._next_wave_id = 0
+        self._pending_pulses = []
+        # Wave being sent (None when none)
+        self.tx_wave = None
+        self.tx_stop_count = 0
+        # PWM frequency and duty cycle of each Broadcom pin
+        self.pwm_frequencies = {}
+        self.pwm_duty_cycles = {}
+
+    def set_mode(self, gpio, mode):
+        pass
+
+    def write(self, gpio, level):
+        self.writes.append((gpio, bool(level)))
+
+    def wave_add_new(self):
+        self._pending_pulses = []
+
+    def wave_add_generic(self, pulses):
+        self._pending_pulses.extend(pulses)
+        return len(self._pending_pulses)
+
+    def wave_create(self):
+        wave_id = self._next_wave_id
+        self._next_wave_id += 1
+        self.waves[wave_id] = self._pending_pulses
+        self._pending_pulses = []
+        return wave_id
+
+    def wave_delete(self, wave_id):
+        del self.waves[wave_id]
+
+    def wave_send_once(self, wave_id):
+        if wave_id not in self.waves:
+            raise ValueError(u"bad wave id")
+        self.tx_wave = wave_id
+
+    def wave_tx_at(self):
+        if self.tx_wave is None:
+            return NO_TX_WAVE
+        return self.tx_wave
+
+    def wave_tx_stop(self):
+        self.tx_wave = None
+        self.tx_stop_count += 1
+
+    def hardware_PWM(self, gpio, frequency, duty_cycle):
+        self.pwm_frequencies[gpio] = frequency
+        self.pwm_duty_cycles[gpio] = duty_cycle
+
+    def set_PWM_frequency(self, gpio, frequency):
+        # The closest available frequency is used
+        actual = min(PWM_FREQUENCIES, key=lambda f: abs(f - frequency))
+        self.pwm_frequencies[gpio] = actual
+        return actual
+
+    def get_PWM_frequency(self, gpio):
+        return self.pwm_frequencies.get(gpio, 800)
+
+    def set_PWM_dutycycle(self, gpio, duty_cycle):
+        self.pwm_duty_cycles[gpio] = duty_cycle
@@ -0,0 +1,46 @@
+# Stand-in for RPi.GPIO which records the level written to each pin
+BOARD = 10
+OUT = 0
+IN = 1
+LOW = 0
+HIGH = 1
+
+# Levels written to each pin, in order, as (pin, level)
+writes = []
+# Open PWM objects by pin
+pwms = {}
+
+def reset():
+    del writes[:]
+    pwms.clear()
+
+def setmode(mode):
+    pass
+
+def setup(pin, direction, pull_up_down=None):
+    pass
+
+def output(pin, value):
+    writes.append((pin, bool(value)))
+
+class PWM:
+    def __init__(self, pin, frequency):
+        if pin in pwms:
+            raise RuntimeError(u"A PWM object already exists for this GPIO channel")
+        pwms[pin] = self
+        self.pin = pin
+        self.frequency = frequency
+        self.duty_cycle = None
+
+    def start(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+
+    def stop(self):
+        self.duty_cycle = None
+
+    def __del__(self):
+        if pwms.get(self.pin) is self:
+            del pwms[self.pin]
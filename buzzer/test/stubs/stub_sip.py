@@ -0,0 +1 @@
+template_render = None
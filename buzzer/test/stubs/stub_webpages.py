@@ -0,0 +1,2 @@
+class ProtectedPage:
+    pass
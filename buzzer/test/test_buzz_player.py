@@ -0,0 +1,106 @@
+import io
+import unittest
+from unittest.mock import patch
+# This will stub sip and pi-specific things out
+import buzzer_test_base
+# Now that things have been stubbed out, buzzer may be imported
+import gv
+import stub_pigpio
+import buzzer
+from buzzer import WaveBuzzPlayer, PwmBuzzPlayer, compile_pattern
+
+# Make sure the plugin thread stops right away
+buzzer.buzzer.notify_restart(u"test")
+buzzer.buzzer.join(1.0)
+
+# Board pin of the buzzer and its Broadcom pin
+BUZZER_PIN = 36
+BUZZER_BCM_PIN = 16
+# Board pin of a buzzer on a hardware PWM pin and its Broadcom pin
+PWM_BUZZER_PIN = 12
+PWM_BUZZER_BCM_PIN = 18
+
+class PigpioTestCase(unittest.TestCase):
+    def setUp(self):
+        self.pi = stub_pigpio.pi()
+        for patcher in [patch.object(gv, 'use_pigpio', True),
+                        patch('buzzer.pigpio', stub_pigpio, create=True),
+                        patch('buzzer.pi', self.pi, create=True)]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+class TestWaveBuzzPlayer(PigpioTestCase):
+    def setUp(self):
+        PigpioTestCase.setUp(self)
+        self.player = WaveBuzzPlayer(BUZZER_PIN, True)
+        self.player.init()
+
+    def test_start(self):
+        pattern = compile_pattern([0.1, 0.05, 0.1])
+        # The wave times the whole pattern, so nothing is left for the buzzer thread
+        self.assertEqual((), self.player.start(pattern))
+        self.assertEqual(0, self.pi.wave_tx_at())
+        mask = 1 << BUZZER_BCM_PIN
+        self.assertEqual([(mask, 0, 100000), (0, mask, 50000), (mask, 0, 100000), (0, mask, 0)],
+                         self.pi.waves[0])
+        # The wave is reused
+        self.player.start(pattern)
+        self.assertEqual([0], list(self.pi.waves.keys()))
+
+    def test_stop(self):
+        self.player.start(compile_pattern([0.1]))
+        self.player.stop()
+        self.assertEqual(1, self.pi.tx_stop_count)
+        self.assertEqual((BUZZER_BCM_PIN, False), self.pi.writes[-1])
+        # Nothing is being sent
+        self.player.stop()
+        self.assertEqual(1, self.pi.tx_stop_count)
+
+    def test_stop_other_wave(self):
+        self.player.start(compile_pattern([0.1]))
+        # Another user of the pigpio daemon sends its own wave
+        self.pi.wave_add_new()
+        self.pi.wave_add_generic([stub_pigpio.pulse(1, 0, 100)])
+        other_wave = self.pi.wave_create()
+        self.pi.wave_send_once(other_wave)
+        self.player.stop()
+        self.assertEqual(0, self.pi.tx_stop_count)
+        self.assertEqual(other_wave, self.pi.wave_tx_at())
+        self.assertEqual((BUZZER_BCM_PIN, False), self.pi.writes[-1])
+
+class TestPwmBuzzPlayer(PigpioTestCase):
+    def play(self, player, levels):
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            for level in levels:
+                player.set_output(level)
+        return stdout.getvalue()
+
+    def test_hardware_pwm(self):
+        player = PwmBuzzPlayer(PWM_BUZZER_PIN, True, 2700)
+        player.init()
+        self.assertEqual(u"", self.play(player, [True, 3100]))
+        self.assertEqual(3100, self.pi.pwm_frequencies[PWM_BUZZER_BCM_PIN])
+        self.assertEqual(PwmBuzzPlayer.HARDWARE_PWM_DUTY,
+                         self.pi.pwm_duty_cycles[PWM_BUZZER_BCM_PIN])
+        player.stop()
+        self.assertEqual(0, self.pi.pwm_duty_cycles[PWM_BUZZER_BCM_PIN])
+
+    def test_available_frequency(self):
+        player = PwmBuzzPlayer(BUZZER_PIN, True, 2000)
+        player.init()
+        self.assertEqual(u"", self.play(player, [True, 4000]))
+        self.assertEqual(4000, self.pi.pwm_frequencies[BUZZER_BCM_PIN])
+        self.assertEqual(128, self.pi.pwm_duty_cycles[BUZZER_BCM_PIN])
+
+    def test_unavailable_frequency(self):
+        player = PwmBuzzPlayer(BUZZER_PIN, True, 2700)
+        player.init()
+        output = self.play(player, [True])
+        self.assertIn(u"2700 Hz", output)
+        self.assertIn(u"2000 Hz", output)
+        # Each frequency is only reported once
+        self.assertEqual(u"", self.play(player, [False, True, 2700]))
+        self.assertIn(u"3000 Hz", self.play(player, [3000]))
+
+if __name__ == '__main__':
+    unittest.main()
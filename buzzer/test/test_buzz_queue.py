@@ -0,0 +1,114 @@
+import unittest
+from unittest.mock import Mock
+# This will stub sip and pi-specific things out
+import buzzer_test_base
+# Now that things have been stubbed out, buzzer may be imported
+import buzzer
+from buzzer import (Buzzer, BuzzRequest, compile_pattern, BUZZ_PRIORITY_LOW, BUZZ_PRIORITY_NORMAL,
+                    BUZZ_PRIORITY_HIGH, BUZZ_PRIORITY_ALARM)
+
+# Make sure the plugin thread stops right away
+buzzer.buzzer.notify_restart(u"test")
+buzzer.buzzer.join(1.0)
+
+class TestBuzzQueue(unittest.TestCase):
+    def setUp(self):
+        self.buzzer = Buzzer(32, True)
+
+    def queue(self, time_list, priority):
+        pattern = compile_pattern(time_list)
+        self.buzzer._buzz_condition.acquire()
+        try:
+            self.buzzer._queue_buzz(pattern, priority)
+        finally:
+            self.buzzer._buzz_condition.release()
+        return pattern
+
+    def queued(self):
+        return [(request.priority, request.pattern) for request in self.buzzer._buzz_queue]
+
+    def play(self, time_list, priority):
+        self.buzzer._playing = BuzzRequest(priority, 0, compile_pattern(time_list))
+
+    def test_higher_priority_preempts(self):
+        self.play([0.5], BUZZ_PRIORITY_NORMAL)
+        pattern = self.queue([0.1], BUZZ_PRIORITY_HIGH)
+        self.assertTrue(self.buzzer._preempt)
+        self.assertEqual([(BUZZ_PRIORITY_HIGH, pattern)], self.queued())
+        # A second preempting request doesn't count twice
+        self.queue([0.2], BUZZ_PRIORITY_ALARM)
+        self.assertEqual(1, self.buzzer.get_statistics()[u"preempted"])
+
+    def test_equal_priority_queued(self):
+        self.play([0.5], BUZZ_PRIORITY_NORMAL)
+        pattern = self.queue([0.1], BUZZ_PRIORITY_NORMAL)
+        self.assertFalse(self.buzzer._preempt)
+        self.assertEqual([(BUZZ_PRIORITY_NORMAL, pattern)], self.queued())
+        self.queue([0.2], BUZZ_PRIORITY_LOW)
+        self.assertFalse(self.buzzer._preempt)
+        self.assertEqual(0, self.buzzer.get_statistics()[u"preempted"])
+
+    def test_merge(self):
+        pattern = self.queue([0.1, 0.1, 0.1], BUZZ_PRIORITY_LOW)
+        self.queue([0.2], BUZZ_PRIORITY_LOW)
+        self.queue([0.1, 0.1, 0.1], BUZZ_PRIORITY_LOW)
+        self.assertEqual(2, len(self.queued()))
+        # The merged request is played once at the higher priority
+        self.queue([0.1, 0.1, 0.1], BUZZ_PRIORITY_HIGH)
+        self.assertEqual((BUZZ_PRIORITY_HIGH, pattern), self.queued()[0])
+        self.queue([0.1, 0.1, 0.1], BUZZ_PRIORITY_NORMAL)
+        self.assertEqual((BUZZ_PRIORITY_HIGH, pattern), self.queued()[0])
+        self.assertEqual(3, self.buzzer.get_statistics()[u"merged"])
+
+    def test_drop_newest_of_lowest_priority(self):
+        patterns = [self.queue([0.1 * (i + 1)], BUZZ_PRIORITY_LOW)
+                    for i in range(Buzzer.MAX_QUEUED_BUZZES)]
+        # The new request is the newest of the lowest priority, so it is dropped itself
+        self.queue([0.9], BUZZ_PRIORITY_LOW)
+        self.assertEqual([(BUZZ_PRIORITY_LOW, p) for p in patterns], self.queued())
+        # A higher priority request replaces the newest low priority request
+        pattern = self.queue([0.01], BUZZ_PRIORITY_NORMAL)
+        self.assertEqual([(BUZZ_PRIORITY_LOW, p) for p in patterns[:-1]] +
+                         [(BUZZ_PRIORITY_NORMAL, pattern)], self.queued())
+        self.assertEqual(2, self.buzzer.get_statistics()[u"dropped"])
+        self.assertEqual(Buzzer.MAX_QUEUED_BUZZES, self.buzzer.get_statistics()[u"queued"])
+
+    def test_next_buzz_order(self):
+        low = self.queue([0.1], BUZZ_PRIORITY_LOW)
+        normal_1 = self.queue([0.2], BUZZ_PRIORITY_NORMAL)
+        high = self.queue([0.3], BUZZ_PRIORITY_HIGH)
+        normal_2 = self.queue([0.4], BUZZ_PRIORITY_NORMAL)
+        order = []
+        while self.buzzer._buzz_queue:
+            order.append(self.buzzer._next_buzz().pattern)
+        self.assertEqual([high, normal_1, normal_2, low], order)
+
+class TestBuzzStatistics(unittest.TestCase):
+    def setUp(self):
+        self.buzzer = Buzzer(32, True)
+        self.addCleanup(self.buzzer.join, 1.0)
+        self.addCleanup(self.buzzer.notify_restart, u"test")
+
+    def test_statistics(self):
+        # Play nothing at startup, and hold the thread so that requests back up in the queue
+        self.assertTrue(self.buzzer._init_pins())
+        self.buzzer._buzz_condition.acquire()
+        self.buzzer._buzzer_init_task = Mock()
+        self.buzzer.start()
+        self.buzzer.buzz(0.001, BUZZ_PRIORITY_LOW)
+        self.buzzer.buzz(0.001, BUZZ_PRIORITY_LOW)
+        self.buzzer.buzz([0.001, 0.001, 0.001], BUZZ_PRIORITY_NORMAL)
+        for i in range(Buzzer.MAX_QUEUED_BUZZES):
+            self.buzzer.buzz(0.002 + 0.001 * i, BUZZ_PRIORITY_LOW)
+        self.buzzer._buzz_condition.release()
+        for _ in range(100):
+            statistics = self.buzzer.get_statistics()
+            if statistics[u"played"] == Buzzer.MAX_QUEUED_BUZZES and self.buzzer._playing is None:
+                break
+            self.buzzer.join(0.01)
+        statistics = self.buzzer.get_statistics()
+        self.assertEqual({u"played": Buzzer.MAX_QUEUED_BUZZES, u"merged": 1, u"dropped": 2,
+                          u"preempted": 0, u"queued": 0}, statistics)
+
+if __name__ == '__main__':
+    unittest.main()
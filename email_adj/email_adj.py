@@ -17,6 +17,7 @@ from urls import urls  # Get access to SIP's URLs
 from sip import template_render
 from webpages import ProtectedPage
 from helpers import timestr
+from blinker import signal
 
 from email import Encoders
 import smtplib
@@ -48,11 +49,16 @@ class EmailSender(Thread):
     def __init__(self):
         Thread.__init__(self)
         self.daemon = True
+        # Set when stations turn on or off so that station states are only rescanned on change
+        self._zone_changed = True
         self.start()
         self.status = u""
 
         self._sleep_time = 0
 
+    def on_zone_change(self, name, **kw):
+        self._zone_changed = True
+
     def add_status(self, msg):
         if self.status:
             self.status += u"\n" + msg
@@ -86,6 +92,7 @@ class EmailSender(Thread):
         subject = u"Report from " + gv.sd[u"name"]  # Subject in email
         last_rain = 0
         was_running = False
+        running = False
 
         self.status = u""
         self.add_status(u"Email plugin is started")
@@ -122,13 +129,11 @@ class EmailSender(Thread):
                             )  # send email without attachments
 
                 if dataeml[u"emlrun"] != u"off":  # if eml_rain send email is enable (on)
-                    running = False
-                    for b in range(gv.sd[u"nbrd"]):  # Check each station once a second
-                        for s in range(8):
-                            sid = b * 8 + s  # station index
-                            if gv.srvals[sid]:  # if this station is on
-                                running = True
-                                was_running = True
+                    if self._zone_changed:  # Only check stations after they have changed
+                        self._zone_changed = False
+                        running = any(gv.srvals[: gv.sd[u"nbrd"] * 8])
+                    if running:
+                        was_running = True
 
                     if was_running and not running:
                         was_running = False
@@ -173,6 +178,8 @@ class EmailSender(Thread):
 
 
 checker = EmailSender()
+zone_change = signal(u"zone_change")
+zone_change.connect(checker.on_zone_change)
 
 
 ################################################################################
@@ -39,7 +39,13 @@ import sys
 from time import sleep
 
 # threads
-from threading import Thread
+from threading import Thread, Event
+
+# command queue for the worker thread
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
 
 # get open sprinkler signals
 from blinker import signal
@@ -49,6 +55,27 @@ import traceback
 
 # to determine how much time as elapsed (for timeout purposes)
 import time
+try:
+    from time import monotonic
+except ImportError:
+    from time import time as monotonic
+
+# queued key events
+from collections import deque, namedtuple
+
+# keypad backend interface
+from abc import ABCMeta, abstractmethod
+
+# I2C port expander keypads
+try:
+    import smbus
+except ImportError:
+    smbus = None
+# i2c_msg is only provided when smbus is backed by smbus2 (needed for I2C_RDWR transfers)
+try:
+    from smbus import i2c_msg
+except ImportError:
+    i2c_msg = None
 
 # Load the Raspberry Pi GPIO (General Purpose Input Output) library
 try:
@@ -93,6 +120,14 @@ KEYPAD_KEY_LIST = [
     "#",
 ]
 
+# Key event types
+KEY_DOWN = u"down"
+KEY_UP = u"up"
+KEY_HELD = u"held"
+KEY_REPEAT = u"repeat"
+# A debounced key event; time is monotonic and duration is how long the key has been down
+KeyEvent = namedtuple(u"KeyEvent", [u"type", u"key", u"time", u"duration"])
+
 # Add new URLs to access classes in this plugin.
 urls.extend(
     [
@@ -106,33 +141,471 @@ urls.extend(
 # Add this plugin to the PLUGINS menu ['Menu Name', 'URL'], (Optional)
 gv.plugin_menu.append(["Keypad Plugin", "/keypad-sp"])
 
+def _add_edge_callbacks(pins, rising, callback):
+    """
+    Registers a callback for edges on the given pins
+    Inputs: pins - List of board pin numbers
+            rising - True for rising edges; False for falling edges
+            callback - Called from the GPIO library's thread on each edge
+    Returns: List of handles to pass to _cancel_edge_callbacks
+    """
+    handles = []
+    try:
+        for v in pins:
+            if gv.use_pigpio:
+                edge = pigpio.RISING_EDGE if rising else pigpio.FALLING_EDGE
+                handles.append(pi.callback(gv.pin_map[v], edge, callback))
+            else:
+                GPIO.add_event_detect(v, GPIO.RISING if rising else GPIO.FALLING, callback=callback)
+                handles.append(v)
+    except Exception:
+        _cancel_edge_callbacks(handles)
+        raise
+    return handles
+
+def _cancel_edge_callbacks(handles):
+    """
+    Removes edge callbacks registered with _add_edge_callbacks
+    """
+    for handle in handles:
+        try:
+            if gv.use_pigpio:
+                handle.cancel()
+            else:
+                GPIO.remove_event_detect(handle)
+        except Exception:
+            pass
+
+class KeypadBackend(ABCMeta("ABC", (object,), {})):
+    """
+    Base class for the hardware which a ScanningKeypad reads. A backend scans the key matrix and
+    returns, for each column, the row bits of the keys which are down. Backends must implement
+    init() and read_matrix(); the idle and edge detection methods are optional.
+    """
+    def __init__(self, num_columns, num_rows):
+        self.num_columns = num_columns
+        self.num_rows = num_rows
+        # Bit of each row within the row bits returned by read_matrix()
+        self.row_bits = [1 << row for row in range(num_rows)]
+
+    @abstractmethod
+    def init(self):
+        """
+        Initializes the hardware; raises an exception on failure
+        """
+        pass
+
+    @abstractmethod
+    def read_matrix(self):
+        """
+        Scans the whole matrix
+        Returns: A list with the row bits of the keys which are down in each column
+        """
+        pass
+
+    def enter_idle(self):
+        """
+        Configures the matrix so that pressing any key is seen by any_key_down() and the edge
+        callback while nothing is being scanned
+        """
+        pass
+
+    def any_key_down(self):
+        """
+        Returns True if any key is down (called while idle)
+        """
+        for bits in self.read_matrix():
+            if bits:
+                return True
+        return False
+
+    def init_edge_detection(self, callback):
+        """
+        Registers a callback for when a key goes down while idle
+        Returns: True if edge detection is available; False if the keypad must be polled
+        """
+        return False
+
+    def cancel_edge_detection(self):
+        """
+        Removes the callback registered with init_edge_detection()
+        """
+        pass
+
+class GpioKeypadBackend(KeypadBackend):
+    """
+    Keypad wired directly to Raspberry Pi GPIO pins: columns are driven HIGH one at a time and rows
+    are read with pull down resistors
+    """
+    def __init__(self, pin_columns, pin_rows):
+        """
+        Initializes a GpioKeypadBackend object
+        Inputs: pin_columns - List of pin numbers for the keypad columns
+                pin_rows - List of pin numbers for the keypad rows
+        """
+        KeypadBackend.__init__(self, len(pin_columns), len(pin_rows))
+        self._pin_columns = pin_columns
+        self._pin_rows = pin_rows
+        # Current energized column
+        self._keypad_current_column = -1
+        # True while all columns are driven HIGH
+        self._idle = False
+        self._row_mask = 0
+        self._matrix = [0] * len(pin_columns)
+        self._edge_callbacks = []
+
+    @staticmethod
+    def _set_floating_input(pin):
+        """
+        Set the hardware input as floating (not pulled up or down by a resistor)
+        """
+        if gv.use_pigpio:
+            pi.set_mode(gv.pin_map[pin], pigpio.INPUT)
+            pi.set_pull_up_down(gv.pin_map[pin], pigpio.PUD_OFF)
+        else:
+            GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_OFF)
+
+    @staticmethod
+    def _set_high_output(pin):
+        if gv.use_pigpio:
+            pi.set_mode(gv.pin_map[pin], pigpio.OUTPUT)
+            pi.write(gv.pin_map[pin], 1)
+        else:
+            GPIO.setup(pin, GPIO.OUT)
+            GPIO.output(pin, GPIO.HIGH)
+
+    def _set_column(self, col):
+        """
+        Float the previous column and output HIGH to the given column
+        Inputs: col - The column pin to set
+        """
+        if self._idle:
+            # Leaving idle; all columns are HIGH, so set them all floating
+            for v in self._pin_columns:
+                GpioKeypadBackend._set_floating_input(v)
+            self._idle = False
+        elif self._keypad_current_column >= 0:
+            # Set old value as floating input so it won't affect anyone else
+            GpioKeypadBackend._set_floating_input(self._keypad_current_column)
+        # set current pin and make output HIGH
+        self._keypad_current_column = col
+        GpioKeypadBackend._set_high_output(col)
+
+    def init(self):
+        if not gv.use_pigpio:
+            GPIO.setmode(GPIO.BOARD)
+        # set column pins as floating to start with
+        for v in self._pin_columns:
+            GpioKeypadBackend._set_floating_input(v)
+        self._keypad_current_column = -1
+        self._idle = False
+        # row pins will be used as input with pull down resistors
+        for v in self._pin_rows:
+            if gv.use_pigpio:
+                pi.set_mode(gv.pin_map[v], pigpio.INPUT)
+                pi.set_pull_up_down(gv.pin_map[v], pigpio.PUD_DOWN)
+            else:
+                GPIO.setup(v, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+        # Under pigpio, rows are read together from GPIO bank 1
+        if gv.use_pigpio:
+            self.row_bits = [1 << gv.pin_map[v] for v in self._pin_rows]
+        else:
+            self.row_bits = [1 << row for row in range(len(self._pin_rows))]
+        self._row_mask = 0
+        for row_bit in self.row_bits:
+            self._row_mask |= row_bit
+
+    def _read_rows(self):
+        """
+        Reads all row inputs at once
+        Returns: The row bits which are HIGH
+        """
+        if gv.use_pigpio:
+            # One read for the whole bank instead of one per row
+            return pi.read_bank_1() & self._row_mask
+        bits = 0
+        for row_v, row_bit in zip(self._pin_rows, self.row_bits):
+            if GPIO.input(row_v):
+                bits |= row_bit
+        return bits
+
+    def read_matrix(self):
+        for col, col_v in enumerate(self._pin_columns):
+            self._set_column(col_v)
+            sleep(0.001)  # just to make sure the output is fully charged
+            self._matrix[col] = self._read_rows()
+        return self._matrix
+
+    def enter_idle(self):
+        # Drive all columns HIGH so that a press of any key raises its row
+        if not self._idle:
+            for v in self._pin_columns:
+                GpioKeypadBackend._set_high_output(v)
+            self._keypad_current_column = -1
+            self._idle = True
+
+    def any_key_down(self):
+        return self._read_rows() != 0
+
+    def init_edge_detection(self, callback):
+        self.cancel_edge_detection()
+        self._edge_callbacks = _add_edge_callbacks(self._pin_rows, True, callback)
+        return True
+
+    def cancel_edge_detection(self):
+        _cancel_edge_callbacks(self._edge_callbacks)
+        self._edge_callbacks = []
+
+class ExpanderKeypadBackend(KeypadBackend):
+    """
+    Keypad wired to an I2C port expander, leaving only the optional interrupt line on the Pi. Rows
+    are pulled up and columns are pulled LOW one at a time, so keys which are down read LOW.
+    PCF8574: columns on P0-P3 and rows on P4-P7. MCP23017: columns on GPA0-3 and rows on GPB0-3.
+    When I2C_RDWR is available, the whole matrix is read in a single bus transaction.
+    """
+    PCF8574 = u"pcf8574"
+    MCP23017 = u"mcp23017"
+    # MCP23017 registers (IOCON.BANK = 0)
+    MCP_IODIRA = 0x00
+    MCP_IODIRB = 0x01
+    MCP_GPINTENB = 0x05
+    MCP_INTCONB = 0x09
+    MCP_IOCON = 0x0A
+    MCP_GPPUB = 0x0D
+    MCP_GPIOB = 0x13
+    MCP_OLATA = 0x14
+    # INT outputs mirrored and open drain
+    MCP_IOCON_VALUE = 0x44
+
+    def __init__(self, chip, i2c_addr, i2c_bus_number=1, int_pin=None, num_columns=4,
+                 num_rows=4):
+        """
+        Initializes an ExpanderKeypadBackend object
+        Inputs: chip - PCF8574 or MCP23017
+                i2c_addr - The 7-bit I2C address of the expander
+                i2c_bus_number - The I2C bus number passed to SMBus
+                int_pin - The board pin wired to the expander's interrupt output or None to poll
+                num_columns - The number of keypad columns (at most 4)
+                num_rows - The number of keypad rows (at most 4)
+        """
+        KeypadBackend.__init__(self, num_columns, num_rows)
+        self._chip = chip
+        self._i2c_addr = i2c_addr
+        self._i2c_bus_number = i2c_bus_number
+        self._int_pin = int_pin
+        self._bus = None
+        self._col_mask = (1 << num_columns) - 1
+        self._row_mask = (1 << num_rows) - 1
+        self._matrix = [0] * num_columns
+        # I2C_RDWR messages which scan the matrix, and the read message of each column
+        self._scan_msgs = None
+        self._read_msgs = []
+        self._edge_callbacks = []
+
+    def _column_value(self, col):
+        """
+        Returns the value written to select the given column. For a PCF8574, this is the port
+        value, where a 1 is a weak pull up so that rows and the other columns remain inputs. For an
+        MCP23017, this is IODIRA, where only the selected column is an output (driving LOW).
+        """
+        return 0xFF & ~(1 << col)
+
+    def _idle_value(self):
+        """
+        Returns the value written to select all columns at once
+        """
+        return 0xFF & ~self._col_mask
+
+    def _write_select(self, value):
+        if self._chip == ExpanderKeypadBackend.PCF8574:
+            self._bus.write_byte(self._i2c_addr, value)
+        else:
+            self._bus.write_byte_data(self._i2c_addr, ExpanderKeypadBackend.MCP_IODIRA, value)
+
+    def _read_rows_low(self):
+        """
+        Returns the row bits which read LOW
+        """
+        if self._chip == ExpanderKeypadBackend.PCF8574:
+            value = self._bus.read_byte(self._i2c_addr) >> 4
+        else:
+            value = self._bus.read_byte_data(self._i2c_addr, ExpanderKeypadBackend.MCP_GPIOB)
+        return ~value & self._row_mask
+
+    def init(self):
+        if smbus is None:
+            raise IOError(u"smbus is not available")
+        if self._chip not in (ExpanderKeypadBackend.PCF8574, ExpanderKeypadBackend.MCP23017):
+            raise ValueError(u"Unsupported expander: {}".format(self._chip))
+        if self._bus is None:
+            self._bus = smbus.SMBus(self._i2c_bus_number)
+        if self._chip == ExpanderKeypadBackend.MCP23017:
+            addr = self._i2c_addr
+            self._bus.write_byte_data(addr, ExpanderKeypadBackend.MCP_IOCON,
+                                      ExpanderKeypadBackend.MCP_IOCON_VALUE)
+            # Columns float until selected; when selected, they output LOW
+            self._bus.write_byte_data(addr, ExpanderKeypadBackend.MCP_OLATA, 0x00)
+            self._bus.write_byte_data(addr, ExpanderKeypadBackend.MCP_IODIRA, 0xFF)
+            # Rows are pulled up inputs which interrupt on any change
+            self._bus.write_byte_data(addr, ExpanderKeypadBackend.MCP_IODIRB, 0xFF)
+            self._bus.write_byte_data(addr, ExpanderKeypadBackend.MCP_GPPUB, self._row_mask)
+            self._bus.write_byte_data(addr, ExpanderKeypadBackend.MCP_INTCONB, 0x00)
+            self._bus.write_byte_data(addr, ExpanderKeypadBackend.MCP_GPINTENB, self._row_mask)
+        else:
+            self._bus.write_byte(self._i2c_addr, 0xFF)
+        # Build the I2C_RDWR scan: for each column, select it then read the rows back
+        self._scan_msgs = None
+        self._read_msgs = []
+        if i2c_msg is not None and hasattr(self._bus, u"i2c_rdwr"):
+            msgs = []
+            for col in range(self.num_columns):
+                read_msg = i2c_msg.read(self._i2c_addr, 1)
+                if self._chip == ExpanderKeypadBackend.PCF8574:
+                    msgs.extend([i2c_msg.write(self._i2c_addr, [self._column_value(col)]),
+                                 read_msg])
+                else:
+                    msgs.extend([i2c_msg.write(self._i2c_addr,
+                                               [ExpanderKeypadBackend.MCP_IODIRA,
+                                                self._column_value(col)]),
+                                 i2c_msg.write(self._i2c_addr, [ExpanderKeypadBackend.MCP_GPIOB]),
+                                 read_msg])
+                self._read_msgs.append(read_msg)
+            self._scan_msgs = msgs
+
+    def read_matrix(self):
+        if self._scan_msgs is not None:
+            self._bus.i2c_rdwr(*self._scan_msgs)
+            shift = 4 if self._chip == ExpanderKeypadBackend.PCF8574 else 0
+            for col, read_msg in enumerate(self._read_msgs):
+                self._matrix[col] = ~(list(read_msg)[0] >> shift) & self._row_mask
+        else:
+            for col in range(self.num_columns):
+                self._write_select(self._column_value(col))
+                self._matrix[col] = self._read_rows_low()
+        return self._matrix
+
+    def enter_idle(self):
+        # Pull all columns LOW so that a press of any key pulls its row LOW and interrupts
+        self._write_select(self._idle_value())
+
+    def any_key_down(self):
+        # Reading also clears the expander's interrupt
+        return self._read_rows_low() != 0
+
+    def init_edge_detection(self, callback):
+        self.cancel_edge_detection()
+        if self._int_pin is None:
+            return False
+        # The interrupt output is open drain and active LOW
+        if gv.use_pigpio:
+            pi.set_mode(gv.pin_map[self._int_pin], pigpio.INPUT)
+            pi.set_pull_up_down(gv.pin_map[self._int_pin], pigpio.PUD_UP)
+        else:
+            GPIO.setmode(GPIO.BOARD)
+            GPIO.setup(self._int_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        self._edge_callbacks = _add_edge_callbacks([self._int_pin], False, callback)
+        return True
+
+    def cancel_edge_detection(self):
+        _cancel_edge_callbacks(self._edge_callbacks)
+        self._edge_callbacks = []
+
+class SimulatedKeypadBackend(KeypadBackend):
+    """
+    Keypad backend without hardware: keys are pressed and released by column and row. Useful for
+    exercising the keypad and plugin off of a Pi.
+    """
+    def __init__(self, num_columns=4, num_rows=4):
+        KeypadBackend.__init__(self, num_columns, num_rows)
+        self._matrix = [0] * num_columns
+        self._callback = None
+        # Number of times the matrix has been scanned
+        self.scan_count = 0
+
+    def init(self):
+        pass
+
+    def press(self, col, row):
+        self._matrix[col] |= 1 << row
+        if self._callback is not None:
+            self._callback()
+
+    def release(self, col, row):
+        self._matrix[col] &= ~(1 << row)
+
+    def read_matrix(self):
+        self.scan_count += 1
+        return self._matrix
+
+    def any_key_down(self):
+        return any(self._matrix)
+
+    def init_edge_detection(self, callback):
+        self._callback = callback
+        return True
+
+    def cancel_edge_detection(self):
+        self._callback = None
+
 class ScanningKeypad:
     """ This class handles the keypad hardware """
-    def __init__(self, pin_columns, pin_rows, indices, char_list):
+    # Time between scans while any key is down or settling
+    SCAN_INTERVAL_S = 0.005
+    # Time between scans while nothing is down and edge detection isn't available
+    IDLE_SCAN_INTERVAL_S = 0.025
+    # Number of consecutive agreeing samples needed to change the state of a key
+    DEBOUNCE_SAMPLES = 3
+    # Maximum number of unconsumed events (older events are dropped)
+    MAX_QUEUED_EVENTS = 64
+
+    def __init__(self, backend, indices, char_list, hold_time_s=1.0, repeat_interval_s=0.25):
         """
         Initializes a ScanningKeypad object
-        Inputs: pin_columns - List of pin numbers for the keypad columns
-                pin_rows - List of pin numbers for the keypad rows
+        Inputs: backend - The KeypadBackend which reads the key matrix
                 indices - A 2-dimensional table of the resulting index for each key when a column
                           meets with a row
                 char_list - List of characters where the key is a value within indices
+                hold_time_s - How long a key must be down before a held event is sent
+                repeat_interval_s - Time between repeat events after a key is held (0 to disable)
         """
-        self._pin_columns = pin_columns
-        self._pin_rows = pin_rows
+        self.hold_time_s = hold_time_s
+        self.repeat_interval_s = repeat_interval_s
+        self._backend = backend
+        # Backend to switch to from the scanning thread
+        self._pending_backend = None
         self._indices = indices
         self._char_list = char_list
-        # Current energized column
-        self._keypad_current_column = -1
         # set to true after keypad pins are first initialized; set to false on exception
         self._pins_initialized = False
         # Boolean to help force blocking calls to exit once this transitions to False
         self._running = True
+        # Set from the backend's edge callback when a key is pressed while idle
+        self._edge_event = Event()
+        # True when the backend can signal key presses while idle
+        self._edge_detection = False
+        # Per column, a table from the row bits read to a bitmask of the depressed key indices
+        self._key_tables = []
+        # Debouncer state: an integrator per key, and bitmasks of keys which are debounced down,
+        # held, or not yet settled up
+        self._integrators = bytearray(len(char_list))
+        self._debounced = 0
+        self._held = 0
+        self._active = 0
+        self._down_times = [0.0] * len(char_list)
+        self._next_hold_times = [0.0] * len(char_list)
+        # Key events which haven't been consumed yet
+        self._events = deque(maxlen=ScanningKeypad.MAX_QUEUED_EVENTS)
+        # Key events are also sent to subscribers of this signal
+        self._event_signal = signal(u"keypad_key_event")
 
     def set_running(self, is_running):
         """
         Sets the running flag (forces some blocking calls to unblock when set to False)
         """
         self._running = is_running
+        if not is_running:
+            # Release anyone waiting for a key press
+            self._edge_event.set()
 
     def isReady(self):
         """
@@ -140,173 +613,325 @@ class ScanningKeypad:
         """
         return self._pins_initialized
 
-    @staticmethod
-    def _set_floating_input(pin):
+    def set_backend(self, backend):
         """
-        Set the hardware input as floating (not pulled up or down by a resistor)
+        Replaces the hardware backend. The new backend is initialized on the next _init_pins(),
+        which the scanning thread does right away.
         """
-        if gv.use_pigpio:
-            pi.set_mode(gv.pin_map[pin], pigpio.INPUT)
-            pi.set_pull_up_down(gv.pin_map[pin], pigpio.PUD_OFF)
-        else:
-            GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_OFF)
+        self._pending_backend = backend
+        # Release an idle wait so that the switch happens promptly
+        self._edge_event.set()
 
-    def _set_column(self, col):
+    def _init_pins(self):
         """
-        Output LOW to the previous column and output HIGH to the given column
-        Inputs: col - The column index to set
+        Initializes the hardware used by this ScanningKeypad
         Returns: True if operation succeeded; False otherwise
         """
+        self._cancel_edge_detection()
+        if self._pending_backend is not None:
+            self._backend = self._pending_backend
+            self._pending_backend = None
+        try:
+            self._backend.init()
+            self._reset_debouncer()
+            self._build_key_tables()
+            self._pins_initialized = True
+        except Exception as err:
+            print(u"Keypad plugin: except:\n{}".format(err))
+            print(traceback.format_exc())
+            self._pins_initialized = False
         if self._pins_initialized:
-            try:
-                if self._keypad_current_column >= 0:
-                    # Set old value as floating input so it won't affect anyone else
-                    ScanningKeypad._set_floating_input(self._keypad_current_column)
-                # set current pin and make output HIGH
-                self._keypad_current_column = col
-                if gv.use_pigpio:
-                    pi.set_mode(gv.pin_map[self._keypad_current_column], pigpio.OUTPUT)
-                    pi.write(gv.pin_map[self._keypad_current_column], 1)
-                else:
-                    GPIO.setup(self._keypad_current_column, GPIO.OUT)
-                    GPIO.output(self._keypad_current_column, GPIO.HIGH)
-            except Exception as err:
-                print(u"Keypad plugin: except:\n{}".format(err))
-                print(traceback.format_exc())
-                self._pins_initialized = False
+            self._init_edge_detection()
         return self._pins_initialized
 
-    def _init_pins(self):
+    def _reset_debouncer(self):
         """
-        Initializes the pins used by this ScanningKeypad
-        Returns: True if operation succeeded; False otherwise
+        Forgets all key states and queued events
+        """
+        for i in range(len(self._integrators)):
+            self._integrators[i] = 0
+        self._debounced = 0
+        self._held = 0
+        self._active = 0
+        self._events.clear()
+
+    def _build_key_tables(self):
+        """
+        Precomputes the tables which decode the row bits read for a column into key indices
+        """
+        row_bits = self._backend.row_bits
+        self._key_tables = []
+        for col in range(self._backend.num_columns):
+            table = {}
+            for pattern in range(1 << len(row_bits)):
+                bits = 0
+                key_mask = 0
+                for row, row_bit in enumerate(row_bits):
+                    if pattern & (1 << row):
+                        bits |= row_bit
+                        key_mask |= 1 << self._indices[row][col]
+                table[bits] = key_mask
+            self._key_tables.append(table)
+
+    def _on_edge(self, *args):
+        """
+        Key press edge callback (called from the GPIO library's thread)
+        """
+        self._edge_event.set()
+
+    def _init_edge_detection(self):
+        """
+        Registers the edge callback so that idle waits don't need to poll. If this fails, the
+        keypad falls back to polling.
+        Returns: True if edge detection is available; False otherwise
         """
         try:
-            if not gv.use_pigpio:
-                GPIO.setmode(GPIO.BOARD)
-            # set column pins as floating to start with
-            for v in self._pin_columns:
-                ScanningKeypad._set_floating_input(v)
-            self._keypad_current_column = -1
-            # row pins will be used as input with pull down resistors
-            for v in self._pin_rows:
-                if gv.use_pigpio:
-                    pi.set_mode(gv.pin_map[v], pigpio.INPUT)
-                    pi.set_pull_up_down(gv.pin_map[v], pigpio.PUD_DOWN)
-                else:
-                    GPIO.setup(v, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
-            self._pins_initialized = True
+            self._edge_detection = self._backend.init_edge_detection(self._on_edge)
+        except Exception as err:
+            print(u"Keypad plugin: Edge detection not available; polling instead:\n{}".format(err))
+            self._cancel_edge_detection()
+        return self._edge_detection
+
+    def _cancel_edge_detection(self):
+        """
+        Removes any registered edge callback
+        """
+        self._edge_detection = False
+        try:
+            self._backend.cancel_edge_detection()
+        except Exception:
+            pass
+
+    def _wait_for_edge(self, timeout_s=None):
+        """
+        Idles until a key is pressed: the backend is set up so that any key press is detected, and
+        this blocks on the edge callback instead of scanning.
+        Inputs: timeout_s - The amount of time in seconds to block or None to block indefinitely
+        Returns: True if a key may have been pressed; False on timeout or error
+        """
+        self._edge_event.clear()
+        try:
+            self._backend.enter_idle()
+            # A key may have gone down before the event was cleared
+            if self._backend.any_key_down():
+                return True
         except Exception as err:
             print(u"Keypad plugin: except:\n{}".format(err))
             print(traceback.format_exc())
             self._pins_initialized = False
-        return self._pins_initialized
+            return False
+        if not self._running:
+            return False
+        return self._edge_event.wait(timeout_s)
 
     def _sample(self):
         """
-        Samples all rows and returns the depressed keys for the current column
+        Scans every column and returns the depressed keys
+        Returns: A bitmask where bit n is set when the key at index n is down
         """
-        keys = [False] * len(self._char_list)
-        for col, col_v in enumerate(self._pin_columns):
-            if self._set_column(col_v):
-                sleep(0.001)  # just to make sure the output is fully charged
-                try:
-                    for row, row_v in enumerate(self._pin_rows):
-                        if gv.use_pigpio:
-                            keys[self._indices[row][col]] = pi.read(gv.pin_map[row_v])
-                        else:
-                            keys[self._indices[row][col]] = GPIO.input(row_v)
-                except Exception as err:
-                    print(u"Keypad plugin: except:\n{}".format(err))
-                    print(traceback.format_exc())
-                    self._pins_initialized = False
-            else:
-                keys = [False] * len(self._char_list)
-                break
+        if not self._pins_initialized:
+            return 0
+        try:
+            matrix = self._backend.read_matrix()
+        except Exception as err:
+            print(u"Keypad plugin: except:\n{}".format(err))
+            print(traceback.format_exc())
+            self._pins_initialized = False
+            return 0
+        keys = 0
+        for col, bits in enumerate(matrix):
+            if bits:
+                keys |= self._key_tables[col][bits]
         return keys
 
-    def wait_for_any_key(self):
+    def _queue_event(self, event_type, index, now):
+        """
+        Queues a key event and sends it to any key event signal subscribers
+        """
+        duration = 0.0 if event_type == KEY_DOWN else now - self._down_times[index]
+        event = KeyEvent(event_type, self._char_list[index], now, duration)
+        self._events.append(event)
+        self._event_signal.send(u"keypad", event=event)
+
+    def scan(self):
+        """
+        Samples the keypad once, debounces the sample, and queues any resulting key events.
+        Each key has an integrator which counts up for every sample the key reads down and down
+        for every sample it reads up; the key only changes state when the integrator reaches
+        either end, so a bounce must persist for DEBOUNCE_SAMPLES samples to register.
+        Returns: The number of events queued
+        """
+        raw = self._sample()
+        now = monotonic()
+        num_events = len(self._events)
+        changing = raw | self._active
+        i = 0
+        while changing >> i:
+            bit = 1 << i
+            if changing & bit:
+                level = self._integrators[i]
+                if raw & bit:
+                    if level < ScanningKeypad.DEBOUNCE_SAMPLES:
+                        level += 1
+                elif level > 0:
+                    level -= 1
+                self._integrators[i] = level
+                if level == ScanningKeypad.DEBOUNCE_SAMPLES and not self._debounced & bit:
+                    self._debounced |= bit
+                    self._down_times[i] = now
+                    self._next_hold_times[i] = now + self.hold_time_s
+                    self._queue_event(KEY_DOWN, i, now)
+                elif level == 0 and self._debounced & bit:
+                    self._debounced &= ~bit
+                    self._held &= ~bit
+                    self._queue_event(KEY_UP, i, now)
+                if level > 0:
+                    self._active |= bit
+                else:
+                    self._active &= ~bit
+            i += 1
+        # Hold and repeat detection for keys which remain down
+        i = 0
+        while self._debounced >> i:
+            bit = 1 << i
+            if self._debounced & bit and now >= self._next_hold_times[i]:
+                if not self._held & bit:
+                    self._held |= bit
+                    self._queue_event(KEY_HELD, i, now)
+                else:
+                    self._queue_event(KEY_REPEAT, i, now)
+                if self.repeat_interval_s > 0:
+                    self._next_hold_times[i] = now + self.repeat_interval_s
+                else:
+                    self._next_hold_times[i] = float(u"inf")
+            i += 1
+        return len(self._events) - num_events
+
+    def get_event(self, timeout_s=None):
+        """
+        Gets the next key event, scanning the keypad as needed. While nothing is down, this idles
+        on row edges (or slow polling when edge detection isn't available).
+        Inputs: timeout_s - The amount of time in seconds to block or None to block indefinitely
+        Returns: The next KeyEvent; None on timeout, on error, or once no longer running
+        """
+        deadline = None if timeout_s is None else monotonic() + timeout_s
+        while not self._events:
+            if not self._running or not self._pins_initialized:
+                return None
+            now = monotonic()
+            if deadline is not None and now >= deadline:
+                return None
+            if self._pending_backend is not None:
+                self._init_pins()
+                continue
+            if self._active or self._debounced:
+                sleep(ScanningKeypad.SCAN_INTERVAL_S)
+            elif self._edge_detection:
+                self._wait_for_edge(None if deadline is None else deadline - now)
+            else:
+                sleep(ScanningKeypad.IDLE_SCAN_INTERVAL_S)
+            self.scan()
+        return self._events.popleft()
+
+    def __iter__(self):
         """
-        Waits for any key to be pressed
+        Yields key events until no longer running or the hardware fails
         """
-        c = self._sample()
-        while True not in c:
-            sleep(0.01)
-            c = self._sample()
+        while True:
+            event = self.get_event()
+            if event is None:
+                return
+            yield event
 
     def getc(self, down_keys=None, timeout_s=-1):
         """
         Gets next key press
         Inputs: down_keys - Updated to the currently depressed keys on return
                 timeout_s - The amount of time in seconds to block before giving up
+        Returns: List of the characters which went down
         """
-        # Get starting time
-        start_time = time.time()
-        # Get initial sample
-        last = keys = self._sample()
+        start_time = monotonic()
         c = []
-        while self._running and self._pins_initialized:
-            # Check for error
-            if keys is None:
-                return None  # There was a fatal error
-            # Add any new keys to c
-            for i, v in enumerate(self._char_list):
-                if last[i] != keys[i] and keys[i]:
-                    c.append(v)
-            # If any new keys have been added, we are done
-            if len(c) > 0:
+        while not c:
+            remaining_s = None
+            if timeout_s > 0:
+                remaining_s = timeout_s - (monotonic() - start_time)
+                if remaining_s <= 0:
+                    break  # Timeout occurred
+            event = self.get_event(remaining_s)
+            if event is None:
                 break
-            # Check for timeout
-            current_time = time.time()
-            if timeout_s > 0 and (current_time - start_time) >= timeout_s:
-                break  # Timeout occurred
-            # Check for change every 25 ms so we don't bog anything down.
-            # This also serves as a debounce.
-            sleep(0.025)
-            # Next sample
-            last = keys
-            keys = self._sample()
+            if event.type == KEY_DOWN:
+                c.append(event.key)
         # Copy keys to down_keys
-        if (
-            down_keys is not None
-            and len(down_keys) >= len(self._char_list)
-            and keys is not None
-        ):
+        if down_keys is not None and len(down_keys) >= len(self._char_list):
             for i in range(0, len(self._char_list)):
-                down_keys[i] = keys[i]
+                down_keys[i] = bool(self._debounced & (1 << i))
         return c
 
-    def wait_for_key_index_up(self, key_index, timeout_s=-1, running=True):
-        if key_index >= 0 and key_index < len(self._char_list):
-            timeout_reached = False
-            # Get starting time
-            start_time = time.time()
-            while running and self._pins_initialized and not timeout_reached:
-                keys = self._sample()
-                current_time = time.time()
-                # Check to see if the selected key is up
-                if not keys[key_index]:
-                    return current_time - start_time
-                # Check for timeout
-                elif timeout_s > 0 and (current_time - start_time) >= timeout_s:
-                    return current_time - start_time  # Timeout occurred
-                sleep(0.025)  # sleep for a moment before trying again
-            return -1  # we are not running or pins aren't initialized
-        else:
-            return -1  # invalid index
-
-    def wait_for_key_char_up(self, key_char, timeout_s=-1, running=True):
-        key_index = -1
-        for i, c in enumerate(self._char_list):
-            if c == key_char:
-                key_index = i
-                break
-        return self.wait_for_key_index_up(key_index, timeout_s, running)
-
 
 def float_to_field_str(value):
     return format(value, '0.2f').rstrip('0').rstrip('.')
 
+class CommandWorker:
+    """
+    Executes keypad commands in order on a dedicated thread so that the keypad keeps being scanned
+    while commands run
+    """
+    def __init__(self):
+        self._queue = Queue()
+        self._thread = None
+
+    def start(self):
+        """
+        Starts the worker thread if it isn't already running
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = Thread(target=self._worker_task)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self, timeout_s=0.25):
+        """
+        Stops the worker thread once all previously submitted commands have executed
+        Returns: True if the thread stopped within the timeout; False otherwise
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout_s)
+            if not self._thread.is_alive():
+                self._thread = None
+        return (self._thread is None)
+
+    def submit(self, func, args=(), on_complete=None):
+        """
+        Queues a command for execution
+        Inputs: func - The function to execute
+                args - Tuple of arguments to pass to func
+                on_complete - Called on the worker thread with the result of func (None if func
+                              raised an exception)
+        """
+        self._queue.put((func, args, on_complete))
+
+    def _worker_task(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            (func, args, on_complete) = item
+            result = None
+            try:
+                result = func(*args)
+            except Exception as err:
+                print(u"Keypad plugin: Command failed:\n{}".format(err))
+                print(traceback.format_exc())
+            if on_complete is not None:
+                try:
+                    on_complete(result)
+                except Exception as err:
+                    print(u"Keypad plugin: except:\n{}".format(err))
+                    print(traceback.format_exc())
+
 # This class contains the functionality for this plugin
 class KeypadPlugin:
     # Constants
@@ -338,6 +963,7 @@ class KeypadPlugin:
     HLDFN_RESET_WATER_LEVEL = 23
     HLDFN_TOGGLE_RAIN_DELAY = 24
     HLDFN_TOGGLE_SYSTEM_EN = 25
+    HLDFN_RUN_MACRO = 26
     # Function text must be 10 chars or less
     HOLD_FUNCTION_TEXT = {HLDFN_STOP_ALL:              u"Stop All",
                           HLDFN_ACTIVATE_RAIN_DELAY:   u"RDelay On",
@@ -348,13 +974,18 @@ class KeypadPlugin:
                           HLDFN_REBOOT_OS:             u"Rebooting",
                           HLDFN_RESET_WATER_LEVEL:     u"WLvl=100%",
                           HLDFN_TOGGLE_RAIN_DELAY:     u"Tgl RDelay",
-                          HLDFN_TOGGLE_SYSTEM_EN:      u"Tgl Sys En"}
+                          HLDFN_TOGGLE_SYSTEM_EN:      u"Tgl Sys En",
+                          HLDFN_RUN_MACRO:             u"Macro"}
     # Execution enumeration
     EXECUTE_FAILED = 0
     EXECUTE_COMPLETE = 1
     EXECUTE_TOGGLE_ON = 2
     EXECUTE_TOGGLE_OFF = 3
 
+    # Buzzer priorities (see buzzer plugin); other beeps use the buzzer's normal priority
+    BEEP_PRIORITY_LOW = 0
+    BEEP_PRIORITY_HIGH = 2
+
     # Types of keys
     FUNCTION_KEYS = ["A", "B", "C", "D"]
     NUMBER_KEYS = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]
@@ -363,11 +994,24 @@ class KeypadPlugin:
 
     # Allow up to 9999 station/program
     MAX_NUMBER_ENTRY = 4
+    # Station lists (e.g. 1,3,5-8) may be up to this many characters long
+    MAX_LIST_ENTRY = 24
+    # Separators within a station list; entered on the keypad by holding a number key for the
+    # hold time for a list separator and for twice the hold time for a range separator
+    LIST_SEPARATOR = ","
+    RANGE_SEPARATOR = "-"
+
+    # Keypad hardware backends
+    BACKEND_GPIO = u"gpio"
+    BACKENDS = [BACKEND_GPIO, ExpanderKeypadBackend.PCF8574, ExpanderKeypadBackend.MCP23017]
 
     def __init__(self):
-        # Keypad object to get key presses
+        # Keypad object to get key presses (wired to GPIO until settings select another backend)
+        self._backend_config = (KeypadPlugin.BACKEND_GPIO, 0x20, 1, 0)
         self._keypad = ScanningKeypad(
-            KEYPAD_PIN_COLUMNS, KEYPAD_PIN_ROWS, KEYPAD_INDICES, KEYPAD_KEY_LIST
+            GpioKeypadBackend(KEYPAD_PIN_COLUMNS, KEYPAD_PIN_ROWS),
+            KEYPAD_INDICES,
+            KEYPAD_KEY_LIST
         )
         # Buzzer signal for feedback
         self._buzzer_signal = signal(u"buzzer_beep")
@@ -388,6 +1032,16 @@ class KeypadPlugin:
 
         # Set to True when function is selected by user
         self._function_selected = False
+        # Digits entered so far, or None when no value is being entered
+        self._entry = None
+        # Function key with a hold function which is down, waiting to be held or released
+        self._pending_function_key = None
+        # Number key just entered into a station list, which adds a separator once held
+        self._separator_key = None
+        # Monotonic time when the selected function or entry times out; None for no timeout
+        self._deadline = None
+        # Executes commands off of the keypad thread
+        self._worker = CommandWorker()
         return
 
     def _set_running(self, is_running):
@@ -406,6 +1060,11 @@ class KeypadPlugin:
         self.keypad_manual_station_time_s = 300
         self.rain_delay_hrs = 24
         self.key_hold_time_s = 1
+        # Keypad hardware: GPIO pins or an I2C port expander (address, bus, and interrupt pin)
+        self.keypad_backend = KeypadPlugin.BACKEND_GPIO
+        self.expander_i2c_addr = 0x20
+        self.expander_i2c_bus = 1
+        self.expander_int_pin = 0  # No interrupt pin; the expander is polled
         self.selectable_functions = {
             "A": KeypadPlugin.FN_MANUAL_STATION,
             "B": KeypadPlugin.FN_START_RAIN_DELAY,
@@ -420,6 +1079,10 @@ class KeypadPlugin:
         }
         # Default function
         self.default_function = KeypadPlugin.FN_MANUAL_STATION
+        # Macro key sequences (e.g. "A1,3,5-8#") run by the Run Macro hold function
+        self.macros = {"A": u"", "B": u"", "C": u"", "D": u""}
+        # Macros compiled into lists of (value function, entered value)
+        self._compiled_macros = {}
 
         # Beeps
         self.acknowledge_command_beep = 0.100
@@ -429,6 +1092,7 @@ class KeypadPlugin:
         self.hold_function_toggle_on_beep = [0.050, 0.050, 0.200]
         self.hold_function_toggle_off_beep = [0.200, 0.050, 0.050]
         self.button_pressed_beep = 0.025
+        self._keypad.hold_time_s = self.key_hold_time_s
 
     def init_pins(self):
         """
@@ -436,49 +1100,92 @@ class KeypadPlugin:
         """
         return self._keypad._init_pins()
 
+    def _create_backend(self):
+        """
+        Returns a new KeypadBackend for the current hardware settings
+        """
+        if self.keypad_backend in (ExpanderKeypadBackend.PCF8574, ExpanderKeypadBackend.MCP23017):
+            return ExpanderKeypadBackend(self.keypad_backend,
+                                         self.expander_i2c_addr,
+                                         self.expander_i2c_bus,
+                                         self.expander_int_pin or None)
+        return GpioKeypadBackend(KEYPAD_PIN_COLUMNS, KEYPAD_PIN_ROWS)
+
+    def _apply_backend_settings(self):
+        """
+        Switches the keypad to a new backend if the hardware settings changed
+        """
+        config = (self.keypad_backend,
+                  self.expander_i2c_addr,
+                  self.expander_i2c_bus,
+                  self.expander_int_pin)
+        if config != self._backend_config:
+            self._backend_config = config
+            self._keypad.set_backend(self._create_backend())
+
     # This function is based on change_runonce class in webpages.py
     @staticmethod
-    def _set_runonce_station(stationID, seconds=300):
+    def _set_runonce_stations(stationIDs, seconds=300):
         """
-        Runs a single station for a given number of seconds. This will override any running program.
+        Runs a set of stations for a given number of seconds. This will override any running program.
+        The run schedule is rebuilt once for the whole set.
+        Inputs: stationIDs - List of station numbers to run; [0] stops all stations
+                seconds - Run time for each station
+        Returns: True if the schedule was updated; False if a station was not found
         """
-        found = False
-        newrovals = []
-        for i in range(gv.sd["nst"]):
-            if i == (stationID - 1):
-                found = True
-                newrovals.append(seconds)
-            else:
-                newrovals.append(0)
-        run_schedule = False
-        if found:
-            print(u"Keypad plugin: Running station %d for %d seconds." % (stationID, seconds))
-            run_schedule = True
-        elif stationID == 0:
+        num_stations = gv.sd["nst"]
+        newrovals = [0] * num_stations
+        if stationIDs == [0]:
             print(u"Keypad plugin: Stopping all stations.")
-            run_schedule = True
         else:
-            print(u"Keypad plugin: Station %d not found. Ignoring entry." % stationID)
-            run_schedule = False
-        if run_schedule:
-            gv.rovals = newrovals
-            stations = [0] * gv.sd["nbrd"]
-            gv.ps = []  # program schedule (for display)
-            gv.rs = []  # run schedule
-            for i in range(gv.sd["nst"]):
+            missing = [sid for sid in stationIDs if sid < 1 or sid > num_stations]
+            if missing:
+                print(u"Keypad plugin: Station %d not found. Ignoring entry." % missing[0])
+                return False
+            for sid in stationIDs:
+                newrovals[sid - 1] = seconds
+            print(u"Keypad plugin: Running station(s) %s for %d seconds."
+                  % (u", ".join(str(sid) for sid in stationIDs), seconds))
+        gv.rovals = newrovals
+        stations = [0] * gv.sd["nbrd"]
+        gv.ps = []  # program schedule (for display)
+        gv.rs = []  # run schedule
+        start_time = gv.now + 3
+        for i, v in enumerate(newrovals):
+            if v:  # if this element has a value
+                gv.ps.append([98, v])
+                gv.rs.append([start_time, 0, v, 98])
+                stations[i // 8] += 2 ** (i % 8)
+            else:
                 gv.ps.append([0, 0])
                 gv.rs.append([0, 0, 0, 0])
-            for i, v in enumerate(gv.rovals):
-                if v:  # if this element has a value
-                    gv.rs[i][0] = gv.now + 3
-                    gv.rs[i][2] = v
-                    gv.rs[i][3] = 98
-                    gv.ps[i][0] = 98
-                    gv.ps[i][1] = v
-                    stations[i // 8] += 2 ** (i % 8)
-
-            schedule_stations(stations)
-        return run_schedule
+        schedule_stations(stations)
+        return True
+
+    @staticmethod
+    def _parse_station_list(text):
+        """
+        Parses a list of stations such as "1,3,5-8"
+        Inputs: text - The entered station list
+        Returns: Sorted list of unique station numbers, or None if the list is malformed
+        """
+        stationIDs = set()
+        try:
+            for term in text.split(KeypadPlugin.LIST_SEPARATOR):
+                bounds = [int(x) for x in term.split(KeypadPlugin.RANGE_SEPARATOR)]
+                if len(bounds) == 1:
+                    stationIDs.add(bounds[0])
+                elif len(bounds) == 2 and bounds[0] <= bounds[1]:
+                    stationIDs.update(range(bounds[0], bounds[1] + 1))
+                else:
+                    return None
+        except ValueError:
+            return None
+        stationIDs = sorted(stationIDs)
+        if 0 in stationIDs and len(stationIDs) > 1:
+            # Station 0 (stop all) can't be combined with other stations
+            return None
+        return stationIDs
 
     # This function is based on run_now class in webpages.py
     @staticmethod
@@ -570,17 +1277,6 @@ class KeypadPlugin:
             self._set_running(False)
         return self._running
 
-    def _getc(self, down_keys=None, timeout_s=-1):
-        """
-        Gets next key press from my Keypad
-        Inputs: down_keys - Updated to the currently depressed keys on return
-                timeout_s - The amount of time in seconds to block before giving up
-        """
-        c = self._keypad.getc(down_keys=down_keys, timeout_s=timeout_s)
-        if len(c) > 0:
-            self._ssd1306_wake_signal.send() # Wake the display
-        return c
-
     def _display_function_text(self, append):
         self._ssd1306_display_signal.send(
             activator=u"keypad",
@@ -602,7 +1298,7 @@ class KeypadPlugin:
             activator=u"keypad",
             txt=u"{}".format(value),
             row_start=4,
-            min_text_size=4,
+            min_text_size=2,  # Station lists shrink to fit
             max_text_size=4,
             justification=u"CENTER",
             append=True, # This must be appended since write handled in _display_function_text
@@ -634,6 +1330,18 @@ class KeypadPlugin:
                 delay=2
             )
 
+    def _sound_button_pressed(self):
+        """
+        Sounds the button pressed beep; this has low priority so it never cuts off other feedback
+        """
+        self._buzzer_signal.send(self.button_pressed_beep, priority=KeypadPlugin.BEEP_PRIORITY_LOW)
+
+    def _sound_error(self):
+        """
+        Sounds the error beep; this has high priority so it cuts off any other feedback
+        """
+        self._buzzer_signal.send(self.error_beep, priority=KeypadPlugin.BEEP_PRIORITY_HIGH)
+
     def _display_cancel(self):
         self._ssd1306_display_signal.send(activator=u"keypad", cancel=True)
 
@@ -734,13 +1442,100 @@ class KeypadPlugin:
                 print(u"Keypad plugin: Enabling system")
                 gv.sd["en"] = 1
                 return KeypadPlugin.EXECUTE_TOGGLE_ON
+        elif hold_function == KeypadPlugin.HLDFN_RUN_MACRO:
+            return self._run_macro(function_key)
         else:
             print(u"Keypad plugin: Hold function not implemented")
             return KeypadPlugin.EXECUTE_FAILED
 
-    def _execute_value_function(self, command_value):
+    def _run_macro(self, function_key):
+        """
+        Executes each value function of the macro assigned to a function key
+        Returns: EXECUTE_COMPLETE if all steps executed; EXECUTE_FAILED otherwise
+        """
+        steps = self._compiled_macros.get(function_key)
+        if not steps:
+            print(u"Keypad plugin: No macro assigned to this key")
+            return KeypadPlugin.EXECUTE_FAILED
+        print(u"Keypad plugin: Running macro %s" % self.macros[function_key])
+        for selected_function, command_value in steps:
+            if not self._execute_value_function(command_value, selected_function):
+                return KeypadPlugin.EXECUTE_FAILED
+        return KeypadPlugin.EXECUTE_COMPLETE
+
+    def _compile_macro(self, keys):
+        """
+        Compiles a macro key sequence into its value function steps
+        Inputs: keys - Key sequence as it would be entered on the keypad, with station lists
+                       written using "," and "-" (e.g. "A1,3,5-8#C80#")
+        Returns: List of (value function, entered value) or None if the sequence is invalid. At
+                 most one step runs manual stations.
+        """
+        steps = []
+        # Index of the manual station step within steps
+        station_step = None
+        selected_function = self.default_function
+        entry = []
+        for key in keys.replace(" ", "").upper():
+            if key in KeypadPlugin.FUNCTION_KEYS and not entry:
+                selected_function = self.selectable_functions.get(key, KeypadPlugin.FN_NONE)
+                if selected_function == KeypadPlugin.FN_NONE:
+                    return None
+            elif key == KeypadPlugin.ENTER_KEY and entry:
+                value = "".join(entry)
+                if selected_function == KeypadPlugin.FN_MANUAL_STATION:
+                    valid = KeypadPlugin._parse_station_list(value) is not None
+                else:
+                    valid = selected_function != KeypadPlugin.FN_NONE and value.isdigit()
+                if not valid:
+                    return None
+                if selected_function == KeypadPlugin.FN_MANUAL_STATION and station_step is not None:
+                    # Each manual station step replaces the stations run by the previous one, so
+                    # consecutive station entries are merged into a single list, and station
+                    # entries separated by other steps are rejected
+                    if station_step != len(steps) - 1:
+                        return None
+                    entry = steps[station_step][1] + [KeypadPlugin.LIST_SEPARATOR] + entry
+                    if KeypadPlugin._parse_station_list("".join(entry)) is None:
+                        return None
+                    steps[station_step] = (selected_function, entry)
+                else:
+                    if selected_function == KeypadPlugin.FN_MANUAL_STATION:
+                        station_step = len(steps)
+                    steps.append((selected_function, entry))
+                selected_function = self.default_function
+                entry = []
+            elif (
+                key in KeypadPlugin.NUMBER_KEYS
+                or key in (KeypadPlugin.LIST_SEPARATOR, KeypadPlugin.RANGE_SEPARATOR)
+            ):
+                entry.append(key)
+            else:
+                return None
+        if entry:
+            # Entry not terminated with the enter key
+            return None
+        return steps
+
+    def _compile_macros(self):
+        """
+        Compiles all macros; invalid macros are reported and disabled
+        """
+        compiled_macros = {}
+        for function_key, keys in self.macros.items():
+            if keys:
+                steps = self._compile_macro(keys)
+                if steps:
+                    compiled_macros[function_key] = steps
+                else:
+                    print(u"Keypad plugin: Invalid macro for key %s: %s" % (function_key, keys))
+        self._compiled_macros = compiled_macros
+
+    def _execute_value_function(self, command_value, selected_function):
         """
         Executes the value function for the given value
+        Inputs: command_value - List of the digits entered
+                selected_function - The value function to execute (FN_*)
         """
         value = -1
         # Parse value
@@ -748,37 +1543,40 @@ class KeypadPlugin:
             value = int("".join(command_value))
         except ValueError:
             value = -1
-        # If function set to manual station or none, run manual station
+        # If function set to manual station or none, run manual station(s)
         if (
-            self.selected_function == KeypadPlugin.FN_MANUAL_STATION
-            or self.selected_function == KeypadPlugin.FN_NONE
+            selected_function == KeypadPlugin.FN_MANUAL_STATION
+            or selected_function == KeypadPlugin.FN_NONE
         ):
+            stationIDs = KeypadPlugin._parse_station_list("".join(command_value))
+            if stationIDs is None:
+                print(u"Keypad plugin: Invalid station list. Ignoring entry.")
+                return False
             if gv.sd["rd"] > 0:
                 print(u"Keypad plugin: Deactivating rain delay")
                 gv.sd["rd"] = 0
                 gv.sd["rdst"] = 0
                 jsave(gv.sd, "sd")
-            stationID = value
-            # Start station and provide feedback
-            return stationID >= 0 and KeypadPlugin._set_runonce_station(
-                stationID, self.keypad_manual_station_time_s
+            # Start stations and provide feedback
+            return KeypadPlugin._set_runonce_stations(
+                stationIDs, self.keypad_manual_station_time_s
             )
-        elif self.selected_function == KeypadPlugin.FN_MANUAL_PROGRAM:
+        elif selected_function == KeypadPlugin.FN_MANUAL_PROGRAM:
             programID = value
             # Execute program and provide feedback
             return programID >= 0 and KeypadPlugin._set_runonce_program(programID)
-        elif self.selected_function == KeypadPlugin.FN_WATER_LEVEL:
+        elif selected_function == KeypadPlugin.FN_WATER_LEVEL:
             water_level = value
             return water_level >= 0 and KeypadPlugin._set_water_level(water_level)
-        elif self.selected_function == KeypadPlugin.FN_MANUAL_STATION_TIME:
+        elif selected_function == KeypadPlugin.FN_MANUAL_STATION_TIME:
             manual_station_time = value * 60
             return manual_station_time > 0 and self._set_manual_station_time(
                 manual_station_time
             )
-        elif self.selected_function == KeypadPlugin.FN_RAIN_DELAY_TIME:
+        elif selected_function == KeypadPlugin.FN_RAIN_DELAY_TIME:
             rain_delay_time = value
             return rain_delay_time > 0 and self._set_rain_delay_time(rain_delay_time)
-        elif self.selected_function == KeypadPlugin.FN_START_RAIN_DELAY:
+        elif selected_function == KeypadPlugin.FN_START_RAIN_DELAY:
             # Actvate rain delay
             print(u"Keypad plugin: Activating rain delay for %d hours" % value)
             gv.sd["rd"] = value
@@ -792,6 +1590,32 @@ class KeypadPlugin:
             print(u"Keypad plugin: Keypad function not implemented")
             return False
 
+    def _on_value_function_complete(self, result):
+        """
+        Acknowledges the execution of a value function (called from the worker thread)
+        """
+        if result:
+            self._buzzer_signal.send(self.acknowledge_command_beep)  # Acknowledge execution
+        else:
+            self._sound_error()  # Nack for invalid station or exception
+
+    def _on_hold_function_complete(self, executionValue):
+        """
+        Sounds the result of a hold function (called from the worker thread)
+        """
+        if executionValue == KeypadPlugin.EXECUTE_COMPLETE:
+            # Executed
+            self._buzzer_signal.send(self.hold_function_executed_beep)
+        elif executionValue == KeypadPlugin.EXECUTE_TOGGLE_ON:
+            # Toggle On
+            self._buzzer_signal.send(self.hold_function_toggle_on_beep)
+        elif executionValue == KeypadPlugin.EXECUTE_TOGGLE_OFF:
+            # Toggle Off
+            self._buzzer_signal.send(self.hold_function_toggle_off_beep)
+        else:
+            # Something else
+            self._sound_error()
+
     def _function_key_down(self, function_key):
         if (
             function_key in self.hold_functions
@@ -801,188 +1625,220 @@ class KeypadPlugin:
             and self.selectable_functions[function_key] != KeypadPlugin.FN_NONE
         ):
             # This key has either a value function or a hold function!
-            self._buzzer_signal.send(self.button_pressed_beep)  # Acknowledge press
-            use_hold_fn = False
+            self._sound_button_pressed()  # Acknowledge press
             if (
                 function_key in self.hold_functions
                 and self.hold_functions[function_key] != KeypadPlugin.HLDFN_NONE
             ):
-                # There is a hold function assigned to this key; wait for up before deciding what to do
-                if (
-                    self._keypad.wait_for_key_char_up(
-                        function_key, self.key_hold_time_s, self._running
-                    )
-                    >= self.key_hold_time_s
-                ):
-                    # Key was held at least hold time; select the hold function
-                    use_hold_fn = True
-            if use_hold_fn:
-                # execute hold function
-                executionValue = self._execute_hold_function(function_key)
-                if executionValue == KeypadPlugin.EXECUTE_COMPLETE:
-                    # Executed
-                    self._buzzer_signal.send(self.hold_function_executed_beep)
-                elif executionValue == KeypadPlugin.EXECUTE_TOGGLE_ON:
-                    # Toggle On
-                    self._buzzer_signal.send(self.hold_function_toggle_on_beep)
-                elif executionValue == KeypadPlugin.EXECUTE_TOGGLE_OFF:
-                    # Toggle Off
-                    self._buzzer_signal.send(self.hold_function_toggle_off_beep)
-                else:
-                    # Something else
-                    self._buzzer_signal.send(self.error_beep)
-            else:
-                # Set value function
-                if not self._set_value_function(function_key):
-                    self._buzzer_signal.send(self.error_beep)
+                # There is a hold function assigned to this key; decide what to do once the key
+                # is either held or released
+                self._pending_function_key = function_key
+            elif not self._set_value_function(function_key):
+                self._sound_error()
         else:
             print(u"Keypad plugin: Nothing assigned to this key")
-            self._buzzer_signal.send(self.error_beep)
+            self._sound_error()
+
+    def _function_key_up(self, function_key):
+        # Key was released before the hold time; select the value function
+        if not self._set_value_function(function_key):
+            self._sound_error()
 
-    def _handle_value(self, first_key_down, down_keys):
-        # copy first button(s) pressed
-        function_value = []
-        if first_key_down is not None:
-            function_value = list(first_key_down)
+    def _start_entry(self, key):
+        self._entry = [key]
         # Only append this first value (not clear) if a function key was selected (not default)
-        self._display_entry_text(function_value, append=self._function_selected)
-        if len(function_value) > 0:
-            self._buzzer_signal.send(self.button_pressed_beep)  # Acknowledge first press
-        while self._running:
-            # wait for up to timeout value for next key
-            c = self._getc(down_keys, self.keypad_press_timeout_s)
-            if c is None:
-                # There was an error; go to top of loop to wait for ready
-                return False
-            elif len(c) == 0:
-                # Timeout occurred with no command
-                self._buzzer_signal.send(self.error_beep)  # Nack for timeout
-                function_value = []
-                self._display_cancel()
-                break
-            elif KeypadPlugin.ENTER_KEY in c:
-                # Execute command
-                if self._execute_value_function(function_value):
-                    self._buzzer_signal.send(
-                        self.acknowledge_command_beep
-                    )  # Acknowledge execution
-                else:
-                    self._buzzer_signal.send(
-                        self.error_beep
-                    )  # Nack for invalid station or exception
-                function_value = []
-                self._display_cancel()
-                # reset selected function to default
-                self._reset_selected_function()
-                break
-            elif KeypadPlugin.CANCEL_KEY in c:
-                # Canceled
-                self._buzzer_signal.send(self.cancel_beep)  # Nack for canceled
-                function_value = []
-                self._display_cancel()
-                break
-            elif len(function_value) + len(c) > KeypadPlugin.MAX_NUMBER_ENTRY:
-                # Too many numbers entered
-                print(u"Keypad plugin: Entered value is too large! Canceling...")
-                self._buzzer_signal.send(self.error_beep)  # Error
-                function_value = []
-                self._display_cancel()
-                break
-            else:
-                valid_key = True
-                for v in c:
-                    if (
-                        v not in KeypadPlugin.NUMBER_KEYS
-                    ):  # Only number keys are valid here
-                        # invlaid key!
-                        valid_key = False
-                        break
-                if valid_key:
-                    # Only save number and sound buzzer if function selected
-                    if self.selected_function != KeypadPlugin.FN_NONE:
-                        self._buzzer_signal.send(
-                            self.button_pressed_beep
-                        )  # Acknowledge press
-                        # append pressed key(s)
-                        for v in c:
-                            function_value.append(v)
-                        self._display_entry_text(function_value, append=True)
-                else:
-                    # Invalid key
-                    print(u"Keypad plugin: Invalid key! Canceling...")
-                    self._buzzer_signal.send(self.error_beep)
-                    function_value = []
-                    self._display_cancel()
-                    break
+        self._display_entry_text(self._entry, append=self._function_selected)
+        self._sound_button_pressed()  # Acknowledge first press
+
+    def _end_entry(self):
+        self._entry = None
+        self._display_cancel()
+        # reset selected function to default
+        self._reset_selected_function()
+
+    def _current_term(self):
+        """
+        Returns the numbers of the station list term being entered (split at the range separator)
+        """
+        term = "".join(self._entry).split(KeypadPlugin.LIST_SEPARATOR)[-1]
+        return term.split(KeypadPlugin.RANGE_SEPARATOR)
+
+    def _add_list_separator(self):
+        """
+        Appends a list separator after the number being entered into a station list
+        Returns: True if the separator was entered; False if the entry has no room for it
+        """
+        if (
+            self._entry[-1] not in KeypadPlugin.NUMBER_KEYS
+            or len(self._entry) >= KeypadPlugin.MAX_LIST_ENTRY
+        ):
+            return False
+        self._entry.append(KeypadPlugin.LIST_SEPARATOR)
         return True
 
-    def _get_first_function_key(self, c):
-        function_key = None
-        for v in c:
-            if v in KeypadPlugin.FUNCTION_KEYS:
-                function_key = v
-                break
-        return function_key
+    def _add_range_separator(self):
+        """
+        Turns the list separator which was just entered into a range separator
+        Returns: True if the separator was changed; False if the term is already a range
+        """
+        if self._entry[-1] != KeypadPlugin.LIST_SEPARATOR:
+            return False
+        self._entry.pop()
+        if len(self._current_term()) > 1:
+            self._entry.append(KeypadPlugin.LIST_SEPARATOR)
+            return False
+        self._entry.append(KeypadPlugin.RANGE_SEPARATOR)
+        return True
+
+    def _separator_key_event(self, event):
+        """
+        Handles the hold of a number key which was just entered into a station list: the first
+        held event adds a list separator, and holding for twice the hold time makes it a range
+        """
+        if event.type == KEY_HELD:
+            added = self._add_list_separator()
+        elif event.type == KEY_REPEAT and event.duration >= 2 * self.key_hold_time_s:
+            self._separator_key = None
+            added = self._add_range_separator()
+        else:
+            if event.type == KEY_UP:
+                self._separator_key = None
+            return
+        if added:
+            self._sound_button_pressed()  # Acknowledge separator
+            self._display_entry_text(self._entry, append=True)
+            self._update_deadline()
+        else:
+            # Separator not allowed here; the entry is kept as it is
+            self._separator_key = None
+            self._sound_error()
+
+    def _entry_key_down(self, key):
+        """
+        Handles a key pressed while a value is being entered
+        """
+        if key == KeypadPlugin.ENTER_KEY:
+            # Execute command on the worker; it is acknowledged once complete
+            self._worker.submit(self._execute_value_function,
+                                (self._entry, self.selected_function),
+                                self._on_value_function_complete)
+            self._end_entry()
+        elif key == KeypadPlugin.CANCEL_KEY:
+            # Canceled
+            self._buzzer_signal.send(self.cancel_beep)  # Nack for canceled
+            self._end_entry()
+        elif key not in KeypadPlugin.NUMBER_KEYS:
+            # Only number keys are valid here
+            print(u"Keypad plugin: Invalid key! Canceling...")
+            self._sound_error()
+            self._end_entry()
+        elif (
+            len(self._current_term()[-1]) >= KeypadPlugin.MAX_NUMBER_ENTRY
+            or len(self._entry) >= KeypadPlugin.MAX_LIST_ENTRY
+        ):
+            # Too many numbers entered
+            print(u"Keypad plugin: Entered value is too large! Canceling...")
+            self._sound_error()  # Error
+            self._end_entry()
+        else:
+            self._sound_button_pressed()  # Acknowledge press
+            self._entry.append(key)
+            self._display_entry_text(self._entry, append=True)
+
+    def _key_down(self, key):
+        if self._entry is not None:
+            self._entry_key_down(key)
+        elif key == KeypadPlugin.CANCEL_KEY:
+            # Cancel received; buzz for cancel and reset
+            self._buzzer_signal.send(self.cancel_beep)
+            self._reset_selected_function()
+            self._display_cancel()
+        elif key == KeypadPlugin.ENTER_KEY:
+            # No function or value with enter key pressed; just give press acknowledgement
+            self._sound_button_pressed()
+        elif key in KeypadPlugin.FUNCTION_KEYS:
+            self._function_key_down(key)
+        elif key in KeypadPlugin.NUMBER_KEYS and self.selected_function != KeypadPlugin.FN_NONE:
+            self._start_entry(key)
+        else:
+            self._reset_selected_function()
+
+    def _handle_key_event(self, event):
+        """
+        Advances the entry state machine with a key event
+        """
+        if event.type == KEY_DOWN:
+            self._ssd1306_wake_signal.send()  # Wake the display
+            self._key_down(event.key)
+            self._update_deadline()
+            if (
+                self._entry is not None
+                and self.selected_function == KeypadPlugin.FN_MANUAL_STATION
+                and self._entry[-1] == event.key
+            ):
+                # Number entered into a station list; holding it adds a separator
+                self._separator_key = event.key
+            else:
+                self._separator_key = None
+        elif event.key == self._separator_key:
+            if self._entry is None:
+                self._separator_key = None
+            else:
+                self._separator_key_event(event)
+        elif event.key == self._pending_function_key:
+            if event.type == KEY_HELD:
+                # Key was held at least hold time; execute the hold function on the worker
+                self._pending_function_key = None
+                self._worker.submit(self._execute_hold_function,
+                                    (event.key,),
+                                    self._on_hold_function_complete)
+            elif event.type == KEY_UP:
+                self._pending_function_key = None
+                self._function_key_up(event.key)
+                self._update_deadline()
+
+    def _handle_timeout(self):
+        """
+        Called when nothing (more) was entered before the key press timeout
+        """
+        self._entry = None
+        self._deadline = None
+        self._reset_selected_function()
+        self._sound_error()  # Nack for timeout
+        self._display_cancel()
+
+    def _update_deadline(self):
+        """
+        Restarts the key press timeout while a function is selected or a value is being entered
+        """
+        if self._entry is not None or self._function_selected:
+            self._deadline = monotonic() + self.keypad_press_timeout_s
+        else:
+            self._deadline = None
 
     def _reset_selected_function(self):
         self.selected_function = self.default_function
         self._function_selected = False
 
     def _keypad_plugin_task(self):
-        # Load settings from file
-        keypad_plugin.load_keypad_settings()
         # set selected function to default
         self._reset_selected_function()
+        self._entry = None
+        self._pending_function_key = None
+        self._separator_key = None
+        self._deadline = None
         while self._running:
             # Wait for hardware
             if not self._wait_for_ready():
                 break
-            #
-            down_keys = []
-            # First button press
-            if self._function_selected:
-                # User has selected a function; wait up until timeout for next key
-                c = self._getc(down_keys, self.keypad_press_timeout_s)
-                if len(c) == 0:
-                    # Timeout with nothing entered
-                    self._reset_selected_function()
-                    self._buzzer_signal.send(self.error_beep)
-                    self._display_cancel()
-                    continue
-            else:
-                # Wait indefinitely for key
-                c = self._getc(down_keys, -1)
-            if c is None or len(c) == 0:
-                # There was an error; go to top of loop to wait for ready
-                continue
-            elif KeypadPlugin.CANCEL_KEY in c:
-                # Cancel received
-                # buzz for cancel, reset, and go to next iteration
-                self._buzzer_signal.send(self.cancel_beep)
-                self._reset_selected_function()
-                self._display_cancel()
-            elif KeypadPlugin.ENTER_KEY in c:
-                # No function or value with enter key pressed
-                # Just give press acknowledgement
-                self._buzzer_signal.send(self.button_pressed_beep)
-            else:
-                # Check if function key was pressed
-                function_key = self._get_first_function_key(c)
-                if function_key is not None:
-                    self._function_key_down(function_key)
-                else:
-                    # Check if number key is pressed
-                    hasNumberKey = False
-                    for v in c:
-                        if v in KeypadPlugin.NUMBER_KEYS:
-                            hasNumberKey = True
-                            break
-                    # handle value if not number or selected function is not none
-                    if (not hasNumberKey) or (
-                        self.selected_function != KeypadPlugin.FN_NONE
-                    ):
-                        self._handle_value(c, down_keys)
-                    self._reset_selected_function()
+            timeout_s = None
+            if self._deadline is not None:
+                timeout_s = max(self._deadline - monotonic(), 0)
+            event = self._keypad.get_event(timeout_s)
+            if event is not None:
+                self._handle_key_event(event)
+            elif self._deadline is not None and monotonic() >= self._deadline:
+                self._handle_timeout()
         print(u"Keypad plugin: Exiting keypad task")
         return
 
@@ -992,10 +1848,14 @@ class KeypadPlugin:
         """
         if self._running and self._running_thread is not None:
             print(u"Keypad plugin: Run called when already running")
-        elif not self.init_pins():
-            print(u"Keypad plugin: Could not start keypad plugin: GPIO pins init failed")
+            return self._running
+        # Load settings from file first so that the configured backend is initialized
+        self.load_keypad_settings()
+        if not self.init_pins():
+            print(u"Keypad plugin: Could not start keypad plugin: keypad hardware init failed")
         else:
             self._set_running(True)
+            self._worker.start()
             self._running_thread = Thread(target=keypad_plugin._keypad_plugin_task)
             self._running_thread.start()
         return self._running
@@ -1010,7 +1870,8 @@ class KeypadPlugin:
             self._running_thread.join(0.5)
             if not self._running_thread.is_alive():
                 self._running_thread = None
-        return (self._running_thread is None)
+        worker_stopped = self._worker.stop()
+        return (self._running_thread is None and worker_stopped)
 
     @staticmethod
     def __button_list_to_string(l):
@@ -1040,6 +1901,7 @@ class KeypadPlugin:
     def load_from_dict(self, settings):
         self._set_default_settings()
         if settings is None:
+            self._apply_backend_settings()
             return
         if "mstationtime" in settings:
             self.keypad_manual_station_time_s = float(settings["mstationtime"]) * 60
@@ -1049,6 +1911,18 @@ class KeypadPlugin:
             self.rain_delay_hrs = float(settings["hrraindelay"])
         if "keyholdtime" in settings:
             self.key_hold_time_s = float(settings["keyholdtime"])
+            self._keypad.hold_time_s = self.key_hold_time_s
+        if settings.get("backend") in KeypadPlugin.BACKENDS:
+            self.keypad_backend = settings["backend"]
+        try:
+            if "i2caddr" in settings:
+                self.expander_i2c_addr = int(settings["i2caddr"], 0)
+            if "i2cbus" in settings:
+                self.expander_i2c_bus = int(settings["i2cbus"])
+            if "intpin" in settings:
+                self.expander_int_pin = int(settings["intpin"] or 0)
+        except ValueError:
+            print(u"Keypad plugin: Invalid port expander setting")
         if (
             "akeyfn" in settings
             and "bkeyfn" in settings
@@ -1076,6 +1950,10 @@ class KeypadPlugin:
         if "defaultfn" in settings:
             self.default_function = int(settings["defaultfn"])
             self._reset_selected_function()
+        for function_key in KeypadPlugin.FUNCTION_KEYS:
+            name = function_key.lower() + "macro"
+            if name in settings:
+                self.macros[function_key] = settings[name].replace(" ", "").upper()
         if "acknowledge_command_beep" in settings:
             self.acknowledge_command_beep = KeypadPlugin.__string_to_button_list(
                 settings["acknowledge_command_beep"]
@@ -1100,6 +1978,8 @@ class KeypadPlugin:
             self.hold_function_toggle_off_beep = KeypadPlugin.__string_to_button_list(
                 settings["hold_function_toggle_off_beep"]
             )
+        self._compile_macros()
+        self._apply_backend_settings()
         return
 
     def load_keypad_settings(self):
@@ -1109,6 +1989,7 @@ class KeypadPlugin:
                 self.load_from_dict(json.load(f))
         except:
             self._set_default_settings()
+            self._apply_backend_settings()
         return
 
     def save_keypad_settings(self):
@@ -1126,6 +2007,14 @@ class KeypadPlugin:
             "choldfn": str(self.hold_functions["C"]),
             "dholdfn": str(self.hold_functions["D"]),
             "defaultfn": str(self.default_function),
+            "amacro": self.macros["A"],
+            "bmacro": self.macros["B"],
+            "cmacro": self.macros["C"],
+            "dmacro": self.macros["D"],
+            "backend": self.keypad_backend,
+            "i2caddr": "0x{:02x}".format(self.expander_i2c_addr),
+            "i2cbus": str(self.expander_i2c_bus),
+            "intpin": str(self.expander_int_pin),
             "acknowledge_command_beep": KeypadPlugin.__button_list_to_string(
                 self.acknowledge_command_beep
             ),
@@ -0,0 +1,7 @@
+class signal:
+    def __init__(self, *args, **kwargs):
+        pass
+    def connect(self, *args, **kwargs):
+        pass
+    def send(self, *args, **kwargs):
+        return []
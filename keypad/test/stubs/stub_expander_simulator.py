@@ -0,0 +1,186 @@
+# Simulated I2C bus and port expander models which stand in for smbus/smbus2 so that the expander
+# keypad backend may be exercised without hardware. Keys connect a column pin to a row pin; a row
+# reads LOW while a pressed key connects it to a column which is driven LOW. Each model drives its
+# interrupt output through the int_output callback (called with the new level, active LOW).
+import errno
+import os
+
+class i2c_msg:
+    def __init__(self, addr, buf, read):
+        self.addr = addr
+        self.buf = bytearray(buf)
+        self.read_msg = read
+
+    def __len__(self):
+        return len(self.buf)
+
+    def __iter__(self):
+        return iter(self.buf)
+
+    @staticmethod
+    def write(address, buf):
+        return i2c_msg(address, buf, False)
+
+    @staticmethod
+    def read(address, length):
+        return i2c_msg(address, [0] * length, True)
+
+class SimulatedSMBus:
+    """
+    SMBus compatible bus which forwards transfers to attached expander models
+    """
+    def __init__(self, bus=None):
+        self.devices = {}
+        # Number of transactions on the bus
+        self.transaction_count = 0
+
+    def attach(self, addr, device):
+        self.devices[addr] = device
+        return device
+
+    def _get_device(self, addr):
+        self.transaction_count += 1
+        device = self.devices.get(addr)
+        if device is None:
+            raise IOError(errno.EREMOTEIO, os.strerror(errno.EREMOTEIO))
+        return device
+
+    def write_byte(self, i2c_addr, value):
+        self._get_device(i2c_addr).write([value])
+
+    def read_byte(self, i2c_addr):
+        return self._get_device(i2c_addr).read()
+
+    def write_byte_data(self, i2c_addr, register, value):
+        self._get_device(i2c_addr).write([register, value])
+
+    def read_byte_data(self, i2c_addr, register):
+        device = self._get_device(i2c_addr)
+        device.write([register])
+        return device.read()
+
+    def i2c_rdwr(self, *msgs):
+        self.transaction_count += 1
+        for msg in msgs:
+            device = self.devices.get(msg.addr)
+            if device is None:
+                raise IOError(errno.EREMOTEIO, os.strerror(errno.EREMOTEIO))
+            if msg.read_msg:
+                for i in range(len(msg.buf)):
+                    msg.buf[i] = device.read()
+            else:
+                device.write(list(msg.buf))
+
+class _KeypadExpander:
+    """
+    Base of the expander models: tracks the keys which are down and the interrupt output
+    """
+    def __init__(self):
+        # (column, row) of each key which is down
+        self.pressed = set()
+        self.int_output = None
+        self.int_level = 1
+        self.writes = []
+
+    def _set_int(self, level):
+        if level != self.int_level:
+            self.int_level = level
+            if self.int_output is not None:
+                self.int_output(level)
+
+    def _rows_low(self, columns_low):
+        """
+        Returns the row bits pulled LOW by pressed keys in the given columns
+        """
+        bits = 0
+        for (col, row) in self.pressed:
+            if columns_low & (1 << col):
+                bits |= 1 << row
+        return bits
+
+    def press(self, col, row):
+        self.pressed.add((col, row))
+        self._update_int()
+
+    def release(self, col, row):
+        self.pressed.discard((col, row))
+        self._update_int()
+
+class Pcf8574Keypad(_KeypadExpander):
+    """
+    Model of a PCF8574 with keypad columns on P0-P3 and rows on P4-P7. A pin written 1 is a weak
+    pull up and a pin written 0 is driven LOW. INT goes LOW when the port differs from what was
+    last read and is cleared by reading.
+    """
+    def __init__(self):
+        _KeypadExpander.__init__(self)
+        self.port = 0xFF
+        self._last_read = 0xFF
+
+    def _value(self):
+        columns_low = ~self.port & 0x0F
+        return self.port & ~(self._rows_low(columns_low) << 4) & 0xFF
+
+    def _update_int(self):
+        if self._value() != self._last_read:
+            self._set_int(0)
+
+    def write(self, buf):
+        self.writes.append(list(buf))
+        self.port = buf[-1]
+        self._last_read = self._value()
+        self._set_int(1)
+
+    def read(self):
+        self._last_read = self._value()
+        self._set_int(1)
+        return self._last_read
+
+class Mcp23017Keypad(_KeypadExpander):
+    """
+    Model of an MCP23017 (IOCON.BANK = 0) with keypad columns on GPA0-GPA3 and rows on GPB0-GPB3.
+    A column is driven LOW when its IODIRA bit is 0 and its OLATA bit is 0; rows read HIGH through
+    the GPPUB pull ups. INTB goes LOW when an enabled row changes and is cleared by reading GPIOB.
+    """
+    IODIRA = 0x00
+    GPINTENB = 0x05
+    GPPUB = 0x0D
+    GPIOB = 0x13
+    OLATA = 0x14
+
+    def __init__(self):
+        _KeypadExpander.__init__(self)
+        self.registers = bytearray(0x16)
+        self.registers[0x00] = 0xFF
+        self.registers[0x01] = 0xFF
+        self._pointer = 0
+        self._last_read = None
+
+    def _gpiob(self):
+        columns_low = ~self.registers[Mcp23017Keypad.IODIRA] & \
+            ~self.registers[Mcp23017Keypad.OLATA] & 0x0F
+        return self.registers[Mcp23017Keypad.GPPUB] & ~self._rows_low(columns_low) & 0xFF
+
+    def _update_int(self):
+        enabled = self.registers[Mcp23017Keypad.GPINTENB]
+        if self._last_read is not None and (self._gpiob() ^ self._last_read) & enabled:
+            self._set_int(0)
+
+    def write(self, buf):
+        self.writes.append(list(buf))
+        self._pointer = buf[0]
+        for value in buf[1:]:
+            self.registers[self._pointer] = value
+            self._pointer += 1
+        if len(buf) > 1:
+            self._update_int()
+
+    def read(self):
+        if self._pointer == Mcp23017Keypad.GPIOB:
+            self._last_read = self._gpiob()
+            self._set_int(1)
+            value = self._last_read
+        else:
+            value = self.registers[self._pointer]
+        self._pointer += 1
+        return value
@@ -0,0 +1,10 @@
+plugin_menu = []
+use_pigpio = False
+# Board pin to Broadcom GPIO number
+pin_map = {7: 4, 29: 5, 31: 6, 33: 13, 35: 19, 36: 16, 37: 26, 38: 20, 40: 21}
+now = 0
+sd = {u"nst": 16, u"nbrd": 2, u"rd": 0, u"rdst": 0, u"wl": 100, u"mm": 0, u"en": 1}
+pd = []
+ps = []
+rs = []
+rovals = []
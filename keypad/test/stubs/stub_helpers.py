@@ -0,0 +1,20 @@
+def jsave(*args, **kwargs):
+    pass
+
+def plugin_adjustment(*args, **kwargs):
+    pass
+
+def reboot(*args, **kwargs):
+    pass
+
+def restart(*args, **kwargs):
+    pass
+
+def schedule_stations(*args, **kwargs):
+    pass
+
+def stop_onrain(*args, **kwargs):
+    pass
+
+def stop_stations(*args, **kwargs):
+    pass
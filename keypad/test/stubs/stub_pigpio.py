@@ -0,0 +1,85 @@
+# Stand-in for the pigpio module which models a key matrix by Broadcom GPIO number, the same way
+# as stub_rpi_gpio: a row reads HIGH while a pressed key connects it to a column which is driven
+# HIGH.
+INPUT = 0
+OUTPUT = 1
+PUD_OFF = 0
+PUD_DOWN = 1
+PUD_UP = 2
+RISING_EDGE = 0
+FALLING_EDGE = 1
+EITHER_EDGE = 2
+
+class _Callback:
+    def __init__(self, pi, gpio, edge, func):
+        self._pi = pi
+        self.gpio = gpio
+        self.edge = edge
+        self.func = func
+
+    def cancel(self):
+        if self in self._pi.callbacks:
+            self._pi.callbacks.remove(self)
+
+class pi:
+    def __init__(self, *args, **kwargs):
+        self.connected = True
+        self.modes = {}
+        self.pulls = {}
+        self.outputs = {}
+        # Levels of bank 1 pins which aren't part of the matrix
+        self.other_bits = 0
+        # (column GPIO, row GPIO) of each key which is down
+        self.pressed = set()
+        self.callbacks = []
+        self.bank_reads = 0
+        self.reads = 0
+
+    def set_mode(self, gpio, mode):
+        self.modes[gpio] = mode
+        if mode == INPUT:
+            self.outputs.pop(gpio, None)
+
+    def set_pull_up_down(self, gpio, pud):
+        self.pulls[gpio] = pud
+
+    def write(self, gpio, level):
+        self.outputs[gpio] = level
+
+    def read(self, gpio):
+        self.reads += 1
+        return (self._levels() >> gpio) & 1
+
+    def read_bank_1(self):
+        self.bank_reads += 1
+        return self._levels()
+
+    def _levels(self):
+        bits = self.other_bits
+        for gpio, level in self.outputs.items():
+            if level:
+                bits |= 1 << gpio
+        for (col, row) in self.pressed:
+            if self.outputs.get(col):
+                bits |= 1 << row
+        return bits
+
+    def callback(self, gpio, edge=RISING_EDGE, func=None):
+        cb = _Callback(self, gpio, edge, func)
+        self.callbacks.append(cb)
+        return cb
+
+    def press(self, col, row):
+        """
+        Presses the key between a column GPIO and a row GPIO, calling any rising edge callback of
+        the row
+        """
+        was_high = (self._levels() >> row) & 1
+        self.pressed.add((col, row))
+        if not was_high and (self._levels() >> row) & 1:
+            for cb in list(self.callbacks):
+                if cb.gpio == row and cb.edge in (RISING_EDGE, EITHER_EDGE):
+                    cb.func(row, 1, 0)
+
+    def release(self, col, row):
+        self.pressed.discard((col, row))
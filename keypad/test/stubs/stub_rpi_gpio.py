@@ -0,0 +1,85 @@
+# Stand-in for RPi.GPIO which models a key matrix: a row input reads HIGH while a pressed key
+# connects it to a column which is driven HIGH. Inputs which are pulled up read HIGH unless a
+# test sets their level.
+BOARD = 10
+OUT = 0
+IN = 1
+LOW = 0
+HIGH = 1
+PUD_OFF = 20
+PUD_DOWN = 21
+PUD_UP = 22
+RISING = 31
+FALLING = 32
+
+# Level of each pin which is an output
+outputs = {}
+# Level set by a test for input pins which aren't part of the matrix
+levels = {}
+# (column pin, row pin) of each key which is down
+pressed = set()
+# Edge callbacks by pin: (edge, callback)
+event_callbacks = {}
+
+def reset():
+    outputs.clear()
+    levels.clear()
+    pressed.clear()
+    event_callbacks.clear()
+
+def setmode(mode):
+    pass
+
+def setup(pin, direction, pull_up_down=PUD_OFF):
+    if direction == OUT:
+        outputs[pin] = LOW
+    else:
+        outputs.pop(pin, None)
+        if pull_up_down == PUD_UP:
+            levels.setdefault(pin, HIGH)
+
+def output(pin, value):
+    outputs[pin] = value
+
+def input(pin):
+    for (col, row) in pressed:
+        if row == pin and outputs.get(col) == HIGH:
+            return HIGH
+    return levels.get(pin, LOW)
+
+def add_event_detect(pin, edge, callback=None, bouncetime=None):
+    if pin in event_callbacks:
+        raise RuntimeError(u"Conflicting edge detection already enabled for this GPIO channel")
+    event_callbacks[pin] = (edge, callback)
+
+def remove_event_detect(pin):
+    event_callbacks.pop(pin, None)
+
+def _edges(pins, previous):
+    for pin in pins:
+        if pin in event_callbacks:
+            (edge, callback) = event_callbacks[pin]
+            level = input(pin)
+            if level != previous[pin] and (edge == RISING) == (level == HIGH):
+                callback(pin)
+
+def press(col, row):
+    """
+    Presses the key between a column pin and a row pin, calling any edge callback of the row
+    """
+    previous = {row: input(row)}
+    pressed.add((col, row))
+    _edges([row], previous)
+
+def release(col, row):
+    previous = {row: input(row)}
+    pressed.discard((col, row))
+    _edges([row], previous)
+
+def set_level(pin, level):
+    """
+    Sets the level read from an input pin, calling any edge callback of the pin
+    """
+    previous = {pin: input(pin)}
+    levels[pin] = level
+    _edges([pin], previous)
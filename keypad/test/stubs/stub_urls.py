@@ -0,0 +1 @@
+urls = []
@@ -0,0 +1,96 @@
+import threading
+import unittest
+from unittest.mock import Mock
+# This will stub sip and pi-specific things out
+import keypad_test_base
+# Now that things have been stubbed out, keypad may be imported
+import keypad
+from keypad import CommandWorker, KeypadPlugin
+
+# Make sure the plugin thread stops right away
+keypad.keypad_plugin.stop()
+
+class TestCommandWorker(unittest.TestCase):
+    def setUp(self):
+        self.worker = CommandWorker()
+        self.worker.start()
+        self.addCleanup(self.worker.stop, 1.0)
+
+    def test_order_and_results(self):
+        executed = []
+        results = []
+        for i in range(5):
+            self.worker.submit(lambda i: executed.append(i) or i * 2, (i,), results.append)
+        self.assertTrue(self.worker.stop(1.0))
+        self.assertEqual(list(range(5)), executed)
+        self.assertEqual([0, 2, 4, 6, 8], results)
+
+    def test_exception(self):
+        results = []
+        def fail():
+            raise RuntimeError(u"failed")
+        self.worker.submit(fail, on_complete=results.append)
+        # A failing command or completion callback doesn't stop later commands
+        self.worker.submit(lambda: True, on_complete=Mock(side_effect=RuntimeError(u"failed")))
+        self.worker.submit(lambda: True, on_complete=results.append)
+        self.assertTrue(self.worker.stop(1.0))
+        self.assertEqual([None, True], results)
+
+    def test_submit_does_not_block(self):
+        release = threading.Event()
+        done = threading.Event()
+        self.worker.submit(release.wait, (1.0,))
+        self.worker.submit(done.set)
+        # The caller continues while the first command is still running
+        self.assertFalse(done.is_set())
+        release.set()
+        self.assertTrue(done.wait(1.0))
+
+    def test_restart(self):
+        self.assertTrue(self.worker.stop(1.0))
+        self.assertTrue(self.worker.stop(1.0))
+        results = []
+        self.worker.submit(lambda: 1, on_complete=results.append)
+        self.worker.start()
+        self.worker.start()
+        self.assertTrue(self.worker.stop(1.0))
+        self.assertEqual([1], results)
+
+    def test_stop_timeout(self):
+        release = threading.Event()
+        self.worker.submit(release.wait, (1.0,))
+        self.assertFalse(self.worker.stop(0.01))
+        release.set()
+        self.assertTrue(self.worker.stop(1.0))
+
+class TestCommandAcknowledgement(unittest.TestCase):
+    def setUp(self):
+        self.plugin = KeypadPlugin()
+        self.plugin._buzzer_signal = Mock()
+
+    def test_value_function(self):
+        self.plugin._on_value_function_complete(True)
+        self.plugin._buzzer_signal.send.assert_called_once_with(
+            self.plugin.acknowledge_command_beep)
+        self.plugin._buzzer_signal.reset_mock()
+        self.plugin._on_value_function_complete(None)
+        self.plugin._buzzer_signal.send.assert_called_once_with(
+            self.plugin.error_beep, priority=KeypadPlugin.BEEP_PRIORITY_HIGH)
+
+    def test_hold_function(self):
+        for (result, beep) in [(KeypadPlugin.EXECUTE_COMPLETE,
+                                self.plugin.hold_function_executed_beep),
+                               (KeypadPlugin.EXECUTE_TOGGLE_ON,
+                                self.plugin.hold_function_toggle_on_beep),
+                               (KeypadPlugin.EXECUTE_TOGGLE_OFF,
+                                self.plugin.hold_function_toggle_off_beep)]:
+            self.plugin._buzzer_signal.reset_mock()
+            self.plugin._on_hold_function_complete(result)
+            self.plugin._buzzer_signal.send.assert_called_once_with(beep)
+        self.plugin._buzzer_signal.reset_mock()
+        self.plugin._on_hold_function_complete(None)
+        self.plugin._buzzer_signal.send.assert_called_once_with(
+            self.plugin.error_beep, priority=KeypadPlugin.BEEP_PRIORITY_HIGH)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+from unittest.mock import Mock, patch
+# This will stub sip and pi-specific things out
+import keypad_test_base
+# Now that things have been stubbed out, keypad may be imported
+import gv
+import stub_pigpio
+import stub_rpi_gpio as GPIO
+import keypad
+from keypad import (GpioKeypadBackend, ScanningKeypad, KEYPAD_INDICES, KEYPAD_KEY_LIST,
+                    KEYPAD_PIN_COLUMNS, KEYPAD_PIN_ROWS)
+
+# Make sure the plugin thread stops right away
+keypad.keypad_plugin.stop()
+
+def key_mask(*chars):
+    mask = 0
+    for char in chars:
+        mask |= 1 << KEYPAD_KEY_LIST.index(char)
+    return mask
+
+class TestGpioBackendPigpio(unittest.TestCase):
+    def setUp(self):
+        self.pi = stub_pigpio.pi()
+        for patcher in [patch.object(gv, 'use_pigpio', True),
+                        patch('keypad.pigpio', stub_pigpio, create=True),
+                        patch('keypad.pi', self.pi, create=True),
+                        patch('keypad.sleep')]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.backend = GpioKeypadBackend(KEYPAD_PIN_COLUMNS, KEYPAD_PIN_ROWS)
+        self.keypad = ScanningKeypad(self.backend, KEYPAD_INDICES, KEYPAD_KEY_LIST)
+        self.keypad._event_signal = Mock()
+        self.assertTrue(self.keypad._init_pins())
+        self.addCleanup(self.keypad._cancel_edge_detection)
+
+    def press(self, col, row):
+        self.pi.press(gv.pin_map[KEYPAD_PIN_COLUMNS[col]], gv.pin_map[KEYPAD_PIN_ROWS[row]])
+
+    def test_row_bits(self):
+        self.assertEqual([1 << gv.pin_map[v] for v in KEYPAD_PIN_ROWS], self.backend.row_bits)
+        for v in KEYPAD_PIN_ROWS:
+            self.assertEqual(stub_pigpio.INPUT, self.pi.modes[gv.pin_map[v]])
+            self.assertEqual(stub_pigpio.PUD_DOWN, self.pi.pulls[gv.pin_map[v]])
+
+    def test_one_bank_read_per_column(self):
+        self.keypad._sample()
+        self.assertEqual(len(KEYPAD_PIN_COLUMNS), self.pi.bank_reads)
+        self.assertEqual(0, self.pi.reads)
+
+    def test_decode(self):
+        self.assertEqual(0, self.keypad._sample())
+        # 5 (C2 R2), 8 (C2 R3), and # (C3 R4)
+        self.press(1, 1)
+        self.press(1, 2)
+        self.press(2, 3)
+        self.assertEqual(key_mask(u"5", u"8", u"#"), self.keypad._sample())
+
+    def test_other_bank_bits_ignored(self):
+        # Levels of other pins in the bank, including the columns themselves, are masked out
+        self.pi.other_bits = 0xFFFFFFFF
+        for v in KEYPAD_PIN_ROWS:
+            self.pi.other_bits &= ~(1 << gv.pin_map[v])
+        self.assertEqual(0, self.keypad._sample())
+        self.press(3, 0)
+        self.assertEqual(key_mask(u"A"), self.keypad._sample())
+
+    def test_key_tables(self):
+        tables = self.keypad._key_tables
+        self.assertEqual(len(KEYPAD_PIN_COLUMNS), len(tables))
+        for table in tables:
+            self.assertEqual(1 << len(KEYPAD_PIN_ROWS), len(table))
+        all_rows = 0
+        for row_bit in self.backend.row_bits:
+            all_rows |= row_bit
+        self.assertEqual(key_mask(u"1", u"4", u"7", u"*"), tables[0][all_rows])
+
+    def test_edge_callbacks(self):
+        self.assertTrue(self.keypad._edge_detection)
+        self.assertEqual(sorted([gv.pin_map[v] for v in KEYPAD_PIN_ROWS]),
+                         sorted([cb.gpio for cb in self.pi.callbacks]))
+        self.assertFalse(self.keypad._wait_for_edge(0.01))
+        self.press(0, 0)
+        self.assertTrue(self.keypad._edge_event.is_set())
+        self.keypad._cancel_edge_detection()
+        self.assertEqual([], self.pi.callbacks)
+
+class TestGpioBackendRpiGpio(unittest.TestCase):
+    def setUp(self):
+        GPIO.reset()
+        patcher = patch('keypad.sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.backend = GpioKeypadBackend(KEYPAD_PIN_COLUMNS, KEYPAD_PIN_ROWS)
+        self.keypad = ScanningKeypad(self.backend, KEYPAD_INDICES, KEYPAD_KEY_LIST)
+        self.keypad._event_signal = Mock()
+        self.assertTrue(self.keypad._init_pins())
+        self.addCleanup(self.keypad._cancel_edge_detection)
+
+    def test_row_bits(self):
+        self.assertEqual([1, 2, 4, 8], self.backend.row_bits)
+
+    def test_decode(self):
+        self.assertEqual(0, self.keypad._sample())
+        GPIO.pressed.add((KEYPAD_PIN_COLUMNS[0], KEYPAD_PIN_ROWS[0]))
+        GPIO.pressed.add((KEYPAD_PIN_COLUMNS[3], KEYPAD_PIN_ROWS[3]))
+        GPIO.pressed.add((KEYPAD_PIN_COLUMNS[1], KEYPAD_PIN_ROWS[3]))
+        self.assertEqual(key_mask(u"1", u"D", u"0"), self.keypad._sample())
+
+    def test_one_column_driven(self):
+        self.keypad._sample()
+        # Only the last column scanned is left driven; the others float
+        self.assertEqual({KEYPAD_PIN_COLUMNS[-1]: GPIO.HIGH}, GPIO.outputs)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import threading
+import unittest
+from unittest.mock import Mock, patch
+# This will stub sip and pi-specific things out
+import keypad_test_base
+# Now that things have been stubbed out, keypad may be imported
+import gv
+import stub_expander_simulator
+import stub_pigpio
+import stub_rpi_gpio as GPIO
+from stub_expander_simulator import SimulatedSMBus, Pcf8574Keypad, Mcp23017Keypad
+import keypad
+from keypad import (KeypadBackend, ExpanderKeypadBackend, ScanningKeypad, KEYPAD_INDICES,
+                    KEYPAD_KEY_LIST)
+
+# Make sure the plugin thread stops right away
+keypad.keypad_plugin.stop()
+
+# Board pin wired to the expander's interrupt output
+INT_PIN = 7
+
+class TestKeypadBackend(unittest.TestCase):
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            KeypadBackend(4, 4)
+        class PartialBackend(KeypadBackend):
+            def init(self):
+                pass
+        with self.assertRaises(TypeError):
+            PartialBackend(4, 4)
+
+class ExpanderTestBase:
+    """
+    Tests shared by both expanders; subclasses set CHIP and DEVICE_CLASS
+    """
+    ADDR = 0x20
+
+    def setUp(self):
+        GPIO.reset()
+        self.bus = SimulatedSMBus()
+        self.device = self.bus.attach(self.ADDR, self.DEVICE_CLASS())
+        patcher = patch('keypad.smbus.SMBus', return_value=self.bus)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_keypad(self, int_pin=None, rdwr=False):
+        if rdwr:
+            patcher = patch('keypad.i2c_msg', stub_expander_simulator.i2c_msg)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.backend = ExpanderKeypadBackend(self.CHIP, self.ADDR, int_pin=int_pin)
+        self.keypad = ScanningKeypad(self.backend, KEYPAD_INDICES, KEYPAD_KEY_LIST)
+        self.keypad._event_signal = Mock()
+        self.assertTrue(self.keypad._init_pins())
+        self.addCleanup(self.keypad._cancel_edge_detection)
+        self.device.writes = []
+        self.bus.transaction_count = 0
+
+    def test_decode(self):
+        self.make_keypad()
+        self.assertEqual([0, 0, 0, 0], self.backend.read_matrix())
+        self.device.press(1, 2)
+        self.device.press(3, 0)
+        self.device.press(3, 3)
+        self.assertEqual([0, 0x04, 0, 0x09], self.backend.read_matrix())
+        self.assertEqual((1 << KEYPAD_KEY_LIST.index(u"8")) |
+                         (1 << KEYPAD_KEY_LIST.index(u"A")) |
+                         (1 << KEYPAD_KEY_LIST.index(u"D")), self.keypad._sample())
+
+    def test_decode_rdwr(self):
+        self.make_keypad(rdwr=True)
+        self.device.press(0, 1)
+        self.device.press(2, 1)
+        self.assertEqual([0x02, 0, 0x02, 0], self.backend.read_matrix())
+        # The whole matrix is read in one transaction
+        self.assertEqual(1, self.bus.transaction_count)
+
+    def test_no_device(self):
+        self.bus.devices.clear()
+        self.backend = ExpanderKeypadBackend(self.CHIP, self.ADDR)
+        self.keypad = ScanningKeypad(self.backend, KEYPAD_INDICES, KEYPAD_KEY_LIST)
+        self.assertFalse(self.keypad._init_pins())
+
+    def test_no_interrupt_pin(self):
+        self.make_keypad()
+        self.assertFalse(self.keypad._edge_detection)
+        self.assertEqual({}, GPIO.event_callbacks)
+
+    def test_interrupt(self):
+        self.device.int_output = lambda level: GPIO.set_level(INT_PIN, level)
+        self.make_keypad(int_pin=INT_PIN)
+        self.assertTrue(self.keypad._edge_detection)
+        self.assertEqual(GPIO.FALLING, GPIO.event_callbacks[INT_PIN][0])
+        self.assertEqual(GPIO.HIGH, GPIO.input(INT_PIN))
+        result = []
+        thread = threading.Thread(target=lambda: result.append(self.keypad._wait_for_edge(5.0)))
+        thread.start()
+        thread.join(0.05)
+        self.assertTrue(thread.is_alive())
+        self.device.press(1, 1)
+        thread.join(1.0)
+        self.assertEqual([True], result)
+        self.assertEqual(GPIO.LOW, GPIO.input(INT_PIN))
+        # Checking for keys reads the rows, which clears the interrupt
+        self.assertTrue(self.backend.any_key_down())
+        self.assertEqual(GPIO.HIGH, GPIO.input(INT_PIN))
+
+    def test_interrupt_pigpio(self):
+        pi = stub_pigpio.pi()
+        with patch.object(gv, 'use_pigpio', True),\
+            patch('keypad.pigpio', stub_pigpio, create=True),\
+            patch('keypad.pi', pi, create=True)\
+        :
+            self.make_keypad(int_pin=INT_PIN)
+            self.assertTrue(self.keypad._edge_detection)
+            self.assertEqual(stub_pigpio.PUD_UP, pi.pulls[gv.pin_map[INT_PIN]])
+            self.assertEqual([(gv.pin_map[INT_PIN], stub_pigpio.FALLING_EDGE)],
+                             [(cb.gpio, cb.edge) for cb in pi.callbacks])
+            self.keypad._cancel_edge_detection()
+            self.assertEqual([], pi.callbacks)
+
+class TestPcf8574Backend(ExpanderTestBase, unittest.TestCase):
+    CHIP = ExpanderKeypadBackend.PCF8574
+    DEVICE_CLASS = Pcf8574Keypad
+
+    def test_init(self):
+        self.backend = ExpanderKeypadBackend(self.CHIP, self.ADDR)
+        self.backend.init()
+        # All pins are released to their pull ups
+        self.assertEqual([[0xFF]], self.device.writes)
+
+    def test_column_select(self):
+        self.make_keypad()
+        self.backend.read_matrix()
+        self.assertEqual([[0xFE], [0xFD], [0xFB], [0xF7]], self.device.writes)
+        # Each column is written then the port is read back
+        self.assertEqual(8, self.bus.transaction_count)
+
+    def test_enter_idle(self):
+        self.make_keypad()
+        self.backend.enter_idle()
+        self.assertEqual(0xF0, self.device.port)
+        self.device.press(2, 3)
+        self.assertTrue(self.backend.any_key_down())
+
+class TestMcp23017Backend(ExpanderTestBase, unittest.TestCase):
+    CHIP = ExpanderKeypadBackend.MCP23017
+    DEVICE_CLASS = Mcp23017Keypad
+
+    def test_init(self):
+        self.backend = ExpanderKeypadBackend(self.CHIP, self.ADDR)
+        self.backend.init()
+        self.assertEqual([[0x0A, 0x44], [0x14, 0x00], [0x00, 0xFF], [0x01, 0xFF], [0x0D, 0x0F],
+                          [0x09, 0x00], [0x05, 0x0F]], self.device.writes)
+
+    def test_column_select(self):
+        self.make_keypad(rdwr=True)
+        self.backend.read_matrix()
+        # Each column is made the only output, then GPIOB is addressed and read
+        self.assertEqual([[0x00, 0xFE], [0x13], [0x00, 0xFD], [0x13], [0x00, 0xFB], [0x13],
+                          [0x00, 0xF7], [0x13]], self.device.writes)
+
+    def test_enter_idle(self):
+        self.make_keypad()
+        self.backend.enter_idle()
+        self.assertEqual(0xF0, self.device.registers[Mcp23017Keypad.IODIRA])
+        self.device.press(2, 3)
+        self.assertTrue(self.backend.any_key_down())
+
+if __name__ == '__main__':
+    unittest.main()
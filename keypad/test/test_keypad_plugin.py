@@ -0,0 +1,140 @@
+import unittest
+from unittest.mock import Mock, patch
+# This will stub sip and pi-specific things out
+import keypad_test_base
+# Now that things have been stubbed out, keypad may be imported
+import keypad
+from keypad import KeypadPlugin, KeyEvent, KEY_DOWN, KEY_UP, KEY_HELD, KEY_REPEAT
+
+# Make sure the plugin thread stops right away
+keypad.keypad_plugin.stop()
+
+class TestKeypadPluginParsing(unittest.TestCase):
+    def setUp(self):
+        self.plugin = KeypadPlugin()
+
+    def test_parse_station_list(self):
+        self.assertEqual([1, 3, 5, 6, 7, 8], KeypadPlugin._parse_station_list(u"1,3,5-8"))
+        self.assertEqual([0], KeypadPlugin._parse_station_list(u"0"))
+        self.assertEqual([4], KeypadPlugin._parse_station_list(u"4-4"))
+        self.assertEqual([2, 3], KeypadPlugin._parse_station_list(u"3,2,3"))
+        # Descending ranges
+        self.assertIsNone(KeypadPlugin._parse_station_list(u"5-3"))
+        # Stop all can't be combined with other stations
+        self.assertIsNone(KeypadPlugin._parse_station_list(u"1,0"))
+        self.assertIsNone(KeypadPlugin._parse_station_list(u"0-2"))
+        # Unterminated or empty terms
+        self.assertIsNone(KeypadPlugin._parse_station_list(u"5-"))
+        self.assertIsNone(KeypadPlugin._parse_station_list(u"1,"))
+        self.assertIsNone(KeypadPlugin._parse_station_list(u"1-2-3"))
+        self.assertIsNone(KeypadPlugin._parse_station_list(u""))
+
+    def test_compile_macro(self):
+        self.assertEqual(
+            [(KeypadPlugin.FN_MANUAL_STATION, list(u"1,3,5-8")),
+             (KeypadPlugin.FN_WATER_LEVEL, list(u"80"))],
+            self.plugin._compile_macro(u"a1,3,5-8# C80#")
+        )
+        # The default function is used without a function key
+        self.assertEqual([(KeypadPlugin.FN_MANUAL_STATION, [u"2"])],
+                         self.plugin._compile_macro(u"2#"))
+        self.assertIsNone(self.plugin._compile_macro(u"A5-3#"))
+        self.assertIsNone(self.plugin._compile_macro(u"A1,0#"))
+        # Station lists only work with manual station
+        self.assertIsNone(self.plugin._compile_macro(u"C1,2#"))
+        # Unterminated entries
+        self.assertIsNone(self.plugin._compile_macro(u"A12"))
+        self.assertIsNone(self.plugin._compile_macro(u"A1#5"))
+        # Keys which can't be part of a macro
+        self.assertIsNone(self.plugin._compile_macro(u"A1*#"))
+        self.assertEqual([], self.plugin._compile_macro(u""))
+
+    def test_compile_macro_station_steps(self):
+        # Consecutive station entries are merged since each one replaces the stations running
+        self.assertEqual(
+            [(KeypadPlugin.FN_MANUAL_STATION, list(u"1,3,5-8")),
+             (KeypadPlugin.FN_WATER_LEVEL, list(u"80"))],
+            self.plugin._compile_macro(u"A1#A3#5-8#C80#")
+        )
+        self.assertEqual(
+            [(KeypadPlugin.FN_WATER_LEVEL, list(u"80")),
+             (KeypadPlugin.FN_MANUAL_STATION, list(u"2,4"))],
+            self.plugin._compile_macro(u"C80#A2#A4#")
+        )
+        # Stop all can't be merged with other stations
+        self.assertIsNone(self.plugin._compile_macro(u"A1#A0#"))
+        # Station entries separated by another step
+        self.assertIsNone(self.plugin._compile_macro(u"A1#C80#A2#"))
+
+    def test_run_macro(self):
+        self.plugin.macros[u"B"] = u"A1#A3-4#C80#"
+        self.plugin._compile_macros()
+        with patch.object(KeypadPlugin, '_set_runonce_stations', return_value=True) as stations,\
+            patch.object(KeypadPlugin, '_set_water_level', return_value=True) as water_level\
+        :
+            self.assertEqual(KeypadPlugin.EXECUTE_COMPLETE, self.plugin._run_macro(u"B"))
+        stations.assert_called_once_with([1, 3, 4], self.plugin.keypad_manual_station_time_s)
+        water_level.assert_called_once_with(80)
+
+class TestKeypadPluginEntry(unittest.TestCase):
+    def setUp(self):
+        self.plugin = KeypadPlugin()
+        self.plugin._buzzer_signal = Mock()
+        self.plugin._ssd1306_wake_signal = Mock()
+        self.plugin._ssd1306_display_signal = Mock()
+        self.plugin._worker = Mock()
+        self.plugin._entry = None
+        self.plugin._pending_function_key = None
+        self.plugin._separator_key = None
+        self.plugin._deadline = None
+
+    def tap(self, keys):
+        for key in keys:
+            self.plugin._handle_key_event(KeyEvent(KEY_DOWN, key, 0.0, 0.0))
+            self.plugin._handle_key_event(KeyEvent(KEY_UP, key, 0.1, 0.1))
+
+    def hold(self, key, duration):
+        hold_time = self.plugin.key_hold_time_s
+        self.plugin._handle_key_event(KeyEvent(KEY_DOWN, key, 0.0, 0.0))
+        self.plugin._handle_key_event(KeyEvent(KEY_HELD, key, hold_time, hold_time))
+        repeat_time = hold_time + 0.25
+        while repeat_time <= duration:
+            self.plugin._handle_key_event(KeyEvent(KEY_REPEAT, key, repeat_time, repeat_time))
+            repeat_time += 0.25
+        self.plugin._handle_key_event(KeyEvent(KEY_UP, key, duration, duration))
+
+    def submitted_value(self):
+        return self.plugin._worker.submit.call_args[0][1]
+
+    def test_station_list(self):
+        self.hold(u"1", 1.1)
+        self.hold(u"3", 1.1)
+        self.hold(u"5", 2.1)
+        self.tap(u"8#")
+        self.assertEqual((list(u"1,3,5-8"), KeypadPlugin.FN_MANUAL_STATION),
+                         self.submitted_value())
+
+    def test_cancel_is_immediate(self):
+        self.tap(u"13")
+        self.plugin._handle_key_event(KeyEvent(KEY_DOWN, u"*", 0.0, 0.0))
+        self.assertIsNone(self.plugin._entry)
+        self.plugin._buzzer_signal.send.assert_called_with(self.plugin.cancel_beep)
+        self.plugin._handle_key_event(KeyEvent(KEY_UP, u"*", 0.1, 0.1))
+        self.tap(u"2#")
+        self.assertEqual(([u"2"], KeypadPlugin.FN_MANUAL_STATION), self.submitted_value())
+
+    def test_second_range_rejected(self):
+        self.hold(u"5", 2.1)
+        self.hold(u"8", 2.1)
+        # The entry is kept; only the range separator is refused
+        self.assertEqual(list(u"5-8,"), self.plugin._entry)
+        self.plugin._buzzer_signal.send.assert_called_with(
+            self.plugin.error_beep, priority=KeypadPlugin.BEEP_PRIORITY_HIGH)
+
+    def test_hold_outside_station_entry(self):
+        self.tap(u"C")
+        self.hold(u"5", 2.1)
+        self.assertEqual([u"5"], self.plugin._entry)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+import threading
+import unittest
+from unittest.mock import Mock, patch
+# This will stub sip and pi-specific things out
+import keypad_test_base
+# Now that things have been stubbed out, keypad may be imported
+import stub_rpi_gpio as GPIO
+import keypad
+from keypad import (GpioKeypadBackend, SimulatedKeypadBackend, ScanningKeypad, KeyEvent,
+                    KEYPAD_INDICES, KEYPAD_KEY_LIST, KEYPAD_PIN_COLUMNS, KEYPAD_PIN_ROWS,
+                    KEY_DOWN, KEY_UP, KEY_HELD, KEY_REPEAT)
+
+# Make sure the plugin thread stops right away
+keypad.keypad_plugin.stop()
+
+# Column and row of the 5 key
+KEY_5 = (1, 1)
+# Column and row pins of the 5 key
+PINS_5 = (KEYPAD_PIN_COLUMNS[1], KEYPAD_PIN_ROWS[1])
+
+class TestDebouncer(unittest.TestCase):
+    def setUp(self):
+        self.backend = SimulatedKeypadBackend()
+        self.keypad = ScanningKeypad(self.backend, KEYPAD_INDICES, KEYPAD_KEY_LIST,
+                                     hold_time_s=1.0, repeat_interval_s=0.25)
+        self.keypad._event_signal = Mock()
+        self.assertTrue(self.keypad._init_pins())
+        self.now = 100.0
+        patcher = patch('keypad.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def scan(self, count=1, step=ScanningKeypad.SCAN_INTERVAL_S):
+        events = []
+        for _ in range(count):
+            self.now += step
+            self.keypad.scan()
+            events.extend(self.keypad._events)
+            self.keypad._events.clear()
+        return [(event.type, event.key) for event in events]
+
+    def test_debounce(self):
+        self.backend.press(*KEY_5)
+        self.assertEqual([], self.scan(ScanningKeypad.DEBOUNCE_SAMPLES - 1))
+        self.assertEqual([(KEY_DOWN, u"5")], self.scan())
+        # A bounce shorter than the debounce samples doesn't release the key
+        self.backend.release(*KEY_5)
+        self.assertEqual([], self.scan(ScanningKeypad.DEBOUNCE_SAMPLES - 1))
+        self.backend.press(*KEY_5)
+        self.assertEqual([], self.scan(ScanningKeypad.DEBOUNCE_SAMPLES))
+        self.backend.release(*KEY_5)
+        self.assertEqual([(KEY_UP, u"5")], self.scan(ScanningKeypad.DEBOUNCE_SAMPLES))
+
+    def test_noise_ignored(self):
+        for _ in range(10):
+            self.backend.press(*KEY_5)
+            self.assertEqual([], self.scan())
+            self.backend.release(*KEY_5)
+            self.assertEqual([], self.scan())
+
+    def test_multiple_keys(self):
+        self.backend.press(*KEY_5)
+        self.backend.press(0, 3)
+        self.assertEqual([(KEY_DOWN, u"5"), (KEY_DOWN, u"*")],
+                         self.scan(ScanningKeypad.DEBOUNCE_SAMPLES))
+        self.backend.release(*KEY_5)
+        self.assertEqual([(KEY_UP, u"5")], self.scan(ScanningKeypad.DEBOUNCE_SAMPLES))
+
+    def test_hold_and_repeat(self):
+        self.backend.press(*KEY_5)
+        self.scan(ScanningKeypad.DEBOUNCE_SAMPLES)
+        self.assertEqual([], self.scan(step=0.5))
+        self.assertEqual([(KEY_HELD, u"5")], self.scan(step=0.5))
+        self.assertEqual([(KEY_REPEAT, u"5")], self.scan(step=0.25))
+        self.assertEqual([(KEY_REPEAT, u"5")], self.scan(step=0.25))
+        self.backend.release(*KEY_5)
+        self.now += 0.1
+        self.keypad.scan()
+        self.keypad.scan()
+        self.keypad.scan()
+        event = self.keypad._events[-1]
+        self.assertEqual(KEY_UP, event.type)
+        self.assertAlmostEqual(1.6, event.duration)
+
+    def test_repeat_disabled(self):
+        self.keypad.repeat_interval_s = 0
+        self.backend.press(*KEY_5)
+        self.scan(ScanningKeypad.DEBOUNCE_SAMPLES)
+        self.assertEqual([(KEY_HELD, u"5")], self.scan(step=1.0))
+        self.assertEqual([], self.scan(4, step=1.0))
+
+    def test_get_event(self):
+        self.backend.press(*KEY_5)
+        self.scan(ScanningKeypad.DEBOUNCE_SAMPLES - 1)
+        self.now += ScanningKeypad.SCAN_INTERVAL_S
+        self.keypad.scan()
+        event = self.keypad.get_event(0)
+        self.assertEqual(KeyEvent(KEY_DOWN, u"5", self.now, 0.0), event)
+        self.keypad._event_signal.send.assert_called_once_with(u"keypad", event=event)
+        self.assertIsNone(self.keypad.get_event(0))
+
+    def test_event_queue_limit(self):
+        for i in range(ScanningKeypad.MAX_QUEUED_EVENTS + 1):
+            self.keypad._queue_event(KEY_REPEAT, 5, self.now + i)
+        # The oldest event is dropped
+        self.assertEqual(ScanningKeypad.MAX_QUEUED_EVENTS, len(self.keypad._events))
+        self.assertEqual(self.now + 1, self.keypad._events[0].time)
+
+    def test_getc(self):
+        self.backend.press(*KEY_5)
+        down_keys = [False] * len(KEYPAD_KEY_LIST)
+        with patch('keypad.sleep'):
+            self.assertEqual([u"5"], self.keypad.getc(down_keys, timeout_s=1.0))
+        self.assertEqual([i == 5 for i in range(len(KEYPAD_KEY_LIST))], down_keys)
+
+    def test_iteration_ends_when_stopped(self):
+        self.keypad._events.append(KeyEvent(KEY_DOWN, u"5", self.now, 0.0))
+        self.keypad.set_running(False)
+        self.assertEqual([u"5"], [event.key for event in self.keypad])
+
+class TestIdleEdgeWait(unittest.TestCase):
+    def setUp(self):
+        GPIO.reset()
+        self.backend = GpioKeypadBackend(KEYPAD_PIN_COLUMNS, KEYPAD_PIN_ROWS)
+        self.keypad = ScanningKeypad(self.backend, KEYPAD_INDICES, KEYPAD_KEY_LIST)
+        self.keypad._event_signal = Mock()
+        self.addCleanup(self.keypad._cancel_edge_detection)
+
+    def wait_in_thread(self, timeout_s):
+        result = []
+        thread = threading.Thread(target=lambda: result.append(self.keypad._wait_for_edge(timeout_s)))
+        thread.start()
+        return (thread, result)
+
+    def test_edge_callbacks(self):
+        self.assertTrue(self.keypad._init_pins())
+        self.assertTrue(self.keypad._edge_detection)
+        self.assertEqual(sorted(KEYPAD_PIN_ROWS), sorted(GPIO.event_callbacks.keys()))
+        for (edge, callback) in GPIO.event_callbacks.values():
+            self.assertEqual(GPIO.RISING, edge)
+        self.keypad._cancel_edge_detection()
+        self.assertFalse(self.keypad._edge_detection)
+        self.assertEqual({}, GPIO.event_callbacks)
+
+    def test_key_already_down(self):
+        self.assertTrue(self.keypad._init_pins())
+        # The key went down before waiting, so no edge will come
+        GPIO.pressed.add(PINS_5)
+        self.assertTrue(self.keypad._wait_for_edge(None))
+
+    def test_idle_drives_all_columns(self):
+        self.assertTrue(self.keypad._init_pins())
+        self.assertFalse(self.keypad._wait_for_edge(0.01))
+        for v in KEYPAD_PIN_COLUMNS:
+            self.assertEqual(GPIO.HIGH, GPIO.outputs.get(v))
+        # Scanning again drives one column at a time
+        self.keypad.scan()
+        self.assertEqual([KEYPAD_PIN_COLUMNS[-1]], list(GPIO.outputs.keys()))
+
+    def test_wakes_on_edge(self):
+        self.assertTrue(self.keypad._init_pins())
+        (thread, result) = self.wait_in_thread(5.0)
+        thread.join(0.05)
+        self.assertTrue(thread.is_alive())
+        GPIO.press(*PINS_5)
+        thread.join(1.0)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([True], result)
+
+    def test_timeout(self):
+        self.assertTrue(self.keypad._init_pins())
+        self.assertFalse(self.keypad._wait_for_edge(0.01))
+
+    def test_not_running(self):
+        self.assertTrue(self.keypad._init_pins())
+        self.keypad.set_running(False)
+        self.assertFalse(self.keypad._wait_for_edge(None))
+
+    def test_stop_releases_wait(self):
+        self.assertTrue(self.keypad._init_pins())
+        (thread, result) = self.wait_in_thread(5.0)
+        thread.join(0.05)
+        self.keypad.set_running(False)
+        thread.join(1.0)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(1, len(result))
+
+    def test_set_backend_releases_wait(self):
+        self.assertTrue(self.keypad._init_pins())
+        (thread, result) = self.wait_in_thread(5.0)
+        thread.join(0.05)
+        self.keypad.set_backend(GpioKeypadBackend(KEYPAD_PIN_COLUMNS, KEYPAD_PIN_ROWS))
+        thread.join(1.0)
+        self.assertEqual([True], result)
+
+    def test_edge_detection_failure_polls(self):
+        # Another user of one row pin makes registration fail part way
+        GPIO.add_event_detect(KEYPAD_PIN_ROWS[2], GPIO.FALLING, callback=Mock())
+        self.assertTrue(self.keypad._init_pins())
+        self.assertFalse(self.keypad._edge_detection)
+        # The callbacks registered before the failure are removed
+        self.assertEqual([KEYPAD_PIN_ROWS[2]], list(GPIO.event_callbacks.keys()))
+        # Keys are still found by scanning
+        GPIO.pressed.add(PINS_5)
+        for _ in range(ScanningKeypad.DEBOUNCE_SAMPLES):
+            self.keypad.scan()
+        self.assertEqual(u"5", self.keypad.get_event(0).key)
+
+if __name__ == '__main__':
+    unittest.main()
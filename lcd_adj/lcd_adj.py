@@ -3,7 +3,8 @@
 
 from __future__ import print_function
 from builtins import range
-from threading import Thread, Lock
+from threading import Thread, Lock, Condition
+from heapq import heappush, heappop
 import json
 import time
 import sys
@@ -26,6 +27,29 @@ urls.extend([u"/lcd", u"plugins.lcd_adj.settings",
 # Add this plugin to the home page plugins menu
 gv.plugin_menu.append([_(u"LCD Settings"), u'/lcd'])
 
+# Python 2 has no monotonic clock, so fall back to wall time there
+monotonic = getattr(time, u"monotonic", time.time)
+
+# Seconds each report of the rotation stays on the display
+ROTATION_DWELL = 4
+# Seconds between re-renders of reports whose content changes while displayed (others are static)
+REPORT_REFRESH = {
+    u"d_date_time": 1,
+    u"d_cpu_temp": 10,
+    u"d_uptime": 30,
+    u"d_running_stations": 1,
+}
+# Seconds the values of expensive sources are reused for
+SOURCE_CACHE_TTL = {
+    u"ip": 300,
+    u"cpu_temp": 10,
+    u"uptime": 30,
+}
+# Priorities of reports triggered by signals; these pre-empt the rotation (priority 0) and any
+# signalled report of a lower priority
+PRIORITY_ALARM = 2
+PRIORITY_SCHEDULE = 1
+
 ################################################################################
 # Main function loop:                                                          #
 ################################################################################
@@ -35,15 +59,21 @@ class LCDSender(Thread):
     def __init__(self):
         Thread.__init__(self)
         self.daemon = True
-        self.start()
         self.status = u""
-        self.alarm_mode = False
-        self.schedule_mode = False
         self._display = [u"name"]
         self._addresses = set([0x20, 0x21, 0x22, 0x23, 0x24, 0x25, 0x26, 0x27, 0x38, 0x39, 0x3a, 0x3b, 0x3c, 0x3d, 0x3e, 0x3f])
-        self._sleep_time = 0
         self._lcd_lock = Lock()
         self._lcd = None
+        # Signalled reports waiting to be shown: heap of (-priority, sequence, report, txt, dwell)
+        self._events = []
+        self._event_sequence = 0
+        self._event_condition = Condition()
+        self._options_changed = False
+        # Options last loaded by the run loop or saved from the settings page; None until loaded
+        self._options = None
+        # Key is the source name, value is (expiry time, value)
+        self._source_cache = {}
+        self.start()
 
     def _lcd_print(self, report, txt=None):
         self._lcd_lock.acquire()
@@ -54,7 +84,6 @@ class LCDSender(Thread):
             self.status = ""
             self.add_status(u"Error: Address is not range 0x20-0x27 or 0x38-0x3F!")
             self._lcd_lock.release()
-            self._sleep(5)
             return
 
         # If the address has changed: Turn off the backlight and clear the LCD then forget the pylcd object.
@@ -71,60 +100,43 @@ class LCDSender(Thread):
                 self.add_status(u"Error: [Errno " + str(self._lcd.error.errno) + u"] Display not found at address " + datalcd[u"adress"])
                 self._lcd = None
                 self._lcd_lock.release()
-                self._sleep(5)
                 return
 
+        lines = None
         if report == u"name":
-            self._lcd.lcd_clear()
-            self._lcd.lcd_puts(gv.sd[u"name"], 1)
-            self._lcd.lcd_puts(u"Irrigation syst.", 2)
+            lines = [gv.sd[u"name"], u"Irrigation syst."]
             self.add_status(u"SIP. / Irrigation syst.")
         elif report == u"d_sw_version":
-            self._lcd.lcd_clear()
-            self._lcd.lcd_puts(u"Software SIP:", 1)
-            self._lcd.lcd_puts(gv.ver_date, 2)
+            lines = [u"Software SIP:", gv.ver_date]
             self.add_status(u"Software SIP: / " + gv.ver_date)
         elif report == u"d_ip":
-            self._lcd.lcd_clear()
-            ip = get_ip()
-            self._lcd.lcd_puts(u"My IP is:", 1)
-            self._lcd.lcd_puts(str(ip), 2)
+            ip = self._get_source(u"ip", get_ip)
+            lines = [u"My IP is:", str(ip)]
             self.add_status(u"My IP is: / " + str(ip))
         elif report == u"d_port":
-            self._lcd.lcd_clear()
-            self._lcd.lcd_puts(u"Port IP:", 1)
-            self._lcd.lcd_puts(str(gv.sd[u"htp"]), 2)
+            lines = [u"Port IP:", str(gv.sd[u"htp"])]
             self.add_status(u"Port IP: / {}".format(gv.sd[u"htp"]))
         elif report == u"d_cpu_temp":
-            self._lcd.lcd_clear()
-            temp = str(get_cpu_temp()) + u" " + gv.sd[u"tu"]
-            self._lcd.lcd_puts(u"CPU temperature:", 1)
-            self._lcd.lcd_puts(temp, 2)
+            temp = str(self._get_source(u"cpu_temp", get_cpu_temp)) + u" " + gv.sd[u"tu"]
+            lines = [u"CPU temperature:", temp]
             self.add_status(u"CPU temperature: / " + temp)
         elif report == u"d_date_time":
-            self._lcd.lcd_clear()
             da = time.strftime(u"%d.%m.%Y", time.gmtime(gv.now))
             ti = time.strftime(u"%H:%M:%S", time.gmtime(gv.now))
-            self._lcd.lcd_puts(da, 1)
-            self._lcd.lcd_puts(ti, 2)
+            lines = [da, ti]
             self.add_status(da + " " + ti)
         elif report == u"d_uptime":
-            self._lcd.lcd_clear()
-            up = uptime()
-            self._lcd.lcd_puts(u"System run time:", 1)
-            self._lcd.lcd_puts(up, 2)
+            up = self._get_source(u"uptime", uptime)
+            lines = [u"System run time:", up]
             self.add_status(u"System run time: / " + up)
         elif report == u"d_rain_sensor":
-            self._lcd.lcd_clear()
             if gv.sd[u"rs"]:
                 rain_sensor = u"Active"
             else:
                 rain_sensor = u"Inactive"
-            self._lcd.lcd_puts(u"Rain sensor:", 1)
-            self._lcd.lcd_puts(rain_sensor, 2)
+            lines = [u"Rain sensor:", rain_sensor]
             self.add_status(u"Rain sensor: / " + rain_sensor)
         elif report == u"d_running_stations":  # Report running Stations
-            self._lcd.lcd_clear()
             if gv.pon is None:
                 prg = u"Idle"
             elif gv.pon == 98:  # something is running
@@ -141,22 +153,25 @@ class LCDSender(Thread):
                     p, d = gv.ps[i]
                     if p != 0:
                         s += u"S{} ".format(str(i + 1))
-            self._lcd.lcd_puts(prg, 1)
-            self._lcd.lcd_puts(s, 2)
+            lines = [prg, s]
 
         elif report == u"d_alarm_signal":  # ALARM!!!!
-            self._lcd.lcd_clear()
-            self._lcd.lcd_puts(u"ALARM", 1)
-            self._lcd.lcd_puts(txt, 2)
+            lines = [u"ALARM", txt]
             self.add_status(u"Alarm! / " + txt)
 
         elif report == u"d_stat_schedule_signal":  # A program has been scheduled
-            self._lcd.lcd_clear()
-            self._lcd.lcd_puts(u"New Program", 1)
             txt = u"Running"  # Do not Know what else to display
-            self._lcd.lcd_puts(txt, 2)
+            lines = [u"New Program", txt]
             self.add_status(u"New Program Running / " + txt)
 
+        if lines is not None:
+            # Only the characters which changed since the last report are written
+            try:
+                self._lcd.lcd_display_lines(lines)
+            except Exception:
+                self._lcd_lock.release()
+                raise
+
         self._lcd_lock.release()
 
     def add_status(self, msg):
@@ -166,31 +181,109 @@ class LCDSender(Thread):
             self.status = msg
         print(msg)
 
+    def _get_source(self, name, func):
+        """Returns the value of an expensive source, reusing it for SOURCE_CACHE_TTL[name] seconds."""
+        now = monotonic()
+        cached = self._source_cache.get(name)
+        if cached is None or cached[0] <= now:
+            cached = (now + SOURCE_CACHE_TTL[name], func())
+            self._source_cache[name] = cached
+        return cached[1]
+
+    def _get_options(self):
+        """Returns the options the run loop last loaded, so signal handlers don't read the file."""
+        options = self._options
+        if options is None:
+            # Not loaded yet (signalled during startup)
+            options = get_lcd_options()
+        return options
+
     def update(self):
         lcd_opts = get_lcd_options()
+        self._options = lcd_opts
         self._display = [u"name"]
         for key in list(lcd_opts.keys()):
             if key.startswith(u"d_") and lcd_opts[key] == u"on":
                 self._display.append(key)
-        self._sleep_time = 0
-
-    def _sleep(self, secs):
-        self._sleep_time = secs
-        while self._sleep_time > 0:
-            time.sleep(1)
-            self._sleep_time -= 1
+        # Restart the rotation with the new options right away
+        self._event_condition.acquire()
+        try:
+            self._options_changed = True
+            self._event_condition.notify()
+        finally:
+            self._event_condition.release()
+
+    def _post_event(self, report, priority, dwell, txt=None):
+        """Queues a report to pre-empt the rotation; a report already waiting isn't queued twice."""
+        self._event_condition.acquire()
+        try:
+            for event in self._events:
+                if event[2] == report and event[3] == txt:
+                    return
+            self._event_sequence += 1
+            heappush(self._events, (-priority, self._event_sequence, report, txt, dwell))
+            self._event_condition.notify()
+        finally:
+            self._event_condition.release()
+
+    def _wait(self, deadline, priority):
+        """
+        Waits until the deadline, returning early with False if a report of a higher priority than
+        the one displayed is signalled or the options change.
+        """
+        self._event_condition.acquire()
+        try:
+            while True:
+                if self._options_changed or (self._events and -self._events[0][0] > priority):
+                    return False
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    return True
+                self._event_condition.wait(remaining)
+        finally:
+            self._event_condition.release()
+
+    def _next_report(self):
+        """Returns (report, txt, priority, dwell) of the next signalled report or None."""
+        self._event_condition.acquire()
+        try:
+            self._options_changed = False
+            if self._events:
+                (neg_priority, _, report, txt, dwell) = heappop(self._events)
+                return (report, txt, -neg_priority, dwell)
+        finally:
+            self._event_condition.release()
+        return None
+
+    def _show(self, report, txt, priority, dwell):
+        """Displays a report for its dwell time, re-rendering it if its content changes over time."""
+        deadline = monotonic() + dwell
+        refresh = REPORT_REFRESH.get(report)
+        while True:
+            self._lcd_print(report, txt=txt)
+            if refresh is None:
+                return self._wait(deadline, priority)
+            next_refresh = min(monotonic() + refresh, deadline)
+            if not self._wait(next_refresh, priority):
+                return False
+            if next_refresh >= deadline:
+                return True
 
     def alarm(self, name, **kw):
-        datalcd = get_lcd_options()
-        if datalcd[u"use_lcd"] != u"off" and not self.alarm_mode:  # if LCD plugin is enabled
-            self.alarm_mode = True
-        self._lcd_print(u"d_alarm_signal", txt=kw[u"txt"])
+        datalcd = self._get_options()
+        if datalcd[u"use_lcd"] != u"off":  # if LCD plugin is enabled
+            self._post_event(u"d_alarm_signal", PRIORITY_ALARM, 20, txt=kw[u"txt"])
 
     def notify_station_scheduled(self, name, **kw):
-        datalcd = get_lcd_options()
-        if datalcd[u"use_lcd"] != u"off" and not self.schedule_mode:  # if LCD plugin is enabled
-            self.schedule_mode = True
-            self._lcd_print(u"d_stat_schedule_signal")
+        datalcd = self._get_options()
+        if datalcd[u"use_lcd"] != u"off":  # if LCD plugin is enabled
+            self._post_event(u"d_stat_schedule_signal", PRIORITY_SCHEDULE, 5)
+            self._post_event(u"d_running_stations", PRIORITY_SCHEDULE, 5)
+
+    def notify_zone_change(self, name, **kw):
+        datalcd = self._get_options()
+        if datalcd[u"use_lcd"] != u"off" and datalcd[u"d_running_stations"] == u"on":
+            self._post_event(u"d_running_stations", PRIORITY_SCHEDULE, 5)
 
     def run(self):
         time.sleep(3)  # Sleep 3 seconds to prevent printing before startup information (Will not prevent Alarm or Scheduled Station)
@@ -200,28 +293,26 @@ class LCDSender(Thread):
         while True:
             try:
                 datalcd = get_lcd_options()  # load data from file
+                self._options = datalcd
                 if datalcd[u"use_lcd"] != u"off":  # if LCD plugin is enabled
-                    if text_shift >= len(self._display):
-                        text_shift = 0
-                        self.status = u""
-                    if self.alarm_mode:
-                        self._sleep(20)
-                        self.alarm_mode = False
-                    elif self.schedule_mode:
-                        self._sleep(5)
-                        self.schedule_mode = False
-                        self._lcd_print(u"d_running_stations")
-                        self._sleep(5)
+                    event = self._next_report()
+                    if event is not None:
+                        self._show(*event)
                     else:
-                        self._lcd_print(self._display[text_shift])
+                        if text_shift >= len(self._display):
+                            text_shift = 0
+                            self.status = u""
+                        self._show(self._display[text_shift], None, 0, ROTATION_DWELL)
                         text_shift += 1  # Increment text_shift value
-                self._sleep(4)
+                else:
+                    self._next_report()  # Signalled reports are dropped while disabled
+                    self._wait(monotonic() + ROTATION_DWELL, 0)
 
             except Exception:
                 exc_type, exc_value, exc_traceback = sys.exc_info()
                 err_string = "".join(traceback.format_exception(exc_type, exc_value, exc_traceback))
                 self.add_status(u"LCD plugin encountered error: " + err_string)
-                self._sleep(5)
+                self._wait(monotonic() + 5, PRIORITY_ALARM)
 
 
 checker = LCDSender()
@@ -229,6 +320,8 @@ alarm = signal(u"alarm_toggled")
 alarm.connect(checker.alarm)
 program_started = signal(u"stations_scheduled")
 program_started.connect(checker.notify_station_scheduled)
+zone_change = signal(u"zone_change")
+zone_change.connect(checker.notify_zone_change)
 ################################################################################
 # Helper functions:                                                            #
 ################################################################################
@@ -20,15 +20,32 @@ SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 from time import *
 import smbus
 
+# Execution time of the clear display and return home commands (1.52 ms per the HD44780 datasheet)
+CLEAR_HOME_DELAY = 0.002
+
+# DDRAM address of the start of each display line (20x4 layout; 16x2 displays use the first two)
+LINE_ADDRESSES = [0x00, 0x40, 0x14, 0x54]
+
 # General i2c device class so that other devices can be added easily
 class i2c_device:
     def __init__(self, addr, port):
         self.addr = addr
         self.bus = smbus.SMBus(port)
+        # i2c_rdwr lets a whole sequence of expander states go out in one transaction; it's only
+        # available from the smbus2 based smbus.py
+        self.can_write_block = hasattr(smbus, "i2c_msg") and hasattr(self.bus, "i2c_rdwr")
 
     def write(self, byte):
         self.bus.write_byte(self.addr, byte)
 
+    def write_block(self, data):  # Writes each byte in turn to the expander outputs
+        if self.can_write_block:
+            self.bus.i2c_rdwr(smbus.i2c_msg.write(self.addr, data))
+        else:
+            # Each byte is its own bus transaction, which is already slower than the LCD needs
+            for byte in data:
+                self.bus.write_byte(self.addr, byte)
+
     def read(self):
         return self.bus.read_byte(self.addr)
 
@@ -46,10 +63,13 @@ class lcd:
     3: "LCD2004" board where lower 4 are commands, but backlight is pin 3
     """
 
-    def __init__(self, addr, port, reverse=0, backlight_pin=-1, en_pin=-1, rw_pin=-1, rs_pin=-1, d4_pin=-1, d5_pin=-1, d6_pin=-1, d7_pin=-1):
+    def __init__(self, addr, port, reverse=0, backlight_pin=-1, en_pin=-1, rw_pin=-1, rs_pin=-1, d4_pin=-1, d5_pin=-1, d6_pin=-1, d7_pin=-1, columns=16):
         self.reverse = reverse
         self.lcd_device = i2c_device(addr, port)
         self.error = None
+        self.columns = columns
+        # Shadow of the characters on each line; None when the display contents are unknown
+        self.shadow = None
 
         # If there is not a device at the address return with error
         try:
@@ -104,6 +124,14 @@ class lcd:
             self.pins[6] = 6  # EN Pin
             self.pins[7] = 7  # Backlight Pin
 
+        # Lookup table from command value to expander value, so batched writes don't need to
+        # shuffle bits for every nibble
+        self.pin_map = bytearray(256)
+        for value in range(256):
+            for a in range(8):
+                if value & (1 << a):
+                    self.pin_map[value] |= 1 << self.pins[a]
+
         # This begins the actual initialization sequence
         self.lcd_device_write(0x03)  # Prepare to switch to 4 bit mode
         self.lcd_strobe()
@@ -123,6 +151,7 @@ class lcd:
         self.lcd_write(0x01)  # Clear display, move cursor home
         self.lcd_write(0x06)  # Move cursor right
         self.lcd_write(0x0C)  # Turn on display
+        self.lcd_reset_shadow()
 #        self.lcd_write(0x0F)
 
     # clocks EN to latch command
@@ -130,25 +159,48 @@ class lcd:
         self.lcd_device_write(self.lastcomm | (1 << 6), 1)  # 1<<6 is the enable pin
         self.lcd_device_write(self.lastcomm, 1)  # Technically not needed, but included so we can read from the display
 
+    # append the expander values which latch one byte (a nibble at a time) to a batch
+    def lcd_batch_byte(self, batch, value, rs=0):
+        value &= 0xFF
+        for nibble in (value >> 4, value & 0x0F):
+            commvalue = (rs << 4) | nibble | self.backlight
+            batch.append(self.pin_map[commvalue])
+            batch.append(self.pin_map[commvalue | (1 << 6)])  # 1<<6 is the enable pin
+            batch.append(self.pin_map[commvalue])
+
+    # write a batch of expander values, ending with the data lines released
+    def lcd_batch_write(self, batch):
+        batch.append(self.pin_map[self.backlight])
+        try:
+            self.lcd_device.write_block(batch)
+        except Exception:
+            self.shadow = None  # A partial write leaves the display contents unknown
+            raise
+        self.lastcomm = 0x0
+
     # write a command to lcd
     def lcd_write(self, cmd):
-        self.lcd_device_write((cmd >> 4))  # Write the first 4 bits (nibble) of the command
-        self.lcd_strobe()
-        self.lcd_device_write((cmd & 0x0F))  # Write the second nibble of the command
-        self.lcd_strobe()
-        self.lcd_device_write(0x0)  # Technically not needed
+        batch = bytearray()
+        self.lcd_batch_byte(batch, cmd)
+        self.lcd_batch_write(batch)
+        if cmd <= 0x03:  # Clear display and return home take a while to execute
+            sleep(CLEAR_HOME_DELAY)
 
     # write a character to lcd (or character rom)
     def lcd_write_char(self, charvalue):
-        self.lcd_device_write(((1 << 4) | (charvalue >> 4)))  # Originally this was 0x40
-        self.lcd_strobe()
-        self.lcd_device_write(((1 << 4) | (charvalue & 0x0F)))  # Originally this was 0x40
-        self.lcd_strobe()
-        self.lcd_device_write(0x0)
+        batch = bytearray()
+        self.lcd_batch_byte(batch, charvalue, rs=1)
+        self.lcd_batch_write(batch)
+
+    # character code to send for a character; characters the LCD can't show are sent as "?"
+    @staticmethod
+    def lcd_char_code(char):
+        code = ord(char)
+        return code if code <= 0xFF else ord(u"?")
 
     # put char function
     def lcd_putc(self, char):
-        self.lcd_write_char(ord(char))
+        self.lcd_write_char(self.lcd_char_code(char))
 
     # Do clunky bitshifting to account for strangely wired boards
     # I guarantee there is an easier way of doing this.
@@ -175,26 +227,61 @@ class lcd:
         if isstrobe == 0:  #
             self.lastcomm = commvalue
 
-    # put string function
+    # put string function - the cursor move and all characters go out in a single bus transaction
     def lcd_puts(self, string, line):
+        batch = bytearray()
         if line == 1:
-            self.lcd_write(0x80)
+            self.lcd_batch_byte(batch, 0x80)
         if line == 2:
-            self.lcd_write(0xC0)
+            self.lcd_batch_byte(batch, 0xC0)
         if line == 3:
-            self.lcd_write(0x94)
+            self.lcd_batch_byte(batch, 0x94)
         if line == 4:
-            self.lcd_write(0xD4)
+            self.lcd_batch_byte(batch, 0xD4)
 
         for char in string:
-            self.lcd_putc(char)
+            self.lcd_batch_byte(batch, self.lcd_char_code(char), rs=1)
+        self.lcd_batch_write(batch)
+        if self.shadow is not None and 1 <= line <= len(LINE_ADDRESSES):
+            n = min(len(string), self.columns)
+            self.shadow[line - 1][:n] = list(string[:n])
+
+    # update lines of the lcd, only writing the characters which differ from what is displayed
+    def lcd_display_lines(self, lines):
+        if self.shadow is None:
+            self.lcd_clear()  # Recover from unknown contents (ex: after a failed write)
+        batch = bytearray()
+        # The shadow is only updated once the batch has been written
+        new_shadow = list(self.shadow)
+        for (idx, string) in enumerate(lines[:len(LINE_ADDRESSES)]):
+            new_line = list(string[:self.columns].ljust(self.columns))
+            shadow_line = self.shadow[idx]
+            col = 0
+            while col < self.columns:
+                if new_line[col] == shadow_line[col]:
+                    col += 1
+                    continue
+                # Move the cursor once for each run of changed characters
+                self.lcd_batch_byte(batch, 0x80 | (LINE_ADDRESSES[idx] + col))
+                while col < self.columns and new_line[col] != shadow_line[col]:
+                    self.lcd_batch_byte(batch, self.lcd_char_code(new_line[col]), rs=1)
+                    col += 1
+            new_shadow[idx] = new_line
+        if batch:
+            self.lcd_batch_write(batch)
+        self.shadow = new_shadow
+
+    # forget what is displayed so that the next lcd_display_lines clears and rewrites everything
+    def lcd_invalidate(self):
+        self.shadow = None
+
+    def lcd_reset_shadow(self):
+        self.shadow = [[u" "] * self.columns for _ in LINE_ADDRESSES]
 
     # clear lcd and set to home
     def lcd_clear(self):
-        self.lcd_write(0x1)
-        sleep(0.005)  # This command takes awhile.
-        self.lcd_write(0x2)
-        sleep(0.005)  # This command takes awhile.
+        self.lcd_write(0x1)  # Clearing also returns the cursor home
+        self.lcd_reset_shadow()
 
     # add custom characters (0 - 7)
     def lcd_load_custon_chars(self, fontdata):
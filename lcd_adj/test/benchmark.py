@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark runner for the lcd_adj character LCD driver. Hardware is stubbed out with the same stubs
+as the regression tests, and I2C traffic is counted and timed (at 100 kHz) on a simulated I2C bus.
+Usage: python3 -B benchmark.py [-n ITERATIONS] [--json FILE]
+"""
+import argparse
+import itertools
+import json
+import timeit
+from unittest.mock import patch
+# This will stub sip and pi-specific things out
+import lcd_adj_test_base
+# Now that things have been stubbed out, pylcd may be imported
+import stub_i2c_simulator
+from stub_i2c_simulator import SimulatedSMBus, Pcf8574Hd44780
+import pylcd
+
+class BenchmarkResult:
+    def __init__(self, name, iterations, seconds, bus=None):
+        self.name = name
+        self.iterations = iterations
+        self.usec_per_op = seconds * 1e6 / iterations
+        self.transactions_per_op = None
+        self.bytes_per_op = None
+        self.bus_usec_per_op = None
+        if bus is not None:
+            self.transactions_per_op = bus.transaction_count / float(iterations)
+            self.bytes_per_op = bus.byte_count / float(iterations)
+            self.bus_usec_per_op = bus.elapsed * 1e6 / iterations
+
+    def to_dict(self):
+        return {
+            u"name": self.name,
+            u"iterations": self.iterations,
+            u"usec_per_op": self.usec_per_op,
+            u"i2c_transactions_per_op": self.transactions_per_op,
+            u"i2c_bytes_per_op": self.bytes_per_op,
+            u"i2c_bus_usec_per_op": self.bus_usec_per_op
+        }
+
+    def __str__(self):
+        line = u"{:<52} {:>10.1f} us".format(self.name, self.usec_per_op)
+        if self.transactions_per_op is not None:
+            line += u" {:>8.1f} xfers {:>8.1f} bytes {:>10.1f} us on bus".format(
+                self.transactions_per_op, self.bytes_per_op, self.bus_usec_per_op)
+        return line
+
+def run(name, func, iterations, bus=None):
+    """
+    Runs func the given number of times and returns a BenchmarkResult
+    """
+    # Warm up once so that one-time costs aren't measured
+    func()
+    if bus is not None:
+        bus.reset()
+    seconds = timeit.Timer(func).timeit(number=iterations)
+    return BenchmarkResult(name, iterations, seconds, bus)
+
+def bench_character_lcd(iterations):
+    results = []
+    bus = SimulatedSMBus()
+    bus.attach(0x27, Pcf8574Hd44780())
+    with patch('pylcd.smbus.SMBus', return_value=bus, create=True),\
+        patch('pylcd.smbus.i2c_msg', stub_i2c_simulator.i2c_msg, create=True)\
+    :
+        lcd = pylcd.lcd(0x27, 1)
+        results.append(run(u"pylcd.lcd_puts both lines",
+                           lambda: (lcd.lcd_puts(u"Run Stn 3".ljust(16), 1),
+                                    lcd.lcd_puts(u"12:34".ljust(16), 2)),
+                           iterations,
+                           bus))
+        # Alternate the minute so that one character changes per update
+        lines = itertools.cycle([[u"Run Stn 3", u"12:34"], [u"Run Stn 3", u"12:35"]])
+        results.append(run(u"pylcd.lcd_display_lines one char",
+                           lambda: lcd.lcd_display_lines(next(lines)),
+                           iterations,
+                           bus))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=u"lcd_adj character LCD benchmarks")
+    parser.add_argument(u"-n", u"--iterations", type=int, default=200,
+                        help=u"number of iterations per benchmark")
+    parser.add_argument(u"--json", default=None, help=u"file to write results to as JSON")
+    args = parser.parse_args()
+    results = []
+    for bench in [bench_character_lcd]:
+        for result in bench(args.iterations):
+            print(result)
+            results.append(result)
+    if args.json is not None:
+        with open(args.json, u"w") as f:
+            json.dump([result.to_dict() for result in results], f, indent=2)
+
+if __name__ == u"__main__":
+    main()
@@ -0,0 +1,5 @@
+#!/bin/sh
+# Linux benchmark execution file.
+# To run, cd to the test directory, make this script executable, and then execute this script.
+# Any arguments are passed to the benchmark runner (ex: -n 500 --json results.json)
+python3 -B benchmark.py "$@"
@@ -0,0 +1,27 @@
+import os
+import sys
+
+# Insert test directories and this plugin's directory
+TEST_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, TEST_DIR)
+STUB_DIR = os.path.join(TEST_DIR, "stubs")
+sys.path.insert(0, STUB_DIR)
+LCD_ADJ_DIR = os.path.realpath(os.path.join(TEST_DIR, '..'))
+sys.path.insert(0, LCD_ADJ_DIR)
+# Load stubbed-out components for lcd_adj
+sys.modules['web'] = __import__('stub_web')
+sys.modules['gv'] = __import__('stub_gv')
+sys.modules['urls'] = __import__('stub_urls')
+sys.modules['sip'] = __import__('stub_sip')
+sys.modules['webpages'] = __import__('stub_webpages')
+sys.modules['blinker'] = __import__('stub_blinker')
+sys.modules['helpers'] = __import__('stub_helpers')
+sys.modules['smbus'] = __import__('stub_smbus')
+
+# SIP installs the gettext translation function as a builtin
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+if not hasattr(builtins, '_'):
+    builtins._ = lambda text: text
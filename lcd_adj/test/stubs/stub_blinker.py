@@ -0,0 +1,5 @@
+class signal:
+    def __init__(self, *args, **kwargs):
+        pass
+    def connect(self, *args, **kwargs):
+        pass
@@ -0,0 +1,6 @@
+plugin_menu = []
+now = 0
+ver_date = u"2024-01-01"
+sd = {u"name": u"SIP", u"htp": 80, u"tu": u"C", u"rs": 0}
+pon = None
+ps = []
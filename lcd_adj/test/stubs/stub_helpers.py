@@ -0,0 +1,11 @@
+def uptime():
+    return u"1 day"
+
+def get_ip():
+    return u"127.0.0.1"
+
+def get_cpu_temp():
+    return 40
+
+def get_rpi_revision():
+    return 2
@@ -0,0 +1,274 @@
+# Simulated I2C bus which stands in for smbus/smbus2 so that the character LCD driver may be
+# exercised without hardware. Devices are attached to the bus by 7-bit address and decode what is
+# written to them: Pcf8574Hd44780 models a PCF8574 backpack driving an HD44780 character LCD (4-bit
+# interface, cursor, DDRAM, and busy time). The bus records each transaction and keeps a simulated
+# clock from a configurable bus speed and per-transaction latency.
+import errno
+import os
+from collections import namedtuple
+from time import sleep
+
+try:
+    from time import monotonic
+except ImportError:
+    from time import time as monotonic
+
+# Adapter functionality bit for plain I2C transfers (I2C_FUNC_I2C from uapi/linux/i2c.h)
+I2C_FUNC_I2C = 0x00000001
+
+# Start time (simulated clock), duration, address, and number of bytes (including address bytes)
+Transaction = namedtuple(u"Transaction", [u"start", u"duration", u"addr", u"num_bytes"])
+
+class i2c_msg:
+    def __init__(self, addr, buf):
+        self.addr = addr
+        self.buf = bytes(buf)
+
+    def __len__(self):
+        return len(self.buf)
+
+    @staticmethod
+    def write(address, buf):
+        return i2c_msg(address, buf)
+
+class SimulatedSMBus:
+    """
+    SMBus compatible bus which forwards writes to attached device models
+    """
+    # Also in ssd1306/test/stubs/stub_i2c_simulator.py; the two copies must be kept in sync
+
+    def __init__(self, bus=None, clock_hz=100000, transaction_latency=0.0, real_time=False):
+        """
+        Initializes a SimulatedSMBus object
+        Inputs: bus - The bus number (ignored; accepted so this may replace smbus.SMBus)
+                clock_hz - The I2C clock rate; each byte takes 9 clock cycles (8 bits + ACK)
+                transaction_latency - Fixed time in seconds added to each transaction to model
+                                      start/stop conditions and driver overhead
+                real_time - Set to True to actually sleep for the duration of each transaction
+        """
+        self.funcs = I2C_FUNC_I2C
+        self.byte_time = 9.0 / clock_hz
+        self.transaction_latency = transaction_latency
+        self.real_time = real_time
+        self.devices = {}
+        # Simulated bus time which isn't slept is added to the real clock to form the bus clock
+        self._clock_offset = 0.0
+        self._pending_errors = 0
+        self.reset()
+
+    def attach(self, addr, device):
+        """
+        Attaches a device model at the given 7-bit address
+        Returns: device
+        """
+        self.devices[addr] = device
+        return device
+
+    def reset(self):
+        """
+        Resets all recorded transactions
+        """
+        self.transactions = []
+        self.elapsed = 0.0
+
+    @property
+    def transaction_count(self):
+        return len(self.transactions)
+
+    @property
+    def byte_count(self):
+        return sum([t.num_bytes for t in self.transactions])
+
+    def clock(self):
+        """
+        Returns the current bus time in seconds
+        """
+        return monotonic() + self._clock_offset
+
+    def inject_errors(self, count=1):
+        """
+        Makes the next count transactions fail as if the device did not acknowledge
+        """
+        self._pending_errors += count
+
+    def _get_device(self, addr):
+        device = self.devices.get(addr)
+        if device is None or self._pending_errors > 0:
+            self._pending_errors = max(self._pending_errors - 1, 0)
+            raise IOError(errno.EREMOTEIO, os.strerror(errno.EREMOTEIO))
+        return device
+
+    def _transfer(self, addr, bufs):
+        """
+        Executes one transaction made of one or more write messages to a single device
+        """
+        device = self._get_device(addr)
+        start = self.clock()
+        num_bytes = sum([len(buf) for buf in bufs]) + len(bufs)
+        duration = self.transaction_latency + num_bytes * self.byte_time
+        t = start + self.transaction_latency
+        for buf in bufs:
+            # Skip the address byte; each data byte completes one byte time later
+            t += self.byte_time
+            device.write(bytearray(buf), t + self.byte_time, self.byte_time)
+            t += len(buf) * self.byte_time
+        self.transactions.append(Transaction(start, duration, addr, num_bytes))
+        self.elapsed += duration
+        if self.real_time:
+            sleep(duration)
+        else:
+            self._clock_offset += duration
+
+    def write_byte(self, i2c_addr, value):
+        self._transfer(i2c_addr, [[value]])
+
+    def write_byte_data(self, i2c_addr, register, value):
+        self._transfer(i2c_addr, [[register, value]])
+
+    def write_i2c_block_data(self, i2c_addr, register, data):
+        if len(data) > 32:
+            raise ValueError("Block data may not exceed 32 bytes")
+        self._transfer(i2c_addr, [[register] + list(data)])
+
+    def read_byte(self, i2c_addr):
+        device = self._get_device(i2c_addr)
+        self.transactions.append(Transaction(self.clock(), 2 * self.byte_time, i2c_addr, 2))
+        self.elapsed += 2 * self.byte_time
+        self._clock_offset += 2 * self.byte_time
+        return device.read()
+
+    def i2c_rdwr(self, *msgs):
+        addrs = set([msg.addr for msg in msgs])
+        if len(addrs) != 1:
+            raise ValueError("Simulated transfers must address a single device")
+        self._transfer(addrs.pop(), [msg.buf for msg in msgs])
+
+class Pcf8574Hd44780:
+    """
+    Model of a PCF8574 I/O expander backpack wired to an HD44780 character LCD
+    """
+    # DDRAM address of the start of each display line (20x4 layout)
+    LINE_ADDRESSES = [0x00, 0x40, 0x14, 0x54]
+    # Execution times from the HD44780 datasheet
+    CLEAR_HOME_TIME = 0.00152
+    COMMAND_TIME = 0.000037
+
+    def __init__(self, columns=16, rows=2, pins=None):
+        """
+        Initializes a Pcf8574Hd44780 object
+        Inputs: columns - The number of characters per line
+                rows - The number of lines
+                pins - Expander bit of D4, D5, D6, D7, RS, RW, EN, and backlight (pylcd order)
+        """
+        self.columns = columns
+        self.rows = rows
+        self.pins = pins if pins is not None else list(range(8))
+        self.port = 0xFF
+        self.ddram = bytearray(b" " * 0x80)
+        self.cgram = bytearray(0x40)
+        self.address = 0
+        self.cgram_selected = False
+        self.increment = True
+        self.two_line = False
+        self.display_on = False
+        self.four_bit = False
+        self.backlight = False
+        self.strobe_count = 0
+        self.commands = []
+        # Instructions which were latched while the controller was still busy
+        self.busy_violations = 0
+        self._busy_until = 0.0
+        self._high_nibble = None
+
+    def _pin(self, port, idx):
+        return (port >> self.pins[idx]) & 1
+
+    def write(self, buf, time, byte_time):
+        for byte in buf:
+            previous = self.port
+            self.port = byte
+            self.backlight = bool(self._pin(byte, 7))
+            # Data is latched on the falling edge of EN
+            if self._pin(previous, 6) and not self._pin(byte, 6):
+                self._latch(previous, time)
+            time += byte_time
+
+    def read(self):
+        return self.port
+
+    def _latch(self, port, time):
+        self.strobe_count += 1
+        nibble = sum([self._pin(port, i) << i for i in range(4)])
+        rs = self._pin(port, 4)
+        if not self.four_bit:
+            # Only D4-D7 are wired, so the low half of each 8-bit instruction reads as 0
+            self._execute(rs, nibble << 4, time)
+        elif self._high_nibble is None:
+            self._high_nibble = nibble
+        else:
+            value = (self._high_nibble << 4) | nibble
+            self._high_nibble = None
+            self._execute(rs, value, time)
+
+    def _execute(self, rs, value, time):
+        if time < self._busy_until:
+            self.busy_violations += 1
+        duration = Pcf8574Hd44780.COMMAND_TIME
+        if rs:
+            self._write_ram(value)
+        else:
+            self.commands.append(value)
+            if value == 0x01:
+                self.ddram[:] = b" " * len(self.ddram)
+                self.address = 0
+                self.cgram_selected = False
+                self.increment = True
+                duration = Pcf8574Hd44780.CLEAR_HOME_TIME
+            elif value <= 0x03:
+                self.address = 0
+                self.cgram_selected = False
+                duration = Pcf8574Hd44780.CLEAR_HOME_TIME
+            elif value <= 0x07:
+                self.increment = bool(value & 0x02)
+            elif value <= 0x0F:
+                self.display_on = bool(value & 0x04)
+            elif value <= 0x1F:
+                pass  # Cursor and display shifts aren't modeled
+            elif value <= 0x3F:
+                self.four_bit = not (value & 0x10)
+                self.two_line = bool(value & 0x08)
+            elif value <= 0x7F:
+                self.address = value & 0x3F
+                self.cgram_selected = True
+            else:
+                self.address = value & 0x7F
+                self.cgram_selected = False
+        self._busy_until = time + duration
+
+    def _write_ram(self, value):
+        if self.cgram_selected:
+            self.cgram[self.address] = value
+            self.address = (self.address + (1 if self.increment else -1)) & 0x3F
+            return
+        self.ddram[self.address] = value
+        address = self.address + (1 if self.increment else -1)
+        if self.two_line:
+            # Each line holds 40 characters at 0x00-0x27 and 0x40-0x67
+            if address == 0x28:
+                address = 0x40
+            elif address == 0x68:
+                address = 0x00
+            elif address == 0x3F:
+                address = 0x27
+            elif address < 0:
+                address = 0x67
+        else:
+            address %= 0x50
+        self.address = address
+
+    def display_lines(self):
+        """
+        Returns the text shown on each line of the display
+        """
+        return [self.ddram[a:a + self.columns].decode(u"latin-1")
+                for a in Pcf8574Hd44780.LINE_ADDRESSES[:self.rows]]
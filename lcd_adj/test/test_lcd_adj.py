@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import patch
+# This will stub sip and pi-specific things out
+import lcd_adj_test_base
+# Now that things have been stubbed out, lcd_adj may be imported
+import lcd_adj
+from lcd_adj import LCDSender, PRIORITY_ALARM, PRIORITY_SCHEDULE
+
+def make_sender():
+    # The sender thread isn't started so that its queue may be inspected
+    with patch.object(LCDSender, 'start'):
+        return LCDSender()
+
+def options(**kwargs):
+    datalcd = {u"use_lcd": u"on", u"d_running_stations": u"on"}
+    datalcd.update(kwargs)
+    return datalcd
+
+class TestLCDSender_post_event(unittest.TestCase):
+    def test_duplicate_not_queued(self):
+        sender = make_sender()
+        sender._post_event(u"d_running_stations", PRIORITY_SCHEDULE, 5)
+        sender._post_event(u"d_running_stations", PRIORITY_SCHEDULE, 5)
+        self.assertEqual(1, len(sender._events))
+        # The same report with other text is a different event
+        sender._post_event(u"d_alarm_signal", PRIORITY_ALARM, 20, txt=u"a")
+        sender._post_event(u"d_alarm_signal", PRIORITY_ALARM, 20, txt=u"b")
+        sender._post_event(u"d_alarm_signal", PRIORITY_ALARM, 20, txt=u"a")
+        self.assertEqual(3, len(sender._events))
+
+    def test_queued_again_once_shown(self):
+        sender = make_sender()
+        sender._post_event(u"d_running_stations", PRIORITY_SCHEDULE, 5)
+        self.assertIsNotNone(sender._next_report())
+        sender._post_event(u"d_running_stations", PRIORITY_SCHEDULE, 5)
+        self.assertEqual(1, len(sender._events))
+
+class TestLCDSender_next_report(unittest.TestCase):
+    def test_priority_order(self):
+        sender = make_sender()
+        sender._post_event(u"d_stat_schedule_signal", PRIORITY_SCHEDULE, 5)
+        sender._post_event(u"d_running_stations", PRIORITY_SCHEDULE, 5)
+        sender._post_event(u"d_alarm_signal", PRIORITY_ALARM, 20, txt=u"Low pressure")
+        # Highest priority first, then in the order signalled
+        self.assertEqual((u"d_alarm_signal", u"Low pressure", PRIORITY_ALARM, 20),
+                         sender._next_report())
+        self.assertEqual((u"d_stat_schedule_signal", None, PRIORITY_SCHEDULE, 5),
+                         sender._next_report())
+        self.assertEqual((u"d_running_stations", None, PRIORITY_SCHEDULE, 5),
+                         sender._next_report())
+        self.assertIsNone(sender._next_report())
+
+    def test_clears_options_changed(self):
+        sender = make_sender()
+        sender._options_changed = True
+        self.assertIsNone(sender._next_report())
+        self.assertFalse(sender._options_changed)
+
+class TestLCDSender_notify_zone_change(unittest.TestCase):
+    def test_uses_loaded_options(self):
+        sender = make_sender()
+        sender._options = options()
+        with patch('lcd_adj.get_lcd_options') as mocked_get_lcd_options:
+            sender.notify_zone_change(u"zone_change")
+            sender.notify_zone_change(u"zone_change")
+        mocked_get_lcd_options.assert_not_called()
+        self.assertEqual([u"d_running_stations"], [event[2] for event in sender._events])
+
+    def test_report_disabled(self):
+        sender = make_sender()
+        sender._options = options(d_running_stations=u"off")
+        sender.notify_zone_change(u"zone_change")
+        sender._options = options(use_lcd=u"off")
+        sender.notify_zone_change(u"zone_change")
+        self.assertEqual([], sender._events)
+
+    def test_options_loaded_before_run(self):
+        sender = make_sender()
+        with patch('lcd_adj.get_lcd_options', return_value=options()) as mocked_get_lcd_options:
+            sender.notify_zone_change(u"zone_change")
+        mocked_get_lcd_options.assert_called_once_with()
+        self.assertEqual(1, len(sender._events))
+
+    def test_update_caches_options(self):
+        sender = make_sender()
+        with patch('lcd_adj.get_lcd_options', return_value=options(d_ip=u"on", d_uptime=u"off")):
+            sender.update()
+        self.assertEqual([u"name", u"d_running_stations", u"d_ip"], sender._display)
+        with patch('lcd_adj.get_lcd_options') as mocked_get_lcd_options:
+            sender.notify_zone_change(u"zone_change")
+        mocked_get_lcd_options.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import types
+import unittest
+from unittest.mock import Mock, patch
+# This will stub sip and pi-specific things out
+import lcd_adj_test_base
+# Now that things have been stubbed out, pylcd may be imported
+import pylcd
+import stub_i2c_simulator
+from stub_i2c_simulator import SimulatedSMBus, Pcf8574Hd44780
+
+class TestPcf8574Hd44780(unittest.TestCase):
+    def make_lcd(self, reverse=0, **kwargs):
+        self.bus = SimulatedSMBus()
+        self.device = self.bus.attach(0x27, Pcf8574Hd44780(**kwargs))
+        smbus_module = types.SimpleNamespace(SMBus=Mock(return_value=self.bus),
+                                             i2c_msg=stub_i2c_simulator.i2c_msg)
+        patcher = patch('pylcd.smbus', smbus_module)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        lcd = pylcd.lcd(0x27, 1, reverse=reverse, columns=self.device.columns)
+        self.assertIsNone(lcd.error)
+        return lcd
+
+    def test_initialization(self):
+        self.make_lcd()
+        self.assertTrue(self.device.four_bit)
+        self.assertTrue(self.device.two_line)
+        self.assertTrue(self.device.display_on)
+        self.assertTrue(self.device.backlight)
+        self.assertEqual([u" " * 16] * 2, self.device.display_lines())
+        self.assertEqual(0, self.device.busy_violations)
+
+    def test_display_lines(self):
+        lcd = self.make_lcd()
+        lcd.lcd_display_lines([u"Run Stn 3", u"12:34"])
+        self.assertEqual([u"Run Stn 3".ljust(16), u"12:34".ljust(16)],
+                         self.device.display_lines())
+        self.bus.reset()
+        strobe_count = self.device.strobe_count
+        lcd.lcd_display_lines([u"Run Stn 3", u"12:35"])
+        self.assertEqual(u"12:35".ljust(16), self.device.display_lines()[1])
+        # One transaction which moves the cursor and writes one character
+        self.assertEqual(1, self.bus.transaction_count)
+        self.assertEqual(4, self.device.strobe_count - strobe_count)
+        self.assertEqual(0, self.device.busy_violations)
+
+    def test_reversed_pins(self):
+        lcd = self.make_lcd(reverse=1, columns=20, rows=4, pins=[4, 5, 6, 7, 0, 1, 2, 3])
+        lcd.lcd_display_lines([u"", u"", u"", u"Rain delay"])
+        self.assertEqual(u"Rain delay".ljust(20), self.device.display_lines()[3])
+
+    def test_unsupported_characters(self):
+        lcd = self.make_lcd()
+        # Characters above U+00FF can't be shown by the LCD and are written as "?"
+        lcd.lcd_display_lines([u"Zone–A", u"x"])
+        self.assertEqual([u"Zone?A".ljust(16), u"x".ljust(16)], self.device.display_lines())
+        lcd.lcd_puts(u"–", 2)
+        self.assertEqual(u"?", self.device.display_lines()[1][0])
+
+    def test_failed_update_leaves_shadow(self):
+        lcd = self.make_lcd()
+        # Fail while the batch is being built, before anything is written
+        char_code = lcd.lcd_char_code
+        def failing_char_code(char):
+            if char == u"!":
+                raise ValueError(char)
+            return char_code(char)
+        with patch.object(lcd, 'lcd_char_code', side_effect=failing_char_code):
+            with self.assertRaises(ValueError):
+                lcd.lcd_display_lines([u"Zone!A", u"x"])
+        lcd.lcd_display_lines([u"Zone-A", u"x"])
+        self.assertEqual([u"Zone-A".ljust(16), u"x".ljust(16)], self.device.display_lines())
+
+    def test_busy_violation(self):
+        lcd = self.make_lcd()
+        # Without waiting after a clear, the next instruction arrives while the LCD is busy
+        with patch('pylcd.sleep'):
+            lcd.lcd_clear()
+            lcd.lcd_puts(u"Hi", 1)
+        self.assertEqual(1, self.device.busy_violations)
+
+    def test_missing_device(self):
+        bus = SimulatedSMBus()
+        with patch('pylcd.smbus', types.SimpleNamespace(SMBus=Mock(return_value=bus))):
+            lcd = pylcd.lcd(0x27, 1)
+        self.assertIsInstance(lcd.error, IOError)
+
+    def test_injected_error(self):
+        lcd = self.make_lcd()
+        lcd.lcd_display_lines([u"Run Stn 3", u"12:34"])
+        self.bus.inject_errors()
+        with self.assertRaises(IOError):
+            lcd.lcd_display_lines([u"Run Stn 4", u"12:34"])
+        # The display contents are unknown after a failed write, so everything is rewritten
+        self.assertIsNone(lcd.shadow)
+        lcd.lcd_display_lines([u"Run Stn 4", u"12:34"])
+        self.assertEqual([u"Run Stn 4".ljust(16), u"12:34".ljust(16)],
+                         self.device.display_lines())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -82,27 +82,98 @@ except:
     pass
 
 
+class RelayDriver:
+    """
+    Switches the relays, remembering the last state written to each one so that only relays
+    which change are written
+    """
+
+    # Also in relay_board/relay_board.py; the two copies must be kept in sync
+
+    def __init__(self, pins, num_relays, active_low):
+        """
+        Inputs: pins - Broadcom (pigpio) or board (RPi.GPIO) pin of each relay
+                num_relays - Number of relays in use
+                active_low - True if a relay is switched on by a LOW output
+        """
+        self.pins = pins[:num_relays]
+        self.active_low = active_low
+        # Last state written to each relay (True for on); None when unknown
+        self.states = [None] * len(self.pins)
+
+    def _level(self, is_on):
+        """
+        Returns the output level (1 for HIGH; 0 for LOW) which sets a relay to the given state
+        """
+        return 0 if is_on == self.active_low else 1
+
+    def init(self):
+        """
+        Sets up the relay pins as outputs and switches every relay off
+        """
+        for i, pin in enumerate(self.pins):
+            if gv.use_pigpio:
+                pi.set_mode(pin, pigpio.OUTPUT)
+                pi.write(pin, self._level(False))
+            else:
+                GPIO.setup(pin, GPIO.OUT)
+                GPIO.output(pin, self._level(False))
+            self.states[i] = False
+            time.sleep(0.1)
+
+    def update(self, station_states):
+        """
+        Switches the relays whose state differs from the given station states. Under pigpio,
+        all changes are written at once with one set and one clear of GPIO bank 1.
+        Inputs: station_states - On/off state of each station (e.g. gv.output_srvals)
+        Returns: Number of relays switched
+        """
+        changes = [
+            (i, bool(is_on))
+            for i, is_on in enumerate(station_states[: len(self.pins)])
+            if bool(is_on) != self.states[i]
+        ]
+        if not changes:
+            return 0
+        try:
+            if gv.use_pigpio:
+                set_mask = 0
+                clear_mask = 0
+                for i, is_on in changes:
+                    if self._level(is_on):
+                        set_mask |= 1 << self.pins[i]
+                    else:
+                        clear_mask |= 1 << self.pins[i]
+                if set_mask:
+                    pi.set_bank_1(set_mask)
+                if clear_mask:
+                    pi.clear_bank_1(clear_mask)
+            else:
+                GPIO.output(
+                    [self.pins[i] for i, is_on in changes],
+                    [self._level(is_on) for i, is_on in changes],
+                )
+        except Exception as e:
+            print(u"Problem switching relays", e, [self.pins[i] for i, is_on in changes])
+            # The relays may or may not have switched; write them again on the next change
+            for i, is_on in changes:
+                self.states[i] = None
+            return 0
+        for i, is_on in changes:
+            self.states[i] = is_on
+        return len(changes)
+
+
+relay_driver = None
+
+
 #### setup GPIO pins as output and either high or low ####
 def init_pins():
-    global pi
+    global relay_driver
 
     try:
-        for i in range(params[u"relays"]):
-            if gv.use_pigpio:
-                pi.set_mode(relay_pins[i], pigpio.OUTPUT)
-            else:
-                GPIO.setup(relay_pins[i], GPIO.OUT)
-            if params[u"active"] == u"low":
-                if gv.use_pigpio:
-                    pi.write(relay_pins[i], 1)
-                else:
-                    GPIO.output(relay_pins[i], GPIO.HIGH)
-            else:
-                if gv.use_pigpio:
-                    pi.write(relay_pins[i], 0)
-                else:
-                    GPIO.output(relay_pins[i], GPIO.LOW)
-            time.sleep(0.1)
+        relay_driver = RelayDriver(relay_pins, params[u"relays"], params[u"active"] == u"low")
+        relay_driver.init()
     except:
         pass
 
@@ -111,40 +182,10 @@ def init_pins():
 def on_zone_change(arg):  #  arg is just a necessary placeholder.
     """ Switch relays when core program signals a change in zone state."""
 
-    global pi
-
+    if relay_driver is None:
+        return
     with gv.output_srvals_lock:
-        for i in range(params[u"relays"]):
-            try:
-                if gv.output_srvals[i]:  # if station is set to on
-                    if (
-                        params[u"active"] == u"low"
-                    ):  # if the relay type is active low, set the output low
-                        if gv.use_pigpio:
-                            pi.write(relay_pins[i], 0)
-                        else:
-                            GPIO.output(relay_pins[i], GPIO.LOW)
-                    else:  # otherwise set it high
-                        if gv.use_pigpio:
-                            pi.write(relay_pins[i], 1)
-                        else:
-                            GPIO.output(relay_pins[i], GPIO.HIGH)
-                else:  # station is set to off
-                    if (
-                        params[u"active"] == u"low"
-                    ):  # if the relay type is active low, set the output high
-                        if gv.use_pigpio:
-                            pi.write(relay_pins[i], 1)
-                        else:
-                            GPIO.output(relay_pins[i], GPIO.HIGH)
-                    else:  # otherwise set it low
-                        if gv.use_pigpio:
-                            pi.write(relay_pins[i], 0)
-                        else:
-                            GPIO.output(relay_pins[i], GPIO.LOW)
-            except Exception as e:
-                print(u"Problem switching relays", e, relay_pins[i])
-                pass
+        relay_driver.update(gv.output_srvals)
 
 
 init_pins()
@@ -0,0 +1,23 @@
+import os
+import sys
+import types
+
+# Insert test directories and this plugin's directory
+TEST_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, TEST_DIR)
+STUB_DIR = os.path.join(TEST_DIR, "stubs")
+sys.path.insert(0, STUB_DIR)
+RELAY_DIR = os.path.realpath(os.path.join(TEST_DIR, '..'))
+sys.path.insert(0, RELAY_DIR)
+# Load stubbed-out components for relay_16
+sys.modules['web'] = __import__('stub_web')
+sys.modules['gv'] = __import__('stub_gv')
+sys.modules['urls'] = __import__('stub_urls')
+sys.modules['sip'] = __import__('stub_sip')
+sys.modules['webpages'] = __import__('stub_webpages')
+sys.modules['blinker'] = __import__('stub_blinker')
+sys.modules['six'] = __import__('stub_six')
+sys.modules['six.moves'] = sys.modules['six'].moves
+sys.modules['RPi.GPIO'] = __import__('stub_rpi_gpio')
+sys.modules['RPi'] = types.ModuleType('RPi')
+sys.modules['RPi'].GPIO = sys.modules['RPi.GPIO']
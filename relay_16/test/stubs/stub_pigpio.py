@@ -0,0 +1,29 @@
+# Stand-in for the pigpio module which records writes to the GPIO pins
+INPUT = 0
+OUTPUT = 1
+
+class pi:
+    def __init__(self, *args, **kwargs):
+        self.connected = True
+        # Each write in order: ("write", pin, level), ("set", mask), or ("clear", mask)
+        self.writes = []
+        # Number of upcoming bank writes which fail
+        self.pending_errors = 0
+
+    def set_mode(self, gpio, mode):
+        pass
+
+    def write(self, gpio, level):
+        self.writes.append((u"write", gpio, level))
+
+    def _bank_write(self, kind, mask):
+        if self.pending_errors > 0:
+            self.pending_errors -= 1
+            raise ConnectionResetError(u"pigpio daemon connection lost")
+        self.writes.append((kind, mask))
+
+    def set_bank_1(self, bits):
+        self._bank_write(u"set", bits)
+
+    def clear_bank_1(self, bits):
+        self._bank_write(u"clear", bits)
@@ -0,0 +1,29 @@
+# Stand-in for RPi.GPIO which records each call to output()
+BOARD = 10
+OUT = 0
+IN = 1
+LOW = 0
+HIGH = 1
+
+# Arguments of each call to output(), in order, as (pins, levels)
+writes = []
+# Number of upcoming calls to output() which fail
+pending_errors = 0
+
+def reset():
+    global pending_errors
+    del writes[:]
+    pending_errors = 0
+
+def setmode(mode):
+    pass
+
+def setup(pin, direction, pull_up_down=None):
+    pass
+
+def output(pins, levels):
+    global pending_errors
+    if pending_errors > 0:
+        pending_errors -= 1
+        raise RuntimeError(u"The GPIO channel has not been set up as an OUTPUT")
+    writes.append((pins, levels))
@@ -0,0 +1,8 @@
+def input(*args, **kwargs):
+    pass
+
+def seeother(*args, **kwargs):
+    pass
+
+def header(*args, **kwargs):
+    pass
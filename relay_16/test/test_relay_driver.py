@@ -0,0 +1,144 @@
+import unittest
+from unittest.mock import mock_open, patch
+# This will stub sip and pi-specific things out
+import relay_16_test_base
+# Now that things have been stubbed out, relay_16 may be imported
+import gv
+import stub_pigpio
+import stub_rpi_gpio as GPIO
+# The settings file is read on import
+SETTINGS = u'{"enabled": "off", "relays": 4, "active": "low"}'
+with patch('builtins.open', mock_open(read_data=SETTINGS)),\
+    patch('time.sleep')\
+:
+    import relay_16
+from relay_16 import RelayDriver
+
+# Broadcom pins of the relays
+PINS = [17, 27, 22, 23]
+
+def mask(*indices):
+    bits = 0
+    for i in indices:
+        bits |= 1 << PINS[i]
+    return bits
+
+class TestRelayDriverPigpio(unittest.TestCase):
+    def setUp(self):
+        self.pi = stub_pigpio.pi()
+        for patcher in [patch.object(gv, 'use_pigpio', True),
+                        patch('relay_16.pigpio', stub_pigpio, create=True),
+                        patch('relay_16.pi', self.pi),
+                        patch('relay_16.time.sleep')]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_driver(self, active_low):
+        driver = RelayDriver(PINS + [24], len(PINS), active_low)
+        driver.init()
+        self.pi.writes = []
+        return driver
+
+    def test_init(self):
+        RelayDriver(PINS, len(PINS), True).init()
+        # Active low relays are switched off with a HIGH output
+        self.assertEqual([(u"write", pin, 1) for pin in PINS], self.pi.writes)
+
+    def test_only_changes_written(self):
+        driver = self.make_driver(True)
+        self.assertEqual(0, driver.update([0, 0, 0, 0]))
+        self.assertEqual([], self.pi.writes)
+        self.assertEqual(2, driver.update([1, 0, 1, 0]))
+        self.assertEqual(0, driver.update([1, 0, 1, 0]))
+        self.assertEqual(1, driver.update([1, 0, 1, 1]))
+        self.assertEqual([(u"clear", mask(0, 2)), (u"clear", mask(3))], self.pi.writes)
+
+    def test_active_low(self):
+        driver = self.make_driver(True)
+        driver.update([1, 1, 0, 0])
+        self.pi.writes = []
+        # On relays are cleared; off relays are set
+        self.assertEqual(3, driver.update([0, 1, 1, 1]))
+        self.assertEqual([(u"set", mask(0)), (u"clear", mask(2, 3))], self.pi.writes)
+
+    def test_active_high(self):
+        driver = self.make_driver(False)
+        driver.update([1, 1, 0, 0])
+        self.assertEqual([(u"set", mask(0, 1))], self.pi.writes)
+        self.pi.writes = []
+        driver.update([0, 1, 1, 0])
+        self.assertEqual([(u"set", mask(2)), (u"clear", mask(0))], self.pi.writes)
+
+    def test_extra_stations_ignored(self):
+        driver = self.make_driver(True)
+        self.assertEqual(1, driver.update([0, 0, 0, 1, 1, 1]))
+        self.assertEqual([(u"clear", mask(3))], self.pi.writes)
+
+    def test_failed_write(self):
+        driver = self.make_driver(True)
+        driver.update([1, 0, 0, 0])
+        self.pi.writes = []
+        self.pi.pending_errors = 1
+        with patch('sys.stdout'):
+            self.assertEqual(0, driver.update([0, 1, 0, 0]))
+        # The relays which were being switched are unknown
+        self.assertEqual([None, None, False, False], driver.states)
+        # So they are written again even though the requested states didn't change
+        self.assertEqual(2, driver.update([0, 1, 0, 0]))
+        self.assertEqual([(u"set", mask(0)), (u"clear", mask(1))], self.pi.writes)
+        self.assertEqual([False, True, False, False], driver.states)
+
+class TestRelayDriverRpiGpio(unittest.TestCase):
+    def setUp(self):
+        GPIO.reset()
+        patcher = patch('relay_16.time.sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_changes_written(self):
+        driver = RelayDriver(PINS, len(PINS), True)
+        driver.init()
+        GPIO.reset()
+        self.assertEqual(2, driver.update([0, 1, 0, 1]))
+        self.assertEqual(0, driver.update([0, 1, 0, 1]))
+        self.assertEqual(1, driver.update([0, 1, 1, 1]))
+        # Changed relays are written with one call
+        self.assertEqual([([PINS[1], PINS[3]], [0, 0]), ([PINS[2]], [0])], GPIO.writes)
+
+    def test_active_high(self):
+        driver = RelayDriver(PINS, len(PINS), False)
+        driver.init()
+        GPIO.reset()
+        driver.update([1, 0, 0, 0])
+        driver.update([0, 1, 0, 0])
+        self.assertEqual([([PINS[0]], [1]), ([PINS[0], PINS[1]], [0, 1])], GPIO.writes)
+
+    def test_failed_write(self):
+        driver = RelayDriver(PINS, len(PINS), True)
+        driver.init()
+        GPIO.reset()
+        GPIO.pending_errors = 1
+        with patch('sys.stdout'):
+            self.assertEqual(0, driver.update([0, 0, 1, 0]))
+        self.assertEqual(1, driver.update([0, 0, 1, 0]))
+        self.assertEqual([([PINS[2]], [0])], GPIO.writes)
+
+class TestZoneChange(unittest.TestCase):
+    def setUp(self):
+        GPIO.reset()
+        with patch('relay_16.time.sleep'):
+            driver = RelayDriver(PINS, len(PINS), True)
+            driver.init()
+        GPIO.reset()
+        patcher = patch('relay_16.relay_driver', driver)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_zone_change(self):
+        with patch.object(gv, 'output_srvals', [1, 0, 0, 0]):
+            relay_16.on_zone_change(None)
+            relay_16.on_zone_change(None)
+        self.assertEqual([([PINS[0]], [0])], GPIO.writes)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,11 @@
+import threading
+
+plugin_menu = []
+use_pigpio = False
+use_gpio_pins = True
+platform = u"pi"
+# Board pin to Broadcom GPIO number
+pin_map = [0, 0, 0, 2, 0, 3, 0, 4, 14, 0, 15, 17, 18, 27, 0, 22, 23, 0, 24, 10, 0, 9, 25, 11, 8,
+           0, 7, 0, 0, 5, 0, 6, 12, 13, 0, 19, 16, 26, 20, 0, 21]
+output_srvals = []
+output_srvals_lock = threading.Lock()
@@ -0,0 +1,4 @@
+import types
+
+moves = types.ModuleType('six.moves')
+moves.range = range
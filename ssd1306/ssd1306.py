@@ -10,7 +10,10 @@ from urls import urls  # Get access to sip's URLs
 from sip import template_render  #  Needed for working with web.py templates
 from webpages import ProtectedPage  # Needed for security
 import json  # for working with data file
+import io
+import os
 from collections import OrderedDict
+from heapq import heappush, heappop
 
 # to write to the console
 import sys
@@ -33,10 +36,25 @@ import time
 # for i2c bus driver
 import smbus
 
+# i2c_msg is only provided when smbus is backed by smbus2 (needed for I2C_RDWR transfers)
+try:
+    from smbus import i2c_msg
+except ImportError:
+    i2c_msg = None
+
+# Adapter functionality bit for plain I2C transfers (I2C_FUNC_I2C from uapi/linux/i2c.h)
+I2C_FUNC_I2C = 0x00000001
+
 # Global delays
 STARTUP_DELAY = 5
 NORMAL_REFRESH_PERIOD = 1
 
+# Directory where bitmap font atlases (*.json) are loaded from
+FONT_DIRECTORY = u"./data/ssd1306_fonts"
+
+# Name of the panel which displays SIP state
+MAIN_PANEL = u"main"
+
 # Justification values
 JUSTIFY_LEFT = 0
 JUSTIFY_RIGHT = 1
@@ -61,6 +79,61 @@ def inc_matrix_ptr(row, col, min_row, max_row, min_col, max_col, inc):
 def is_python_3_or_better():
     return sys.version_info.major >= 3
 
+# Clock used for deadlines; python 2 has no monotonic clock, so fall back to wall time there
+monotonic = time.monotonic if is_python_3_or_better() else time.time
+
+class StationStateView:
+    """
+    Cached view of which stations are running. The set of running stations is only rescanned from
+    gv.ps and gv.srvals after SIP signals a change (zone_change or stations_scheduled); remaining
+    durations are always read live, but only for the running stations.
+    """
+    def __init__(self):
+        self._dirty = True
+        self._num_stations = 0
+        self._program_running = False
+        self._running_station_indices = ()
+
+    def invalidate(self, *args, **kw):
+        """
+        Marks the view as stale; connected to SIP's zone_change and stations_scheduled signals
+        """
+        self._dirty = True
+
+    def _refresh(self):
+        # Clear the flag first so that a signal received while scanning triggers another scan
+        self._dirty = False
+        program_running = False
+        running_station_indices = []
+        for i in range(len(gv.ps)):
+            if gv.ps[i][0] != 0:
+                program_running = True
+            if i + 1 != gv.sd[u"mas"] and gv.srvals[i]:
+                # not master and currently on
+                running_station_indices.append(i)
+        self._num_stations = len(gv.ps)
+        self._program_running = program_running
+        self._running_station_indices = tuple(running_station_indices)
+
+    def get_running_stations(self):
+        """
+        Returns (program_running, station_duration, running_stations) where station_duration is the
+        longest remaining duration of the running stations, and running_stations is a list of
+        1-based station numbers
+        """
+        if self._dirty or self._num_stations != len(gv.ps):
+            self._refresh()
+        station_duration = 0
+        for i in self._running_station_indices:
+            d = gv.ps[i][1]
+            if d > station_duration:
+                station_duration = d
+        return (self._program_running,
+                station_duration,
+                [i + 1 for i in self._running_station_indices])
+
+station_state_view = StationStateView()
+
 class SipGlobals:
     """
     Provides a "namespace" where global values are accessed.
@@ -97,19 +170,7 @@ class SipGlobals:
         return gv.sd[u"wl"]
     @staticmethod
     def get_running_stations():
-        running_stations = []
-        station_duration = 0
-        program_running = False
-        for i in range(len(gv.ps)):
-            p, d = gv.ps[i]
-            if p != 0:
-                program_running = True
-            if i + 1 != gv.sd[u"mas"] and gv.srvals[i]:
-                # not master and currently on
-                running_stations.append(i + 1)
-                if d > station_duration:
-                    station_duration = d
-        return (program_running, station_duration, running_stations)
+        return station_state_view.get_running_stations()
     @staticmethod
     def is_runonce_program_running():
         return (gv.pon == 98)
@@ -117,6 +178,71 @@ class SipGlobals:
     def is_manual_mode_program_running():
         return (gv.pon == 99)
 
+class CoalescingQueue:
+    """
+    Priority queue of pending items keyed by name. Items put for a key which is already pending are
+    coalesced into that key's entry instead of being queued separately. Higher priority keys are
+    popped first; keys of equal priority are popped in the order they were first queued.
+    Note: this class is not thread safe.
+    """
+    def __init__(self):
+        self._heap = []
+        # Key is the entry name, value is [priority, sequence number, list of items]
+        self._pending = {}
+        self._sequence = 0
+        self._coalesced_count = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    @property
+    def coalesced_count(self):
+        """
+        Returns the number of items which were discarded because a newer item superseded them
+        """
+        return self._coalesced_count
+
+    def _push(self, key, entry):
+        self._sequence += 1
+        entry[1] = self._sequence
+        heappush(self._heap, (-entry[0], entry[1], key))
+
+    def put(self, key, item, priority=0, replace=True):
+        """
+        Queues an item.
+        Inputs: key - The name which items are coalesced under
+                item - The item to queue
+                priority - Integer priority; higher values are popped first
+                replace - True if this item supersedes any items already pending for key; False to
+                          keep pending items and append this one after them
+        """
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = [priority, 0, []]
+            self._pending[key] = entry
+            self._push(key, entry)
+        elif priority > entry[0]:
+            # Raise this key's position in the queue; the old heap item will be skipped on pop
+            entry[0] = priority
+            self._push(key, entry)
+        if replace:
+            self._coalesced_count += len(entry[2])
+            del entry[2][:]
+        entry[2].append(item)
+
+    def pop(self):
+        """
+        Removes the next key from the queue.
+        Returns: (key, priority, list of items in the order they were put)
+        """
+        while self._heap:
+            (_, sequence, key) = heappop(self._heap)
+            entry = self._pending.get(key)
+            if entry is not None and entry[1] == sequence:
+                del self._pending[key]
+                return (key, entry[0], entry[2])
+        raise IndexError(u"pop from empty CoalescingQueue")
+
 class Screen:
     """
     Virtual SSD1306 screen. This screen has internal data setup to conform to the way Lcd sets data
@@ -235,19 +361,34 @@ class Screen:
         #       better be divisible by 8 (rounding up to the nearest 8 here to be sure)
         num_rows = (screen_pixel_height + 7) // 8
         self._max_row_addr = num_rows - 1
-        # The screen data
-        self._screen_bytes = [bytearray(screen_pixel_width) for _ in range(num_rows)]
+        # The screen data - a single contiguous, page-major frame buffer (one SSD1306 page per row)
+        self._framebuffer = bytearray(screen_pixel_width * num_rows)
+        # Each row is a view into the frame buffer so that rows may be written and read in place
+        framebuffer_view = memoryview(self._framebuffer)
+        self._screen_bytes = [
+            framebuffer_view[i * screen_pixel_width:(i + 1) * screen_pixel_width]
+            for i in range(num_rows)
+        ]
 
     def copy(self):
         pixel_width = self._max_col_addr + 1
         pixel_height = (self._max_row_addr + 1) * 8
         screen_copy = Screen(screen_pixel_width=pixel_width,
                              screen_pixel_height=pixel_height)
-        for (from_row, to_row) in zip(self._screen_bytes, screen_copy._screen_bytes):
-            # This forces a copy of bytes into the target row object
-            to_row[0:pixel_width] = from_row
+        screen_copy.copy_from(self)
         return screen_copy
 
+    def copy_from(self, screen):
+        """
+        Copies the contents of the given screen into this screen without allocating new buffers.
+        Inputs: screen - A Screen with the same dimensions as this screen
+        """
+        if len(screen._framebuffer) != len(self._framebuffer):
+            raise ValueError(u"screen size [{}] != this screen size [{}]"
+                             .format(len(screen._framebuffer), len(self._framebuffer)))
+        # This forces a copy of bytes into the target frame buffer
+        self._framebuffer[:] = screen._framebuffer
+
     @property
     def row_start(self):
         return 0
@@ -267,10 +408,17 @@ class Screen:
     @property
     def bytes(self):
         """
-        Returns a reference to the screen bytes as a 2D list of bytearrays.
+        Returns a reference to the screen bytes as a 2D list of row views into the frame buffer.
         """
         return self._screen_bytes
 
+    @property
+    def buffer(self):
+        """
+        Returns a view of the entire page-major frame buffer.
+        """
+        return memoryview(self._framebuffer)
+
     @staticmethod
     def bytes_to_string(screen_bytes):
         screen_width = len(screen_bytes[0])
@@ -310,7 +458,8 @@ class Screen:
                     col_end=None,
                     min_text_size=1,
                     max_text_size=1,
-                    justification=0):
+                    justification=0,
+                    font=None):
         """
         Writes text to the LCD, autoformatting within the space specified.
         Inputs: str - The string to write
@@ -321,11 +470,14 @@ class Screen:
                 min_text_size - The minimum size (scale) for this text (int)
                 max_text_size - The maximum size (scale) for this text (int)
                 justification - One of the JUSTIFY_* values (LEFT, RIGHT, or CENTER)
+                font - The Font to write with (text sizes are ignored) or None for the built-in
+                       font scaled by text size
         """
         if row_end is None:
             # Compute the end row based on the text size and number of lines in string
             num_lines = len(string.split(u"\n"))
-            row_end = min(self.row_end, row_start + (num_lines * max_text_size - 1))
+            line_rows = max_text_size if font is None else font.num_rows
+            row_end = min(self.row_end, row_start + (num_lines * line_rows - 1))
         if col_end is None:
             col_end = self.col_end
         return self.get_screen_block(row_start=row_start,
@@ -335,15 +487,17 @@ class Screen:
             .write_block(string=string,
                          min_text_size=min_text_size,
                          max_text_size=max_text_size,
-                         justification=justification)
+                         justification=justification,
+                         font=font)
 
-    def write_line(self, string, row_start, text_size_multiplier=1, justification=0):
+    def write_line(self, string, row_start, text_size_multiplier=1, justification=0, font=None):
         """
         Writes a horizontal line of text to the screen.
-        Inputs: str - The ASCII string to print
+        Inputs: str - The string to print
                 row_start - The vertical position to write to (0-based, from top)
                 text_size_multiplier - Scaling for text (how many rows to occupy)
                 justification - One of the JUSTIFY_* values (LEFT, RIGHT, or CENTER)
+                font - The Font to write with or None for the built-in font
         Returns 1 if successful, 0 if invalid arguments given
         """
         return self.get_screen_block(row_start=row_start,
@@ -352,17 +506,18 @@ class Screen:
                                      col_end=self.col_end)\
             .write_line(string=string,
                         text_size_multiplier=text_size_multiplier,
-                        justification=justification)
+                        justification=justification,
+                        font=font)
 
     def clear(self):
-        self._screen_bytes = \
-            [bytearray(len(self._screen_bytes[0])) for _ in range(len(self._screen_bytes))]
+        # Zero in place so that any row views remain valid
+        self._framebuffer[:] = bytes(len(self._framebuffer))
 
     def serialize(self):
         """
         Returns: All bytes in my screen data as a serializes stream of bytes.
         """
-        return bytearray([item for sublist in self._screen_bytes for item in sublist])
+        return bytearray(self._framebuffer)
 
     def get_screen_block(self, row_start, row_end, col_start=0, col_end=None):
         """
@@ -427,8 +582,8 @@ class ScreenBlock:
     @property
     def bytes(self):
         """
-        Returns a copy of the bytes in a 2D array as a list of bytearrays, confined to this screen
-        block.
+        Returns the bytes in a 2D array as a list of views into the screen's frame buffer, confined
+        to this screen block. No data is copied.
         """
         return [self._screen.bytes[i][self.col_start:self.col_end + 1]
                 for i in range(self.row_start, self.row_end + 1)]
@@ -443,6 +598,9 @@ class ScreenBlock:
         Inputs: b - A 1D list of bytes to write at current position
         Returns: (new_row, new_col)
         """
+        # Rows are memoryviews which may only be assigned from bytes-like objects
+        if not isinstance(b, (bytes, bytearray, memoryview)):
+            b = bytearray(b)
         # Compute current selection size
         columns = self.col_end - self.col_start + 1
         rows = self.row_end - self.row_start + 1
@@ -491,17 +649,31 @@ class ScreenBlock:
         return (new_row, new_col)
 
     def serialize(self):
-        return bytearray(
-            [
-                item
-                for sublist in self._screen.bytes[self._row_start:self._row_end + 1]
-                    for item in sublist[self._col_start:self._col_end + 1]
-            ]
-        )
+        if self._col_start == self._screen.col_start and self._col_end == self._screen.col_end:
+            # Full-width blocks are contiguous in the page-major frame buffer
+            width = self._screen.col_end + 1
+            return bytearray(
+                self._screen.buffer[self._row_start * width:(self._row_end + 1) * width]
+            )
+        return bytearray().join(self.bytes)
+
+    def copy_from(self, block):
+        """
+        Copies the contents of the given block into this block without allocating new buffers.
+        Inputs: block - A ScreenBlock with the same dimensions as this block
+        """
+        if (
+            block.row_end - block.row_start != self.row_end - self.row_start
+            or block.col_end - block.col_start != self.col_end - self.col_start
+        ):
+            raise ValueError(u"block size does not match this block size")
+        for (row, block_row) in zip(self.bytes, block.bytes):
+            row[:] = block_row
 
     def clear(self):
+        blank = bytes(self.col_end - self.col_start + 1)
         for row in self._screen.bytes[self.row_start:self.row_end + 1]:
-            row[self.col_start:self.col_end + 1] = bytearray(self.col_end - self.col_start + 1)
+            row[self.col_start:self.col_end + 1] = blank
 
     @staticmethod
     def _bit_shift_right_byte_list(lst, num):
@@ -535,10 +707,9 @@ class ScreenBlock:
         Resizes a single character into the rows needed to print
         Inputs: char - The ascii character to print
                 n - integer size multiplier [1,N]
-        Returns: A list of lists, defining what bits to write to each row
+        Returns: A list of bytearrays, defining what bits to write to each row
         """
         chv = ord(char)
-        seq = []
         if chv >= Screen.LCD_ASCII_BEGIN and chv <= Screen.LCD_ASCII_MAX:
             seq = bytearray(Screen.LCD_ASCII[chv - Screen.LCD_ASCII_BEGIN])
         else:  # unknown
@@ -546,7 +717,7 @@ class ScreenBlock:
         # 1 vertical line of space before next char
         seq.append(0x00)
         # Make a 0-initialized 2-dimensional return array, n tall by n wide
-        ret_seq = [[0] * (len(seq) * size) for _ in range(size)]
+        ret_seq = [bytearray(len(seq) * size) for _ in range(size)]
         # col_mask holds what vertical bits must be set in each row for the current bit
         # (left to right) when the current bit is HIGH
         col_mask = [0] * size
@@ -573,14 +744,28 @@ class ScreenBlock:
             col_mask = ScreenBlock._bit_shift_right_byte_list(col_mask, size)
         return ret_seq
 
-    def write_block(self, string, min_text_size, max_text_size, justification=0):
+    def write_block(self, string, min_text_size, max_text_size, justification=0, font=None):
         """
         Writes text to the LCD, autoformatting within the space specified
         Inputs: str - The string to write
                 min_text_size - The minimum size (scale) for this text (int)
                 max_text_size - The maximum size (scale) for this text (int)
                 justification - One of the JUSTIFY_* values (LEFT, RIGHT, or CENTER)
-        """
+                font - The Font to write with (text sizes are ignored) or None for the built-in
+                       font scaled by text size
+        """
+        if font is not None:
+            # A font atlas has a single size, so lines are simply stacked
+            self.clear()
+            cnt = 0
+            for (i, line) in enumerate(string.split(u"\n")):
+                if i * font.num_rows > self.row_end - self.row_start:
+                    break
+                cnt += self.write_line(string=line,
+                                       row_offset=i * font.num_rows,
+                                       justification=justification,
+                                       font=font)
+            return cnt
         if (
             min_text_size > max_text_size or
             min_text_size <= 0 or
@@ -615,26 +800,28 @@ class ScreenBlock:
                                    justification=justification)
         return cnt
 
-    def write_line(self, string, row_offset=0, text_size_multiplier=1, justification=0):
+    def write_line(self,
+                   string,
+                   row_offset=0,
+                   text_size_multiplier=1,
+                   justification=0,
+                   font=None):
         """
         Writes a horizontal line of text to the screen.
-        Inputs: str - The ASCII string to print
-                text_size_multiplier - Scaling for text (how many rows to occupy)
+        Inputs: str - The string to print
+                text_size_multiplier - Scaling for text (how many rows to occupy); ignored when a
+                                       font is given
                 justification - One of the JUSTIFY_* values (LEFT, RIGHT, or CENTER)
+                font - The Font to write with or None for the built-in font
         Returns 1 if successful, 0 if invalid arguments given
         """
         if len(string) <= 0:
             string = " "
-        seq = []
-        for c in string:
-            seqChar = self._generate_char_sequence(c, text_size_multiplier)
-            if len(seq) <= 0:
-                seq = seqChar
-            else:
-                for i in range(len(seq)):
-                    seq[i].extend(seqChar[i])
+        if font is None:
+            font = Font.builtin(text_size_multiplier)
+        seq = font.render_line(string)
 
-        maxNumRows = text_size_multiplier
+        maxNumRows = font.num_rows
         maxNumCols = self.col_end - self.col_start + 1
         # Remove rows until we get the number of rows in range
         del seq[maxNumRows:]
@@ -643,19 +830,15 @@ class ScreenBlock:
         if columnsToAdd > 0:
             for i in range(len(seq)):
                 if justification == JUSTIFY_RIGHT:
-                    newSeq = [0] * columnsToAdd
-                    newSeq.extend(seq[i])
-                    seq[i] = newSeq
+                    seq[i][0:0] = bytes(columnsToAdd)
                 elif justification == JUSTIFY_CENTER:
                     columnsToAddLeft = columnsToAdd // 2
                     columnsToAddRight = columnsToAdd - columnsToAddLeft
-                    newSeq = [0] * columnsToAddLeft
-                    newSeq.extend(seq[i])
-                    newSeq.extend([0] * columnsToAddRight)
-                    seq[i] = newSeq
+                    seq[i][0:0] = bytes(columnsToAddLeft)
+                    seq[i].extend(bytes(columnsToAddRight))
                 else:
                     # Left justification by default
-                    seq[i].extend([0] * columnsToAdd)
+                    seq[i].extend(bytes(columnsToAdd))
         # Remove columns until we get the number of columns in range
         columnsToRemove = len(seq[0]) - maxNumCols
         if columnsToRemove > 0:
@@ -670,11 +853,325 @@ class ScreenBlock:
                 else:
                     # Left justification by default
                     del seq[i][-columnsToRemove:]
-        self.set_bytes([item for sublist in seq for item in sublist],
+        self.set_bytes(bytearray().join(seq),
                        cur_row=(self.row_start + row_offset),
                        cur_col=self.col_start)
         return 1
 
+class Font:
+    """
+    Bitmap font atlas. Glyphs are pre-rasterised into a single page-major byte array where each
+    glyph is stored as one run of its column bytes per SSD1306 page, so rendering a line of text is
+    just a matter of slicing glyphs out of the atlas. Glyphs may have different (proportional)
+    widths and may be any unicode character.
+    """
+    # Character used for the glyph of unknown characters in the built-in font
+    REPLACEMENT_CHAR = u"\ufffd"
+    # Built-in font rasterised at each text size, created as needed
+    _builtin_fonts = {}
+    # Key is the font name, value is a loaded Font
+    _registry = {}
+
+    def __init__(self, name, num_rows, glyphs, spacing=0, default_char=None):
+        """
+        Initializes a Font object
+        Inputs: name - The name which this font is addressed by
+                num_rows - The height of each glyph in SSD1306 rows (8 vertical pixels each)
+                glyphs - Dictionary of character to glyph, where each glyph is a list of num_rows
+                         bytes-like rows of equal width
+                spacing - The number of blank columns to add after each glyph
+                default_char - Character whose glyph is drawn for characters not in this font; when
+                               None, those characters are skipped
+        """
+        self.name = name
+        self.num_rows = num_rows
+        self.spacing = spacing
+        self._atlas = bytearray()
+        # Key is the character, value is (atlas offset, width in columns)
+        self._glyphs = {}
+        for (char, rows) in glyphs.items():
+            if len(rows) != num_rows:
+                raise ValueError(u"glyph [{}] has {} rows; expected {}"
+                                 .format(char, len(rows), num_rows))
+            width = len(rows[0])
+            offset = len(self._atlas)
+            for row in rows:
+                if len(row) != width:
+                    raise ValueError(u"glyph [{}] rows differ in width".format(char))
+                self._atlas.extend(row)
+            self._glyphs[char] = (offset, width)
+        self._default_glyph = None
+        if default_char is not None:
+            if default_char not in self._glyphs:
+                raise ValueError(u"default character [{}] not in font".format(default_char))
+            self._default_glyph = self._glyphs[default_char]
+
+    @staticmethod
+    def builtin(size=1):
+        """
+        Returns the built-in 5x7 font scaled by the given integer size. Each size is rasterised only
+        once, so large text no longer has to be upscaled character by character.
+        """
+        font = Font._builtin_fonts.get(size, None)
+        if font is None:
+            glyphs = {
+                Font.REPLACEMENT_CHAR: ScreenBlock._generate_char_sequence(Font.REPLACEMENT_CHAR,
+                                                                          size)
+            }
+            for chv in range(Screen.LCD_ASCII_BEGIN, Screen.LCD_ASCII_MAX + 1):
+                glyphs[chr(chv)] = ScreenBlock._generate_char_sequence(chr(chv), size)
+            font = Font(name=u"builtin",
+                        num_rows=size,
+                        glyphs=glyphs,
+                        default_char=Font.REPLACEMENT_CHAR)
+            Font._builtin_fonts[size] = font
+        return font
+
+    @staticmethod
+    def from_dict(settings):
+        """
+        Creates a Font from an atlas dictionary with the keys "name", "height" (in pixels; rounded
+        up to whole rows), "spacing", "default" (character), and "glyphs". Each glyph is a hex
+        string of its page-major column bytes: the columns of the top row from left to right,
+        followed by the columns of each row below it.
+        """
+        num_rows = (int(settings[u"height"]) + 7) // 8
+        glyphs = {}
+        for (char, hex_string) in settings[u"glyphs"].items():
+            data = bytearray.fromhex(hex_string)
+            if len(data) % num_rows != 0:
+                raise ValueError(u"glyph [{}] size is not a multiple of the height".format(char))
+            width = len(data) // num_rows
+            glyphs[char] = [data[i * width:(i + 1) * width] for i in range(num_rows)]
+        return Font(name=settings[u"name"],
+                    num_rows=num_rows,
+                    glyphs=glyphs,
+                    spacing=int(settings.get(u"spacing", 1)),
+                    default_char=settings.get(u"default", None))
+
+    @staticmethod
+    def register(font):
+        """
+        Registers a font so that it may be looked up by name
+        """
+        Font._registry[font.name] = font
+
+    @staticmethod
+    def get(name):
+        """
+        Returns the registered font with the given name or None if not found
+        """
+        return Font._registry.get(name, None)
+
+    @staticmethod
+    def load_directory(directory=FONT_DIRECTORY):
+        """
+        Loads and registers every font atlas (*.json) in the given directory
+        Returns: The number of fonts loaded
+        """
+        if not os.path.isdir(directory):
+            return 0
+        count = 0
+        for file_name in sorted(os.listdir(directory)):
+            if file_name.endswith(u".json"):
+                try:
+                    # Atlases may contain non-ASCII characters
+                    with io.open(os.path.join(directory, file_name), 'r', encoding='utf-8') as f:
+                        Font.register(Font.from_dict(json.load(f)))
+                    count += 1
+                except Exception as ex:
+                    print(u"SSD1306 plugin: Failed to load font {}: {}".format(file_name, ex))
+        return count
+
+    def _get_glyph(self, char):
+        return self._glyphs.get(char, self._default_glyph)
+
+    def measure(self, string):
+        """
+        Returns the width of the given string in columns
+        """
+        width = 0
+        for char in string:
+            glyph = self._get_glyph(char)
+            if glyph is not None:
+                width += glyph[1] + self.spacing
+        return width
+
+    def render_line(self, string):
+        """
+        Renders a line of text
+        Returns: A list of num_rows bytearrays, defining what bits to write to each row
+        """
+        atlas = memoryview(self._atlas)
+        spacer = bytes(self.spacing)
+        rows = [bytearray() for _ in range(self.num_rows)]
+        for char in string:
+            glyph = self._get_glyph(char)
+            if glyph is not None:
+                (offset, width) = glyph
+                for (i, row) in enumerate(rows):
+                    start = offset + i * width
+                    row += atlas[start:start + width]
+                    row += spacer
+        return rows
+
+class I2cStatistics:
+    """
+    Thread-safe counters and latency histogram for I2C transactions
+    """
+    # Upper bounds of each latency histogram bucket in milliseconds (last bucket is unbounded)
+    LATENCY_BUCKETS_MS = [0.25, 0.5, 1, 2, 5, 10, 20, 50]
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        self._lock.acquire()
+        try:
+            self._transaction_count = 0
+            self._byte_count = 0
+            self._error_count = 0
+            self._last_error = None
+            self._total_latency = 0.0
+            self._max_latency = 0.0
+            self._latency_histogram = [0] * (len(I2cStatistics.LATENCY_BUCKETS_MS) + 1)
+        finally:
+            self._lock.release()
+
+    @property
+    def transaction_count(self):
+        return self._transaction_count
+
+    @property
+    def byte_count(self):
+        return self._byte_count
+
+    @property
+    def error_count(self):
+        return self._error_count
+
+    @property
+    def last_error(self):
+        return self._last_error
+
+    def record(self, num_bytes, latency):
+        """
+        Records a successful transaction
+        Inputs: num_bytes - Number of bytes written, including the command byte
+                latency - Duration of the transaction in seconds
+        """
+        latency_ms = latency * 1000.0
+        idx = 0
+        for bucket in I2cStatistics.LATENCY_BUCKETS_MS:
+            if latency_ms <= bucket:
+                break
+            idx += 1
+        self._lock.acquire()
+        try:
+            self._transaction_count += 1
+            self._byte_count += num_bytes
+            self._total_latency += latency
+            self._max_latency = max(self._max_latency, latency)
+            self._latency_histogram[idx] += 1
+        finally:
+            self._lock.release()
+
+    def record_error(self, error):
+        """
+        Records a failed transaction
+        Inputs: error - The exception which was raised
+        """
+        self._lock.acquire()
+        try:
+            self._error_count += 1
+            self._last_error = {
+                u"time": time.time(),
+                u"message": u"{}: {}".format(type(error).__name__, error)
+            }
+        finally:
+            self._lock.release()
+
+    def to_dict(self):
+        """
+        Returns these statistics as a JSON serializable dictionary
+        """
+        self._lock.acquire()
+        try:
+            labels = [u"<={}ms".format(bucket) for bucket in I2cStatistics.LATENCY_BUCKETS_MS]
+            labels.append(u">{}ms".format(I2cStatistics.LATENCY_BUCKETS_MS[-1]))
+            if self._transaction_count > 0:
+                mean_latency_ms = self._total_latency * 1000.0 / self._transaction_count
+            else:
+                mean_latency_ms = 0.0
+            return {
+                u"transaction_count": self._transaction_count,
+                u"byte_count": self._byte_count,
+                u"error_count": self._error_count,
+                u"last_error": self._last_error,
+                u"mean_latency_ms": mean_latency_ms,
+                u"max_latency_ms": self._max_latency * 1000.0,
+                u"latency_histogram": OrderedDict(zip(labels, self._latency_histogram))
+            }
+        finally:
+            self._lock.release()
+
+class SmbusBlockTransport:
+    """
+    Writes to an I2C device using SMBus byte and I2C block writes. Supported by all SMBus adapters.
+    """
+    # write_i2c_block_data() can execute a max of 32 bytes at a time
+    MAX_CHUNK_SIZE = 32
+
+    def __init__(self, bus, hw_write_addr):
+        self._bus = bus
+        self._hw_write_addr = hw_write_addr
+
+    @property
+    def max_chunk_size(self):
+        return SmbusBlockTransport.MAX_CHUNK_SIZE
+
+    def write_byte(self, cmd, byte):
+        self._bus.write_byte_data(self._hw_write_addr, cmd, byte)
+
+    def write_chunk(self, cmd, chunk):
+        """
+        Writes a chunk of at most max_chunk_size bytes, preceded by the given command byte.
+        """
+        # write_i2c_block_data() only accepts list of integers, so convert views to list
+        if isinstance(chunk, memoryview):
+            chunk = chunk.tolist()
+        self._bus.write_i2c_block_data(self._hw_write_addr, cmd, chunk)
+
+class I2cRdwrTransport(SmbusBlockTransport):
+    """
+    Writes to an I2C device using a single I2C_RDWR message per chunk. This allows an entire
+    SSD1306 page (command byte + 128 data bytes) to be sent in one transaction.
+    """
+    MAX_CHUNK_SIZE = 128
+
+    @property
+    def max_chunk_size(self):
+        return I2cRdwrTransport.MAX_CHUNK_SIZE
+
+    def write_chunk(self, cmd, chunk):
+        buf = bytearray(len(chunk) + 1)
+        buf[0] = cmd
+        buf[1:] = chunk
+        self._bus.i2c_rdwr(i2c_msg.write(self._hw_write_addr, buf))
+
+    @staticmethod
+    def is_supported(bus):
+        """
+        Returns True if the given bus is able to execute I2C_RDWR transfers
+        """
+        if i2c_msg is None or not hasattr(bus, u"i2c_rdwr"):
+            return False
+        try:
+            return bool(int(bus.funcs) & I2C_FUNC_I2C)
+        except Exception:
+            return False
+
 class Lcd:
     """
     LCD control class for SSD1306 I2C LCD
@@ -690,7 +1187,8 @@ class Lcd:
                  i2c_hw_addr=0x78,
                  i2c_bus_number=1,
                  screen_pixel_width=128,
-                 screen_pixel_height=64):
+                 screen_pixel_height=64,
+                 transport=None):
         """
         Initializes an Lcd object
         Inputs: i2c_hw_addr - The hardware address of this Lcd (excluding leading R/W bit)
@@ -701,11 +1199,21 @@ class Lcd:
                 screen_pixel_width - The number of horizontal pixels for this Lcd
                 screen_pixel_height - The number of vertical pixels for this Lcd
                                       (must be divisible by 8)
+                transport - The transport used to write to the bus; by default, I2C_RDWR is used
+                            when the adapter supports it, otherwise SMBus block writes are used
         """
         # hardware address of LCD (bit shift address 1 to the right to make write operation)
         self._hw_write_addr = i2c_hw_addr >> 1
         # i2c bus
         self._bus = smbus.SMBus(i2c_bus_number)
+        if transport is None:
+            if I2cRdwrTransport.is_supported(self._bus):
+                transport = I2cRdwrTransport(self._bus, self._hw_write_addr)
+            else:
+                transport = SmbusBlockTransport(self._bus, self._hw_write_addr)
+        self._transport = transport
+        # I2C transaction instrumentation
+        self._statistics = I2cStatistics()
         # Lock needed for any write operations
         self._write_lock = Lock()
         # defined minimum and maximum LCD addresses
@@ -729,6 +1237,13 @@ class Lcd:
         # Allow external interface to disable me
         self._enabled = True
 
+    @property
+    def statistics(self):
+        """
+        Returns the I2cStatistics for this Lcd
+        """
+        return self._statistics
+
     def disable(self):
         """
         Disables any further writing to hardware and powers off display
@@ -755,9 +1270,12 @@ class Lcd:
         try:
             if self._enabled or force:
                 try:
-                    self._bus.write_byte_data(self._hw_write_addr, Lcd.CONTROL_BYTE, byte)
+                    start_time = monotonic()
+                    self._transport.write_byte(Lcd.CONTROL_BYTE, byte)
+                    self._statistics.record(2, monotonic() - start_time)
                     status = True
                 except Exception as e:
+                    self._statistics.record_error(e)
                     if not self._write_failure:
                         print(u"SSD1306 plugin: Failed to write control byte. " +
                                 u"Is the hardware connected and the right address selected?" + \
@@ -778,10 +1296,13 @@ class Lcd:
         try:
             if self._enabled:
                 try:
-                    self._bus.write_byte_data(self._hw_write_addr, Lcd.DATA_BYTE, byte)
+                    start_time = monotonic()
+                    self._transport.write_byte(Lcd.DATA_BYTE, byte)
+                    self._statistics.record(2, monotonic() - start_time)
                     self._set_screen_bytes([byte])
                     status = True
                 except Exception as e:
+                    self._statistics.record_error(e)
                     if not self._write_failure:
                         print(u"SSD1306 plugin: Failed to write data byte. " +
                                 u"Is the hardware connected and the right address selected?" + \
@@ -793,25 +1314,29 @@ class Lcd:
 
     def _write_sequence(self, cmd, sequence):
         """
-        Writes a given sequence to the SSD1306 display. Sequence is written 32 bytes at a time.
+        Writes a given sequence to the SSD1306 display. Sequence is written in chunks of the
+        transport's maximum chunk size (32 bytes for SMBus block writes, 128 for I2C_RDWR).
         Inputs: cmd - Command byte
                 sequence - List of bytes to write
         Returns: True if successfully written; False if an exception occurred
         """
-        # write_i2c_block_data() only accepts list of integers, so convert bytearray to list
-        if isinstance(sequence, bytearray):
-            sequence = list(sequence)
+        # Slice buffers through a view so that no intermediate copies are made before the bus
+        if isinstance(sequence, (bytes, bytearray)):
+            sequence = memoryview(sequence)
         status = False
         self._write_lock.acquire()
         try:
             if self._enabled:
-                # write_i2c_block_data() can execute a max of 32 bytes at a time
-                n = 32
-                for chunk in [sequence[i:i + n] for i in range(0, len(sequence), n)]:
+                n = self._transport.max_chunk_size
+                for i in range(0, len(sequence), n):
+                    chunk = sequence[i:i + n]
                     try:
                         # execute this chunk
-                        self._bus.write_i2c_block_data(self._hw_write_addr, cmd, chunk)
+                        start_time = monotonic()
+                        self._transport.write_chunk(cmd, chunk)
+                        self._statistics.record(len(chunk) + 1, monotonic() - start_time)
                     except Exception as e:
+                        self._statistics.record_error(e)
                         if not self._write_failure:
                             print(u"SSD1306 plugin: Failed to execute sequence. " +
                                 u"Is the hardware connected and the right address selected?" + \
@@ -853,6 +1378,7 @@ class Lcd:
         clear display
         """
         print(u"SSD1306 plugin: LCD initialize...")
+        num_pixel_rows = (self._max_row_addr + 1) * 8
         # initialization sequence
         init_sequence = [
             Lcd.LCD_CONTROL_PWR_OFF,  # turn off oled panel
@@ -864,7 +1390,7 @@ class Lcd:
             0xA1,  # set segment re-map 95 to 0
             0xA6,  # set normal display
             0xA8,  # set multiplex ratio(1 to 64)
-            0x3F,  # 1/64 duty
+            num_pixel_rows - 1,  # 1/64 duty for 128x64 (1/32 for 128x32)
             0xD3,  # set display offset
             0x00,  # not offset
             0xD5,  # set display clock divide ratio/oscillator frequency
@@ -872,7 +1398,7 @@ class Lcd:
             0xD9,  # set pre-charge period
             0xF1,
             0xDA,  # set com pins hardware configuration
-            0x12,
+            0x02 if num_pixel_rows <= 32 else 0x12,  # sequential for 128x32; alternative otherwise
             0xDB,  # set vcomh
             0x40,
             0x8D,  # set Charge Pump enable/disable
@@ -918,26 +1444,37 @@ class Lcd:
         """
         Writes the given screen based on what is currently displayed and given screen.
         Inputs: screen - Either a Screen or ScreenBlock object
+        Returns: True if successfully written; False if an exception occurred
+        """
+        status = True
+        for row_status in self.iter_write_screen(screen, force):
+            status = row_status
+        return status
+
+    def iter_write_screen(self, screen, force=False):
+        """
+        Generator which writes the given screen like write_screen, but yields after each row that
+        is written so that writes to multiple displays on the same bus may be interleaved.
+        Inputs: screen - Either a Screen or ScreenBlock object
+        Yields: True for each successfully written row; False once if writing failed
         """
         current_bytes = self._screen.bytes_block(row_start=screen.row_start,
                                                  row_end=screen.row_end,
                                                  col_start=screen.col_start,
                                                  col_end=screen.col_end)
         new_bytes = screen.bytes
-        status = True
         if force or current_bytes != new_bytes:
             # Write row by row to cut down on write time
             for (cur_row, new_row, idx) in zip(current_bytes, new_bytes, range(len(new_bytes))):
                 if force or cur_row != new_row:
-                    if self._lcd_set_pointer(row=screen.row_start + idx,
-                                             col=screen.col_start):
-                        if not self._write_data_sequence(new_row):
-                            status = False
-                            break
-                    else:
-                        status = False
-                        break
-        return status
+                    if (
+                        not self._lcd_set_pointer(row=screen.row_start + idx,
+                                                  col=screen.col_start)
+                        or not self._write_data_sequence(new_row)
+                    ):
+                        yield False
+                        return
+                    yield True
 
     def clear(self, force=False):
         """
@@ -961,6 +1498,87 @@ class Lcd:
             status = self._write_control_sequence(seq)
         return status
 
+class Panel:
+    """
+    A display driven by LcdPlugin: its hardware settings, named screen regions, and the double
+    buffered frames which are flushed to its Lcd
+    """
+    def __init__(self,
+                 name,
+                 i2c_hw_addr=0x78,
+                 i2c_bus_number=1,
+                 screen_pixel_width=128,
+                 screen_pixel_height=64,
+                 regions=None):
+        """
+        Initializes a Panel object
+        Inputs: name - The name which displays address this panel by
+                i2c_hw_addr - The hardware address of this panel's Lcd
+                i2c_bus_number - The I2C bus number of this panel's Lcd
+                screen_pixel_width - The number of horizontal pixels for this panel
+                screen_pixel_height - The number of vertical pixels for this panel
+                regions - Dictionary of region name to [row_start, row_end, col_start, col_end]
+                          (inclusive) which displays may be confined to
+        """
+        self.name = name
+        self.i2c_hw_addr = i2c_hw_addr
+        self.i2c_bus_number = i2c_bus_number
+        self.screen_pixel_width = screen_pixel_width
+        self.screen_pixel_height = screen_pixel_height
+        self.lcd = None
+        self.blank_screen = self.new_screen()
+        self.regions = OrderedDict()
+        if regions:
+            for region_name in sorted(regions):
+                bounds = tuple(int(v) for v in regions[region_name])
+                # Make sure the bounds fit on this panel
+                self.blank_screen.get_screen_block(*bounds)
+                self.regions[region_name] = bounds
+        # Double buffered output - frames are presented to the back screen, and the flush thread
+        # swaps it with the front screen before writing the front screen to the Lcd
+        self.back_screen = self.new_screen()
+        self.front_screen = self.new_screen()
+        self.frame_pending = False
+        # List of (region name, Screen) which are drawn over each frame presented to this panel
+        self.overlays = []
+        # The (screen key, ((region, screen key), ...)) last shown on this panel; initially blank
+        self.shown_keys = (None, ())
+
+    @staticmethod
+    def from_dict(settings):
+        """
+        Creates a Panel from a settings dictionary with the keys "name", "i2c_hw_address" (hex
+        string), "i2c_bus", "width", "height", and "regions"
+        """
+        i2c_hw_addr = settings.get(u"i2c_hw_address", u"78")
+        if not isinstance(i2c_hw_addr, int):
+            i2c_hw_addr = int(i2c_hw_addr, 16)
+        return Panel(name=settings[u"name"],
+                     i2c_hw_addr=i2c_hw_addr,
+                     i2c_bus_number=int(settings.get(u"i2c_bus", 1)),
+                     screen_pixel_width=int(settings.get(u"width", 128)),
+                     screen_pixel_height=int(settings.get(u"height", 64)),
+                     regions=settings.get(u"regions", None))
+
+    def new_screen(self):
+        """
+        Returns a new blank Screen sized for this panel
+        """
+        return Screen(screen_pixel_width=self.screen_pixel_width,
+                      screen_pixel_height=self.screen_pixel_height)
+
+    def get_region_block(self, screen, region=None):
+        """
+        Returns the ScreenBlock of the given screen which is covered by the named region, or the
+        entire screen if region is None
+        """
+        if region is None:
+            return screen.get_screen_block(row_start=screen.row_start,
+                                           row_end=screen.row_end,
+                                           col_start=screen.col_start,
+                                           col_end=screen.col_end)
+        return screen.get_screen_block(*self.regions[region])
+
 class LcdPlugin(Thread):
     """
     LCD Plugin which integrates into SIP
@@ -981,13 +1599,27 @@ class LcdPlugin(Thread):
         self._notify_display_sem.acquire()
         self._notify_display_thread = Thread(target=self._notify_display_task)
         self._custom_display_lock = RLock()
-        self._custom_display_queue = [] # Not using real queue to limit number of libraries needed
+        self._custom_display_queue = CoalescingQueue() # Keyed by screen name
         self._custom_screens = {} # Key is screen name, value is a Screen object
-        # Keyed by screen name + an ordered stack (value is dict with keys "delay" and "wake")
+        # Keyed by screen name + an ordered stack (value is dict with keys "deadline", "wake", and
+        # "priority"); deadline is a monotonic time or None to display until cancelled
         self._custom_screens_stack = OrderedDict()
+        # Heap of (deadline, screen name) used to expire items in the stack
+        self._custom_screens_expiry = []
+        # Names of the custom screens which were rendered since they were last shown
+        self._updated_custom_screens = set()
+        # Each panel holds its own double buffer; this condition guards all of them
+        self._frame_condition = Condition()
+        self._panels = self._create_panels()
+        self._dropped_frame_count = 0
+        self._flush_thread = Thread(target=self._flush_task)
 
     def _reset_lcd_state(self):
         self._state_screen.clear()
+        # Set of render operations which are currently drawn on the state screen
+        self._state_screen_ops = set()
+        # False when something else was presented since the state screen was last presented
+        self._state_screen_presented = False
         self._last_idle_state = u""
         self._idle_entry_time = None
         self._idled = False
@@ -998,16 +1630,87 @@ class LcdPlugin(Thread):
         """
         if load_settings:
             self._load_settings()
+            Font.load_directory(FONT_DIRECTORY)
+        panels = self._create_panels()
         self._lcd = Lcd(i2c_hw_addr=self._lcd_hw_address, i2c_bus_number=1)
         self._lcd.write_initialization_sequence()
+        for panel in panels.values():
+            if panel.name != MAIN_PANEL:
+                panel.lcd = Lcd(i2c_hw_addr=panel.i2c_hw_addr,
+                                i2c_bus_number=panel.i2c_bus_number,
+                                screen_pixel_width=panel.screen_pixel_width,
+                                screen_pixel_height=panel.screen_pixel_height)
+                panel.lcd.write_initialization_sequence()
+        self._frame_condition.acquire()
+        try:
+            self._panels = panels
+        finally:
+            self._frame_condition.release()
         return True
 
+    def _create_panels(self):
+        """
+        Creates the main panel and all configured panels; panels with invalid settings are skipped
+        Returns: OrderedDict of panel name to Panel
+        """
+        panels = OrderedDict()
+        try:
+            panels[MAIN_PANEL] = Panel(MAIN_PANEL,
+                                       i2c_hw_addr=self._lcd_hw_address,
+                                       regions=self._region_settings)
+        except Exception as ex:
+            print(u"SSD1306 plugin: Invalid main panel regions: {}".format(ex))
+            panels[MAIN_PANEL] = Panel(MAIN_PANEL, i2c_hw_addr=self._lcd_hw_address)
+        for panel_settings in self._panel_settings:
+            try:
+                panel = Panel.from_dict(panel_settings)
+                if panel.name in panels:
+                    raise ValueError(u"duplicate panel name [{}]".format(panel.name))
+            except Exception as ex:
+                print(u"SSD1306 plugin: Invalid panel settings {}: {}".format(panel_settings, ex))
+            else:
+                panels[panel.name] = panel
+        return panels
+
+    def _get_panel_lcd(self, panel):
+        """
+        Returns the Lcd which the given panel is written to
+        """
+        if panel.name == MAIN_PANEL:
+            return self._lcd
+        return panel.lcd
+
+    def _get_lcds(self):
+        """
+        Returns a list of all initialized Lcd objects, starting with the main Lcd
+        """
+        lcds = []
+        for panel in self._panels.values():
+            lcd = self._get_panel_lcd(panel)
+            if lcd is not None:
+                lcds.append(lcd)
+        return lcds
+
     def _set_default_settings(self):
         """
         Sets the json settings to their defaults
         """
         self._idle_timeout_seconds = 0
         self._lcd_hw_address = 0x78
+        # List of dictionaries used to create additional panels
+        self._panel_settings = []
+        # Regions of the main panel
+        self._region_settings = {}
+
+    @staticmethod
+    def _load_json_setting(value):
+        """
+        Returns the given setting value, decoded if it was given as a JSON string (from the form)
+        """
+        if isinstance(value, (type(u""), type(""))):
+            value = value.strip()
+            return json.loads(value) if value else None
+        return value
 
     def load_from_dict(self, settings, allow_reinit):
         """
@@ -1018,11 +1721,28 @@ class LcdPlugin(Thread):
         if u"idle_timeout" in settings:
             self._idle_timeout_seconds = int(settings[u"idle_timeout"])
         original_addr = self._lcd_hw_address
+        original_panel_settings = self._panel_settings
+        original_region_settings = self._region_settings
         if u"i2c_hw_address" in settings:
             self._lcd_hw_address = int(settings[u"i2c_hw_address"], 16)
-        if original_addr != self._lcd_hw_address and allow_reinit:
-            self._lcd.set_power(on=False) # Power off current LCD
-            self.initialize(load_settings=False) # Initialize new LCD
+        try:
+            if u"panels" in settings:
+                self._panel_settings = self._load_json_setting(settings[u"panels"]) or []
+            if u"regions" in settings:
+                self._region_settings = self._load_json_setting(settings[u"regions"]) or {}
+        except ValueError as ex:
+            print(u"SSD1306 plugin: Invalid panel or region settings: {}".format(ex))
+        if (
+            allow_reinit
+            and (
+                original_addr != self._lcd_hw_address
+                or original_panel_settings != self._panel_settings
+                or original_region_settings != self._region_settings
+            )
+        ):
+            for lcd in self._get_lcds():
+                lcd.set_power(on=False) # Power off current LCDs
+            self.initialize(load_settings=False) # Initialize new LCDs
             self._reset_lcd_state() # Make sure state is refreshed on next loop
 
     def _load_settings(self):
@@ -1044,6 +1764,10 @@ class LcdPlugin(Thread):
            u"idle_timeout": self._idle_timeout_seconds,
            u"i2c_hw_address": str(format(self._lcd_hw_address, '02x'))
         }
+        if self._panel_settings:
+            settings[u"panels"] = self._panel_settings
+        if self._region_settings:
+            settings[u"regions"] = self._region_settings
         with open('./data/ssd1306.json', 'w') as f:
             json.dump(settings, f) # save to file
 
@@ -1081,7 +1805,8 @@ class LcdPlugin(Thread):
         try:
             self._idle_entry_time = time.time()
             if self._idled:
-                self._lcd.set_power(on=True)
+                for lcd in self._get_lcds():
+                    lcd.set_power(on=True)
                 self._idled = False
                 self._last_idle_state = u""
         finally:
@@ -1096,49 +1821,84 @@ class LcdPlugin(Thread):
         self._idle_lock.acquire()
         try:
             self._idled = True
-            self._lcd.set_power(on=False)
+            for lcd in self._get_lcds():
+                lcd.set_power(on=False)
         finally:
             self._idle_lock.release()
 
+    def _render_state_screen(self, ops):
+        """
+        Renders the given operations to the state screen and presents it. Each operation is a tuple
+        of either (u"line", string, row_start, text_size, justification) or
+        (u"block", string, row_start, min_text_size, max_text_size, justification). The operations
+        for a single state must cover separate rows, so only operations which weren't drawn in the
+        previous state need to be rendered. Nothing is rendered or presented if nothing changed.
+        """
+        rendered = False
+        for op in ops:
+            if op not in self._state_screen_ops:
+                if op[0] == u"block":
+                    self._state_screen.write_block(string=op[1],
+                                                   row_start=op[2],
+                                                   min_text_size=op[3],
+                                                   max_text_size=op[4],
+                                                   justification=op[5])
+                else:
+                    self._state_screen.write_line(op[1], op[2], op[3], op[4])
+                rendered = True
+        self._state_screen_ops = set(ops)
+        if rendered or not self._state_screen_presented:
+            self._present_screen(self._state_screen)
+            self._state_screen_presented = True
+
     def _display_idle(self):
         if not SipGlobals.is_enabled():
             idle_state = u"OFF"
-            self._state_screen.write_line(u"OFF", 0, 3, JUSTIFY_CENTER)
-            self._state_screen.write_line(u"", 3, 5, JUSTIFY_LEFT)
+            ops = [
+                (u"line", u"OFF", 0, 3, JUSTIFY_CENTER),
+                (u"line", u"", 3, 5, JUSTIFY_LEFT)
+            ]
         elif SipGlobals.is_manual_mode_enabled():
             idle_state = u"Idle_mm"
-            self._state_screen.write_line(u"Idle", 0, 3, JUSTIFY_CENTER)
-            self._state_screen.write_line(u"", 3, 1, JUSTIFY_LEFT)
-            self._state_screen.write_line(u"Manual", 4, 2, JUSTIFY_CENTER)
-            self._state_screen.write_line(u"Mode", 6, 2, JUSTIFY_CENTER)
+            ops = [
+                (u"line", u"Idle", 0, 3, JUSTIFY_CENTER),
+                (u"line", u"", 3, 1, JUSTIFY_LEFT),
+                (u"line", u"Manual", 4, 2, JUSTIFY_CENTER),
+                (u"line", u"Mode", 6, 2, JUSTIFY_CENTER)
+            ]
         elif SipGlobals.is_rain_delay_set():
             idle_state = u"Rain"
-            self._state_screen.write_line(u"Rain", 0, 2, JUSTIFY_CENTER)
-            self._state_screen.write_line(u"", 2, 1, JUSTIFY_LEFT)
-            self._state_screen.write_line(u"Delay", 3, 2, JUSTIFY_CENTER)
-            self._state_screen.write_line(u"", 5, 1, JUSTIFY_LEFT)
             remainingHrs = (SipGlobals.get_rain_delay_end_time() - SipGlobals.get_now()) // 60 // 60
             if remainingHrs < 1:
-                self._state_screen.write_line(u"<1 hr", 6, 2, JUSTIFY_CENTER)
+                remaining_string = u"<1 hr"
             elif remainingHrs == 1:
-                self._state_screen.write_line(u"1 hr", 6, 2, JUSTIFY_CENTER)
+                remaining_string = u"1 hr"
             else:
-                self._state_screen.write_line(
-                    str(remainingHrs) + u" hrs", 6, 2, JUSTIFY_CENTER
-                )
+                remaining_string = str(remainingHrs) + u" hrs"
+            ops = [
+                (u"line", u"Rain", 0, 2, JUSTIFY_CENTER),
+                (u"line", u"", 2, 1, JUSTIFY_LEFT),
+                (u"line", u"Delay", 3, 2, JUSTIFY_CENTER),
+                (u"line", u"", 5, 1, JUSTIFY_LEFT),
+                (u"line", remaining_string, 6, 2, JUSTIFY_CENTER)
+            ]
         elif SipGlobals.get_water_level() < 100:
             idle_state = u"Idle_wl"
             waterLevel = str(SipGlobals.get_water_level())
-            self._state_screen.write_line(u"Idle", 0, 3, JUSTIFY_CENTER)
-            self._state_screen.write_line(waterLevel + u"%", 3, 2, JUSTIFY_CENTER)
-            self._state_screen.write_line(u"", 5, 1, JUSTIFY_LEFT)
-            self._state_screen.write_line(LcdPlugin._get_time_string(), 6, 2, JUSTIFY_CENTER)
+            ops = [
+                (u"line", u"Idle", 0, 3, JUSTIFY_CENTER),
+                (u"line", waterLevel + u"%", 3, 2, JUSTIFY_CENTER),
+                (u"line", u"", 5, 1, JUSTIFY_LEFT),
+                (u"line", LcdPlugin._get_time_string(), 6, 2, JUSTIFY_CENTER)
+            ]
         else:
             idle_state = u"Idle"
-            self._state_screen.write_line(u"Idle", 0, 3, JUSTIFY_CENTER)
-            self._state_screen.write_line(u"", 3, 3, JUSTIFY_LEFT)
-            self._state_screen.write_line(LcdPlugin._get_time_string(), 6, 2, JUSTIFY_CENTER)
-        self._lcd.write_screen(self._state_screen)
+            ops = [
+                (u"line", u"Idle", 0, 3, JUSTIFY_CENTER),
+                (u"line", u"", 3, 3, JUSTIFY_LEFT),
+                (u"line", LcdPlugin._get_time_string(), 6, 2, JUSTIFY_CENTER)
+            ]
+        self._render_state_screen(ops)
         self._set_idle_state(idle_state)
 
         self._idle_lock.acquire()
@@ -1186,45 +1946,45 @@ class LcdPlugin(Thread):
             if not running_stations:
                 if program_running:
                     if SipGlobals.is_runonce_program_running():
-                        self._state_screen.write_line(u"Running", 0, 2, JUSTIFY_CENTER)
-                        self._state_screen.write_line("", 2, 1, JUSTIFY_LEFT)
-                        self._state_screen.write_line(u"Run-once", 3, 2, JUSTIFY_CENTER)
-                        self._state_screen.write_line("", 5, 1, JUSTIFY_LEFT)
-                        self._state_screen.write_line(u"Program", 6, 2, JUSTIFY_CENTER)
-                        self._lcd.write_screen(self._state_screen)
+                        self._render_state_screen([
+                            (u"line", u"Running", 0, 2, JUSTIFY_CENTER),
+                            (u"line", u"", 2, 1, JUSTIFY_LEFT),
+                            (u"line", u"Run-once", 3, 2, JUSTIFY_CENTER),
+                            (u"line", u"", 5, 1, JUSTIFY_LEFT),
+                            (u"line", u"Program", 6, 2, JUSTIFY_CENTER)
+                        ])
                     elif SipGlobals.is_manual_mode_program_running():
-                        self._state_screen.write_line(u"", 0, 1, JUSTIFY_LEFT)
-                        self._state_screen.write_line(u"Manual", 1, 2, JUSTIFY_CENTER)
-                        self._state_screen.write_line(u"", 3, 1, JUSTIFY_LEFT)
-                        self._state_screen.write_line(u"Mode", 4, 2, JUSTIFY_CENTER)
-                        self._state_screen.write_line(u"", 6, 2, JUSTIFY_LEFT)
-                        self._lcd.write_screen(self._state_screen)
+                        self._render_state_screen([
+                            (u"line", u"", 0, 1, JUSTIFY_LEFT),
+                            (u"line", u"Manual", 1, 2, JUSTIFY_CENTER),
+                            (u"line", u"", 3, 1, JUSTIFY_LEFT),
+                            (u"line", u"Mode", 4, 2, JUSTIFY_CENTER),
+                            (u"line", u"", 6, 2, JUSTIFY_LEFT)
+                        ])
                     else:
-                        self._state_screen.write_line(u"Running", 0, 2, JUSTIFY_CENTER)
-                        self._state_screen.write_line("", 2, 1, JUSTIFY_LEFT)
-                        self._state_screen.write_line(u"Program", 3, 2, JUSTIFY_CENTER)
-                        self._state_screen.write_line(u"", 5, 1, JUSTIFY_LEFT)
                         prg = str(SipGlobals.get_running_program())
-                        self._state_screen.write_line(prg, 6, 2, JUSTIFY_CENTER)
-                        self._lcd.write_screen(self._state_screen)
+                        self._render_state_screen([
+                            (u"line", u"Running", 0, 2, JUSTIFY_CENTER),
+                            (u"line", u"", 2, 1, JUSTIFY_LEFT),
+                            (u"line", u"Program", 3, 2, JUSTIFY_CENTER),
+                            (u"line", u"", 5, 1, JUSTIFY_LEFT),
+                            (u"line", prg, 6, 2, JUSTIFY_CENTER)
+                        ])
                 else:
                     # It was a lie!
                     is_idle = True
             else:
                 s = u" ".join([str(item) for item in running_stations])
-                self._state_screen.write_block(string=s,
-                                               row_start=0,
-                                               min_text_size=1,
-                                               max_text_size=5,
-                                               justification=JUSTIFY_CENTER)
-                self._state_screen.write_line(" ", 5, 1, JUSTIFY_CENTER)
                 if SipGlobals.is_manual_mode_program_running() and station_duration <= 0:
                     # Manual station on forever
                     time_string = u"ON"
                 else:
                     time_string = self._time_to_string(station_duration)
-                self._state_screen.write_line(time_string, 6, 2, JUSTIFY_CENTER)
-                self._lcd.write_screen(self._state_screen)
+                self._render_state_screen([
+                    (u"block", s, 0, 1, 5, JUSTIFY_CENTER),
+                    (u"line", u" ", 5, 1, JUSTIFY_CENTER),
+                    (u"line", time_string, 6, 2, JUSTIFY_CENTER)
+                ])
         # Check again because is_idle may have changed in the above "if" statement
         if is_idle:
             self._display_idle()
@@ -1232,108 +1992,287 @@ class LcdPlugin(Thread):
             # If previously idle, reset flag and make sure display is on
             self._wake_display()
 
-    def _decrement_custom_display_stack(self, last_wait_time):
+    def _expire_custom_display_stack(self, now):
+        """
+        Removes all displays from the stack whose deadlines have passed.
+        """
+        while self._custom_screens_expiry and self._custom_screens_expiry[0][0] <= now:
+            (deadline, key) = heappop(self._custom_screens_expiry)
+            if self._is_expiry_current(deadline, key):
+                del self._custom_screens_stack[key]
+
+    def _is_expiry_current(self, deadline, key):
+        """
+        Returns True if an expiry entry still applies to its display; False if the display has
+        since been cancelled or re-displayed with a new deadline
+        """
+        entry = self._custom_screens_stack.get(key)
+        return entry is not None and entry[u"deadline"] == deadline
+
+    def _get_top_custom_display_key(self, panel_name=MAIN_PANEL, region=None):
+        """
+        Returns the name of the screen to show in the given panel and region: the most recent
+        screen of the highest priority
+        """
+        top_key = None
+        top_priority = None
+        for key in reversed(self._custom_screens_stack):
+            value = self._custom_screens_stack[key]
+            if value[u"panel"] == panel_name and value[u"region"] == region:
+                priority = value[u"priority"]
+                if top_priority is None or priority > top_priority:
+                    top_key = key
+                    top_priority = priority
+        return top_key
+
+    def _get_next_expiry_wait(self, now):
         """
-        Decrements the delays of all items in the display stack and removes any displays which have
-        delays close to 0.
+        Returns the time until the next display in the stack expires or None if none expire
         """
-        if self._custom_screens_stack:
-            key_list = list(self._custom_screens_stack.keys())
-            # Decrement delays and remove items from stack
-            if last_wait_time > 0:
-                for key in key_list:
-                    if self._custom_screens_stack[key][u"delay"] is not None:
-                        self._custom_screens_stack[key][u"delay"] -= last_wait_time
-                        if self._custom_screens_stack[key][u"delay"] <= 0.25:
-                            # Close enough to 0 that this item should be removed
-                            del self._custom_screens_stack[key]
+        # Drop stale entries so that they don't cause early wake ups
+        while (
+            self._custom_screens_expiry
+            and not self._is_expiry_current(*self._custom_screens_expiry[0])
+        ):
+            heappop(self._custom_screens_expiry)
+        if self._custom_screens_expiry:
+            return max(self._custom_screens_expiry[0][0] - now, 0)
+        return None
 
-    def _show_top_custom_display(self):
+    def _show_top_custom_display(self, now):
+        """
+        Shows the top displays in the stack on each panel. Region displays are drawn over whatever
+        else is shown on their panel, including the state screen of the main panel.
+        Returns: 0 if the main panel has no full screen display, the time until the next display in
+                 the stack expires, or None if no display in the stack expires
+        """
         delay = 0 # by default, immediately go to normal display
-        if self._custom_screens_stack:
-            top_key = list(self._custom_screens_stack.keys())[-1]
-            top_value = self._custom_screens_stack[top_key]
-            delay = top_value[u"delay"]
-            wake = top_value[u"wake"]
-            self._lcd.write_screen(self._custom_screens[top_key])
-            if wake:
-                self._wake_display()
+        wake = False
+        for panel in self._panels.values():
+            top_key = self._get_top_custom_display_key(panel.name)
+            overlay_keys = []
+            for region in panel.regions:
+                key = self._get_top_custom_display_key(panel.name, region)
+                if key is not None:
+                    overlay_keys.append((region, key))
+            shown_keys = (top_key, tuple(overlay_keys))
+            changed = (
+                shown_keys != panel.shown_keys
+                or top_key in self._updated_custom_screens
+                or any(key in self._updated_custom_screens for (_, key) in overlay_keys)
+            )
+            panel.shown_keys = shown_keys
+            panel.overlays = [(region, self._custom_screens[key]) for (region, key) in overlay_keys]
+            for (_, key) in overlay_keys:
+                wake = wake or self._custom_screens_stack[key][u"wake"]
+            if top_key is not None:
+                wake = wake or self._custom_screens_stack[top_key][u"wake"]
+                if changed:
+                    self._present_screen(self._custom_screens[top_key], panel.name)
+                if panel.name == MAIN_PANEL:
+                    self._state_screen_presented = False
+                    delay = self._get_next_expiry_wait(now)
+            elif changed:
+                if panel.name == MAIN_PANEL:
+                    # The state screen is presented with the new overlays on the next refresh
+                    self._state_screen_presented = False
+                else:
+                    self._present_screen(panel.blank_screen, panel.name)
+        self._updated_custom_screens.clear()
+        if wake:
+            self._wake_display()
         return delay
 
-    def _display_custom(self, last_wait_time):
+    def _display_custom(self):
         """
         Displays a custom message
+        Returns: 0 if no custom message is displayed or the number of seconds to wait until the
+                 next display expires (None to wait indefinitely)
         """
-        # If there are items in the stack, first decrement pop whatever is necessary
-        self._decrement_custom_display_stack(last_wait_time)
         while self._custom_display_queue:
             self._custom_display_lock.acquire()
             try:
-                queue_item = self._custom_display_queue.pop()
+                (screen_name, priority, queue_items) = self._custom_display_queue.pop()
             finally:
                 self._custom_display_lock.release()
-            # The activator name and screen ID addresses a unique custom screen
-            activator_name = queue_item.get(u"activator", "default")
-            screen_id = queue_item.get(u"screen_id", "default")
-            screen_name = "{}/{}".format(activator_name, screen_id)
-            if screen_name not in self._custom_screens:
-                self._custom_screens[screen_name] = Screen()
-            screen = self._custom_screens[screen_name]
-            # If cancel is set, all other data will be ignored and screen will be popped
-            cancel = queue_item.get(u"cancel", False)
-            delay = 0
-            wake = False
-            if not cancel:
-                text = queue_item.get(u"txt", u"")
-                row_start = queue_item.get(u"row_start", 0)
-                row_end = queue_item.get(u"row_end", None)
-                col_start = queue_item.get(u"col_start", 0)
-                col_end = queue_item.get(u"col_end", None)
-                min_text_size = queue_item.get(u"min_text_size", 1)
-                max_text_size = queue_item.get(u"max_text_size", 1)
-                text_size = queue_item.get(u"text_size", None)
-                if text_size is not None:
-                    min_text_size = text_size
-                    max_text_size = text_size
-                justification_string = queue_item.get(u"justification", u"LEFT").upper()
-                justification_lookup = {u"LEFT": JUSTIFY_LEFT,
-                                        u"RIGHT": JUSTIFY_RIGHT,
-                                        u"CENTER": JUSTIFY_CENTER}
-                justification = justification_lookup.get(justification_string, JUSTIFY_LEFT)
-                append = queue_item.get(u"append", False)
-                # None is allowed for delay to display until cancelled
-                # Delay <= 0 has the same result as cancel=True
-                delay = queue_item.get(u"delay", 1)
-                wake = queue_item.get(u"wake", True)
-                # If this data is not to be appended, first clear screen
-                if not append:
-                    screen.clear()
-                # Set the text
-                try:
-                    screen.write_block(string=text,
-                                    row_start=row_start,
-                                    row_end=row_end,
-                                    col_start=col_start,
-                                    col_end=col_end,
-                                    min_text_size=min_text_size,
-                                    max_text_size=max_text_size,
-                                    justification=justification)
-                except Exception as ex:
-                    print(u"SSD1306 plugin: Exception occurred while trying to display " +
-                          u"custom screen: {}".format(ex))
-                    print(u"SSD1306 plugin: Custom display data: {}".format(queue_item))
-            # Make sure it is on the top of the stack or completely removed if delay is 0
-            if screen_name in self._custom_screens_stack.keys():
-                del self._custom_screens_stack[screen_name]
-            if delay is None or delay > 0:
-                self._custom_screens_stack[screen_name] = {u"delay": delay, u"wake": wake}
+            for queue_item in queue_items:
+                self._apply_custom_display_item(screen_name, priority, queue_item)
+        # Pop whatever has expired
+        now = monotonic()
+        self._expire_custom_display_stack(now)
         # Display whatever is at the top of the stack and get its delay
-        delay = self._show_top_custom_display()
+        delay = self._show_top_custom_display(now)
         return delay
 
+    def _apply_custom_display_item(self, screen_name, priority, queue_item):
+        """
+        Renders a single custom display request into its screen and updates the display stack
+        """
+        panel_name = queue_item.get(u"panel", MAIN_PANEL)
+        region = queue_item.get(u"region", None)
+        panel = self._panels.get(panel_name, None)
+        if panel is None or (region is not None and region not in panel.regions):
+            print(u"SSD1306 plugin: Unknown panel [{}] or region [{}] for custom display"
+                  .format(panel_name, region))
+            return
+        screen = self._custom_screens.get(screen_name, None)
+        # The screen is recreated if its panel was reconfigured with a different size
+        if screen is None or len(screen.buffer) != len(panel.blank_screen.buffer):
+            screen = panel.new_screen()
+            self._custom_screens[screen_name] = screen
+        # If cancel is set, all other data will be ignored and screen will be popped
+        cancel = queue_item.get(u"cancel", False)
+        delay = 0
+        wake = False
+        if not cancel:
+            text = queue_item.get(u"txt", u"")
+            row_start = queue_item.get(u"row_start", 0)
+            row_end = queue_item.get(u"row_end", None)
+            col_start = queue_item.get(u"col_start", 0)
+            col_end = queue_item.get(u"col_end", None)
+            min_text_size = queue_item.get(u"min_text_size", 1)
+            max_text_size = queue_item.get(u"max_text_size", 1)
+            text_size = queue_item.get(u"text_size", None)
+            if text_size is not None:
+                min_text_size = text_size
+                max_text_size = text_size
+            justification_string = queue_item.get(u"justification", u"LEFT").upper()
+            justification_lookup = {u"LEFT": JUSTIFY_LEFT,
+                                    u"RIGHT": JUSTIFY_RIGHT,
+                                    u"CENTER": JUSTIFY_CENTER}
+            justification = justification_lookup.get(justification_string, JUSTIFY_LEFT)
+            font_name = queue_item.get(u"font", None)
+            font = None
+            if font_name is not None:
+                font = Font.get(font_name)
+                if font is None:
+                    print(u"SSD1306 plugin: Unknown font [{}]; using built-in font"
+                          .format(font_name))
+            append = queue_item.get(u"append", False)
+            # None is allowed for delay to display until cancelled
+            # Delay <= 0 has the same result as cancel=True
+            delay = queue_item.get(u"delay", 1)
+            wake = queue_item.get(u"wake", True)
+            # If this data is not to be appended, first clear screen
+            if not append:
+                screen.clear()
+            # Set the text
+            try:
+                if region is not None:
+                    # Rows and columns are relative to the region, and text is confined to it
+                    block = panel.get_region_block(screen, region)
+                    row_start += block.row_start
+                    col_start += block.col_start
+                    if row_end is None:
+                        row_end = block.row_end
+                    else:
+                        row_end = min(row_end + block.row_start, block.row_end)
+                    if col_end is None:
+                        col_end = block.col_end
+                    else:
+                        col_end = min(col_end + block.col_start, block.col_end)
+                screen.write_block(string=text,
+                                row_start=row_start,
+                                row_end=row_end,
+                                col_start=col_start,
+                                col_end=col_end,
+                                min_text_size=min_text_size,
+                                max_text_size=max_text_size,
+                                justification=justification,
+                                font=font)
+            except Exception as ex:
+                print(u"SSD1306 plugin: Exception occurred while trying to display " +
+                      u"custom screen: {}".format(ex))
+                print(u"SSD1306 plugin: Custom display data: {}".format(queue_item))
+        self._updated_custom_screens.add(screen_name)
+        # Make sure it is on the top of the stack or completely removed if delay is 0
+        if screen_name in self._custom_screens_stack.keys():
+            del self._custom_screens_stack[screen_name]
+        if delay is None or delay > 0:
+            deadline = None if delay is None else monotonic() + delay
+            self._custom_screens_stack[screen_name] = {
+                u"deadline": deadline,
+                u"wake": wake,
+                u"priority": priority,
+                u"panel": panel_name,
+                u"region": region
+            }
+            if deadline is not None:
+                heappush(self._custom_screens_expiry, (deadline, screen_name))
+
+    def _present_screen(self, screen, panel_name=MAIN_PANEL):
+        """
+        Presents a rendered screen to be written to a panel's LCD by the flush thread. The panel's
+        region overlays are drawn over the screen. If the previously presented frame hasn't been
+        flushed yet, it is dropped in favor of this one.
+        """
+        self._frame_condition.acquire()
+        try:
+            panel = self._panels[panel_name]
+            if panel.frame_pending:
+                self._dropped_frame_count += 1
+            panel.back_screen.copy_from(screen)
+            for (region, overlay_screen) in panel.overlays:
+                panel.get_region_block(panel.back_screen, region)\
+                    .copy_from(panel.get_region_block(overlay_screen, region))
+            panel.frame_pending = True
+            self._frame_condition.notify()
+        finally:
+            self._frame_condition.release()
+
+    def _flush_task(self):
+        """
+        Writes presented frames to the LCDs so that I2C transfers don't block rendering
+        """
+        while self._running:
+            frames = []
+            self._frame_condition.acquire()
+            try:
+                while (
+                    self._running
+                    and not any(panel.frame_pending for panel in self._panels.values())
+                ):
+                    self._frame_condition.wait()
+                if not self._running:
+                    break
+                for panel in self._panels.values():
+                    if panel.frame_pending:
+                        # Swap buffers; the render thread may now present into the old front screen
+                        (panel.front_screen, panel.back_screen) = \
+                            (panel.back_screen, panel.front_screen)
+                        panel.frame_pending = False
+                        frames.append((panel, self._get_panel_lcd(panel)))
+            finally:
+                self._frame_condition.release()
+            self._write_frames(frames)
+
+    @staticmethod
+    def _write_frames(frames):
+        """
+        Writes the front screens of the given panels to their LCDs. Writes are interleaved a row at
+        a time, alternating between buses and between the panels on each bus, so that a full redraw
+        of one panel doesn't hold off the updates of the others.
+        Inputs: frames - List of (Panel, Lcd)
+        """
+        # Only the differences from what is currently displayed will be written
+        buses = OrderedDict()
+        for (panel, lcd) in frames:
+            if lcd is not None:
+                buses.setdefault(panel.i2c_bus_number, []).append(
+                    lcd.iter_write_screen(panel.front_screen))
+        bus_writers = list(buses.values())
+        while bus_writers:
+            writers = bus_writers.pop(0)
+            writer = writers.pop(0)
+            # Stop writing a panel once it fails or has been completely written
+            if next(writer, False):
+                writers.append(writer)
+            if writers:
+                bus_writers.append(writers)
+
     def _notify_display_task(self):
         # It may seem silly to notify a condition through a semaphore, but acquiring the condition
-        # lock may block for a while if the LCD is busy writing to I2C. Python semaphores don't have
+        # lock may block for a while if the display thread is busy rendering. Python semaphores don't have
         # a timed wait method. I'd otherwise just use a semaphore instead of the condition variable.
         while self._running:
             self._notify_display_sem.acquire()
@@ -1357,12 +2296,45 @@ class LcdPlugin(Thread):
             # Set name as activator if it isn't already in the keyword arguments
             if name is not None and u"activator" not in kw:
                 kw[u"activator"] = name
-            self._custom_display_queue.insert(0, kw)
+            # The activator name and screen ID addresses a unique custom screen
+            activator_name = kw.get(u"activator", "default")
+            screen_id = kw.get(u"screen_id", "default")
+            screen_name = "{}/{}".format(activator_name, screen_id)
+            # Screens for other panels are kept separately from those of the main panel
+            panel_name = kw.get(u"panel", MAIN_PANEL)
+            if panel_name != MAIN_PANEL:
+                screen_name = u"{}:{}".format(panel_name, screen_name)
+            # Anything which isn't appended to the screen supersedes what is pending for it
+            replace = kw.get(u"cancel", False) or not kw.get(u"append", False)
+            self._custom_display_queue.put(screen_name,
+                                           kw,
+                                           priority=kw.get(u"priority", 0),
+                                           replace=replace)
         finally:
             self._custom_display_lock.release()
         # Notify the run thread that there is new data here
         self._notify_display_condition()
 
+    def get_statistics(self):
+        """
+        Returns display statistics as a JSON serializable dictionary
+        """
+        self._custom_display_lock.acquire()
+        try:
+            coalesced_count = self._custom_display_queue.coalesced_count
+        finally:
+            self._custom_display_lock.release()
+        panel_statistics = {}
+        for panel in self._panels.values():
+            if panel.name != MAIN_PANEL and panel.lcd is not None:
+                panel_statistics[panel.name] = panel.lcd.statistics.to_dict()
+        return {
+            u"i2c": self._lcd.statistics.to_dict() if self._lcd is not None else None,
+            u"panels": panel_statistics,
+            u"dropped_frame_count": self._dropped_frame_count,
+            u"coalesced_display_count": coalesced_count
+        }
+
     def wake_signal(self, *args, **kw):
         """
         Wakes the display
@@ -1380,24 +2352,26 @@ class LcdPlugin(Thread):
         Main execution method which is executed when the super class (Thread) is started
         """
         self._notify_display_thread.start()
+        self._flush_thread.start()
         sleep(STARTUP_DELAY)
         print(u"SSD1306 plugin: active")
         self._display_condition.acquire()
         try:
-            last_waited_time = 0
             while self._running:
                 # This will return a wait time of 0 if we need to drop into normal display.
-                wait_time = self._display_custom(last_waited_time)
+                wait_time = self._display_custom()
                 if wait_time == 0:
                     self._display_normal()
                     wait_time = NORMAL_REFRESH_PERIOD
+                    # Displays on other panels or regions may need to expire before then
+                    expiry_wait = self._get_next_expiry_wait(monotonic())
+                    if expiry_wait is not None:
+                        wait_time = min(wait_time, expiry_wait)
                 # Only wait if we are still running by this point
                 if self._running:
-                    start_time = time.time()
                     # This is the only reason the condition variable is needed - to be able to wait
                     # with a specified timeout.
                     self._display_condition.wait(wait_time)
-                    last_waited_time = time.time() - start_time
         finally:
             self._display_condition.release()
 
@@ -1406,8 +2380,14 @@ class LcdPlugin(Thread):
         Stops my running process
         """
         self._running = False
-        self._lcd.disable()
+        for lcd in self._get_lcds():
+            lcd.disable()
         self._notify_display_condition()
+        self._frame_condition.acquire()
+        try:
+            self._frame_condition.notify_all()
+        finally:
+            self._frame_condition.release()
 
     ### Restart ###
     # Restart signal needs to be handled in 1 second or less
@@ -1439,6 +2419,10 @@ try:
         sleep_signal.connect(lcd_plugin.sleep_signal)
         restart = signal(u"restart")
         restart.connect(lcd_plugin.notify_restart)
+        zone_change = signal(u"zone_change")
+        zone_change.connect(station_state_view.invalidate)
+        stations_scheduled = signal(u"stations_scheduled")
+        stations_scheduled.connect(station_state_view.invalidate)
 except Exception as ex:
     print(u"SSD1306 plugin: Exception occurred during initialization")
     traceback.print_exc()
@@ -1451,7 +2435,8 @@ except Exception as ex:
 # Add new URLs to access classes in this plugin.
 urls.extend([
    '/ssd1306-sp', 'plugins.ssd1306.settings',
-   '/ssd1306-save', 'plugins.ssd1306.save_settings'
+   '/ssd1306-save', 'plugins.ssd1306.save_settings',
+   '/ssd1306-stats', 'plugins.ssd1306.statistics'
    ])
 
 # Add this plugin to the PLUGINS menu ['Menu Name', 'URL'], (Optional)
@@ -1470,6 +2455,10 @@ class settings(ProtectedPage):
                 settings = json.load(f)
         except IOError:  # If file does not exist return empty value
             settings = {}  # Default settings. can be list, dictionary, etc.
+        # Panels and regions are edited as JSON text
+        for key in [u"panels", u"regions"]:
+            if key in settings:
+                settings[key] = json.dumps(settings[key])
         return template_render.ssd1306(settings)  # open settings page
 
 class save_settings(ProtectedPage):
@@ -1486,3 +2475,13 @@ class save_settings(ProtectedPage):
         lcd_plugin.load_from_dict(qdict, allow_reinit=True)  # load settings from dictionary
         lcd_plugin.save_settings()  # Save keypad settings
         raise web.seeother(u"/")  # Return user to home page.
+
+class statistics(ProtectedPage):
+    """
+    Returns display and I2C statistics in JSON format.
+    """
+
+    def GET(self):
+        web.header(u"Access-Control-Allow-Origin", u"*")
+        web.header(u"Content-Type", u"application/json")
+        return json.dumps(lcd_plugin.get_statistics())
@@ -0,0 +1,4 @@
+REM Windows benchmark execution file.
+REM To run, cd to the test directory, and then execute this file.
+REM Any arguments are passed to the benchmark runner (ex: -n 500 --json results.json)
+python -B benchmark.py %*
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark runner for the SSD1306 plugin's rendering and flush paths. Hardware is stubbed out with
+the same stubs as the regression tests, and I2C traffic is counted and timed (at 100 kHz) on a
+simulated I2C bus.
+Usage: python3 -B benchmark.py [-n ITERATIONS] [--json FILE]
+"""
+import argparse
+import itertools
+import json
+import timeit
+from unittest.mock import patch
+# This will stub sip and pi-specific things out
+import ssd1306_test_base
+# Now that things have been stubbed out, ssd1306 may be imported
+import stub_i2c_simulator
+from stub_i2c_simulator import SimulatedSMBus, Ssd1306Device
+import ssd1306
+from ssd1306 import (Lcd, LcdPlugin, Screen, SmbusBlockTransport, I2cRdwrTransport,
+                     JUSTIFY_CENTER)
+
+# Make sure the plugin thread stops right away
+ssd1306.lcd_plugin.stop()
+
+TEXT_SIZES = range(1, 6)
+
+class BenchmarkResult:
+    def __init__(self, name, iterations, seconds, bus=None):
+        self.name = name
+        self.iterations = iterations
+        self.usec_per_op = seconds * 1e6 / iterations
+        self.transactions_per_op = None
+        self.bytes_per_op = None
+        self.bus_usec_per_op = None
+        if bus is not None:
+            self.transactions_per_op = bus.transaction_count / float(iterations)
+            self.bytes_per_op = bus.byte_count / float(iterations)
+            self.bus_usec_per_op = bus.elapsed * 1e6 / iterations
+
+    def to_dict(self):
+        return {
+            u"name": self.name,
+            u"iterations": self.iterations,
+            u"usec_per_op": self.usec_per_op,
+            u"i2c_transactions_per_op": self.transactions_per_op,
+            u"i2c_bytes_per_op": self.bytes_per_op,
+            u"i2c_bus_usec_per_op": self.bus_usec_per_op
+        }
+
+    def __str__(self):
+        line = u"{:<52} {:>10.1f} us".format(self.name, self.usec_per_op)
+        if self.transactions_per_op is not None:
+            line += u" {:>8.1f} xfers {:>8.1f} bytes {:>10.1f} us on bus".format(
+                self.transactions_per_op, self.bytes_per_op, self.bus_usec_per_op)
+        return line
+
+def run(name, func, iterations, bus=None):
+    """
+    Runs func the given number of times and returns a BenchmarkResult
+    """
+    # Warm up once so that one-time costs aren't measured
+    func()
+    if bus is not None:
+        bus.reset()
+    seconds = timeit.Timer(func).timeit(number=iterations)
+    return BenchmarkResult(name, iterations, seconds, bus)
+
+def make_lcd(transport_class):
+    """
+    Returns an Lcd using a simulated bus and the given transport class
+    """
+    bus = SimulatedSMBus()
+    bus.attach(0x3C, Ssd1306Device())
+    with patch('ssd1306.smbus.SMBus', return_value=bus):
+        lcd = Lcd()
+    lcd._transport = transport_class(lcd._bus, lcd._hw_write_addr)
+    return lcd
+
+def bench_screen(iterations):
+    results = []
+    screen = Screen()
+    block = screen.get_screen_block(row_start=0, row_end=screen.row_end)
+    for size in TEXT_SIZES:
+        results.append(run(u"ScreenBlock.write_line size={}".format(size),
+                           lambda: block.write_line(u"12:34", 0, size, JUSTIFY_CENTER),
+                           iterations))
+    for size in TEXT_SIZES:
+        results.append(run(u"ScreenBlock.write_block size={}".format(size),
+                           lambda: block.write_block(u"1 2", size, size, JUSTIFY_CENTER),
+                           iterations))
+    results.append(run(u"Screen.copy", screen.copy, iterations))
+    return results
+
+def bench_lcd(iterations):
+    results = []
+    screens = [Screen(), Screen()]
+    screens[0].write_line(u"Idle", 0, 3, JUSTIFY_CENTER)
+    screens[1].write_line(u"Running", 0, 3, JUSTIFY_CENTER)
+    one_row = screens[0].copy()
+    one_row.write_line(u"1:36 PM", 6, 1, JUSTIFY_CENTER)
+    for transport_class in [SmbusBlockTransport, I2cRdwrTransport]:
+        with patch('ssd1306.i2c_msg', stub_i2c_simulator.i2c_msg):
+            lcd = make_lcd(transport_class)
+            name = transport_class.__name__
+            lcd.write_screen(screens[0])
+            results.append(run(u"Lcd.write_screen unchanged ({})".format(name),
+                               lambda: lcd.write_screen(screens[0]),
+                               iterations,
+                               lcd._bus))
+            frames = itertools.cycle([one_row, screens[0]])
+            results.append(run(u"Lcd.write_screen one row ({})".format(name),
+                               lambda: lcd.write_screen(next(frames)),
+                               iterations,
+                               lcd._bus))
+            results.append(run(u"Lcd.write_screen all rows ({})".format(name),
+                               lambda: lcd.write_screen(screens[0], force=True),
+                               iterations,
+                               lcd._bus))
+    return results
+
+def bench_plugin(iterations):
+    results = []
+    lcd_plugin = LcdPlugin()
+    lcd_plugin._lcd = make_lcd(SmbusBlockTransport)
+    # Flush synchronously so that the I2C traffic of each frame is measured
+    lcd_plugin._present_screen = lcd_plugin._lcd.write_screen
+    # Alternate the remaining time so that every frame changes
+    running_stations = itertools.cycle([(True, 239, [3, 7]), (True, 238, [3, 7])])
+    with patch('ssd1306.SipGlobals.is_idle', return_value=False),\
+        patch('ssd1306.SipGlobals.get_running_stations',
+              side_effect=lambda: next(running_stations)),\
+        patch('ssd1306.SipGlobals.is_manual_mode_program_running', return_value=False)\
+    :
+        results.append(run(u"LcdPlugin._display_normal running",
+                           lcd_plugin._display_normal,
+                           iterations,
+                           lcd_plugin._lcd._bus))
+    with patch('ssd1306.SipGlobals.is_idle', return_value=True):
+        results.append(run(u"LcdPlugin._display_normal idle",
+                           lcd_plugin._display_normal,
+                           iterations,
+                           lcd_plugin._lcd._bus))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=u"SSD1306 plugin benchmarks")
+    parser.add_argument(u"-n", u"--iterations", type=int, default=200,
+                        help=u"number of iterations per benchmark")
+    parser.add_argument(u"--json", default=None, help=u"file to write results to as JSON")
+    args = parser.parse_args()
+    results = []
+    for bench in [bench_screen, bench_lcd, bench_plugin]:
+        for result in bench(args.iterations):
+            print(result)
+            results.append(result)
+    if args.json is not None:
+        with open(args.json, u"w") as f:
+            json.dump([result.to_dict() for result in results], f, indent=2)
+
+if __name__ == u"__main__":
+    main()
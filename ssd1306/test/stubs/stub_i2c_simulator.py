@@ -0,0 +1,258 @@
+# Simulated I2C bus which stands in for smbus/smbus2 so that the display stack may be exercised
+# without hardware. Devices are attached to the bus by 7-bit address and decode what is written to
+# them: Ssd1306Device models the SSD1306 controller (addressing modes and GDDRAM). The bus records
+# each transaction and keeps a simulated clock from a configurable bus speed and per-transaction
+# latency.
+import errno
+import os
+from collections import namedtuple
+from time import sleep
+
+try:
+    from time import monotonic
+except ImportError:
+    from time import time as monotonic
+
+# Adapter functionality bit for plain I2C transfers (I2C_FUNC_I2C from uapi/linux/i2c.h)
+I2C_FUNC_I2C = 0x00000001
+
+# Start time (simulated clock), duration, address, and number of bytes (including address bytes)
+Transaction = namedtuple(u"Transaction", [u"start", u"duration", u"addr", u"num_bytes"])
+
+class i2c_msg:
+    def __init__(self, addr, buf):
+        self.addr = addr
+        self.buf = bytes(buf)
+
+    def __len__(self):
+        return len(self.buf)
+
+    @staticmethod
+    def write(address, buf):
+        return i2c_msg(address, buf)
+
+class SimulatedSMBus:
+    """
+    SMBus compatible bus which forwards writes to attached device models
+    """
+    # Also in lcd_adj/test/stubs/stub_i2c_simulator.py; the two copies must be kept in sync
+
+    def __init__(self, bus=None, clock_hz=100000, transaction_latency=0.0, real_time=False):
+        """
+        Initializes a SimulatedSMBus object
+        Inputs: bus - The bus number (ignored; accepted so this may replace smbus.SMBus)
+                clock_hz - The I2C clock rate; each byte takes 9 clock cycles (8 bits + ACK)
+                transaction_latency - Fixed time in seconds added to each transaction to model
+                                      start/stop conditions and driver overhead
+                real_time - Set to True to actually sleep for the duration of each transaction
+        """
+        self.funcs = I2C_FUNC_I2C
+        self.byte_time = 9.0 / clock_hz
+        self.transaction_latency = transaction_latency
+        self.real_time = real_time
+        self.devices = {}
+        # Simulated bus time which isn't slept is added to the real clock to form the bus clock
+        self._clock_offset = 0.0
+        self._pending_errors = 0
+        self.reset()
+
+    def attach(self, addr, device):
+        """
+        Attaches a device model at the given 7-bit address
+        Returns: device
+        """
+        self.devices[addr] = device
+        return device
+
+    def reset(self):
+        """
+        Resets all recorded transactions
+        """
+        self.transactions = []
+        self.elapsed = 0.0
+
+    @property
+    def transaction_count(self):
+        return len(self.transactions)
+
+    @property
+    def byte_count(self):
+        return sum([t.num_bytes for t in self.transactions])
+
+    def clock(self):
+        """
+        Returns the current bus time in seconds
+        """
+        return monotonic() + self._clock_offset
+
+    def inject_errors(self, count=1):
+        """
+        Makes the next count transactions fail as if the device did not acknowledge
+        """
+        self._pending_errors += count
+
+    def _get_device(self, addr):
+        device = self.devices.get(addr)
+        if device is None or self._pending_errors > 0:
+            self._pending_errors = max(self._pending_errors - 1, 0)
+            raise IOError(errno.EREMOTEIO, os.strerror(errno.EREMOTEIO))
+        return device
+
+    def _transfer(self, addr, bufs):
+        """
+        Executes one transaction made of one or more write messages to a single device
+        """
+        device = self._get_device(addr)
+        start = self.clock()
+        num_bytes = sum([len(buf) for buf in bufs]) + len(bufs)
+        duration = self.transaction_latency + num_bytes * self.byte_time
+        t = start + self.transaction_latency
+        for buf in bufs:
+            # Skip the address byte; each data byte completes one byte time later
+            t += self.byte_time
+            device.write(bytearray(buf), t + self.byte_time, self.byte_time)
+            t += len(buf) * self.byte_time
+        self.transactions.append(Transaction(start, duration, addr, num_bytes))
+        self.elapsed += duration
+        if self.real_time:
+            sleep(duration)
+        else:
+            self._clock_offset += duration
+
+    def write_byte(self, i2c_addr, value):
+        self._transfer(i2c_addr, [[value]])
+
+    def write_byte_data(self, i2c_addr, register, value):
+        self._transfer(i2c_addr, [[register, value]])
+
+    def write_i2c_block_data(self, i2c_addr, register, data):
+        if len(data) > 32:
+            raise ValueError("Block data may not exceed 32 bytes")
+        self._transfer(i2c_addr, [[register] + list(data)])
+
+    def read_byte(self, i2c_addr):
+        device = self._get_device(i2c_addr)
+        self.transactions.append(Transaction(self.clock(), 2 * self.byte_time, i2c_addr, 2))
+        self.elapsed += 2 * self.byte_time
+        self._clock_offset += 2 * self.byte_time
+        return device.read()
+
+    def i2c_rdwr(self, *msgs):
+        addrs = set([msg.addr for msg in msgs])
+        if len(addrs) != 1:
+            raise ValueError("Simulated transfers must address a single device")
+        self._transfer(addrs.pop(), [msg.buf for msg in msgs])
+
+class Ssd1306Device:
+    """
+    Model of an SSD1306 controller's I2C interface and graphics display data RAM
+    """
+    CONTROL_CONTINUATION = 0x80
+    CONTROL_DATA = 0x40
+    # Number of argument bytes which follow each multi-byte command
+    COMMAND_ARGUMENTS = {
+        0x20: 1, 0x21: 2, 0x22: 2, 0x26: 6, 0x27: 6, 0x29: 5, 0x2A: 5, 0x81: 1, 0x8D: 1, 0xA3: 2,
+        0xA8: 1, 0xD3: 1, 0xD5: 1, 0xD9: 1, 0xDA: 1, 0xDB: 1
+    }
+    HORIZONTAL_MODE = 0
+    VERTICAL_MODE = 1
+    PAGE_MODE = 2
+
+    def __init__(self, width=128, height=64):
+        self.num_cols = width
+        self.num_pages = height // 8
+        self.pages = [bytearray(width) for _ in range(self.num_pages)]
+        self.powered = False
+        self.addressing_mode = Ssd1306Device.PAGE_MODE
+        self.col_range = (0, width - 1)
+        self.page_range = (0, self.num_pages - 1)
+        self.page = 0
+        self.col = 0
+        self.commands = []
+        self.data_byte_count = 0
+        # Data bytes which wrote the value already in GDDRAM
+        self.redundant_byte_count = 0
+        self._command = None
+        self._args = []
+
+    def write(self, buf, time, byte_time):
+        i = 0
+        while i < len(buf):
+            control = buf[i]
+            if control & Ssd1306Device.CONTROL_CONTINUATION:
+                # One byte follows, then another control byte
+                payload = buf[i + 1:i + 2]
+                i += 2
+            else:
+                payload = buf[i + 1:]
+                i = len(buf)
+            if control & Ssd1306Device.CONTROL_DATA:
+                for byte in payload:
+                    self._write_data(byte)
+            else:
+                for byte in payload:
+                    self._write_command(byte)
+
+    def read(self):
+        raise IOError(errno.EIO, u"SSD1306 does not support reads over I2C")
+
+    def _write_data(self, byte):
+        self.data_byte_count += 1
+        if self.page < self.num_pages and self.col < self.num_cols:
+            row = self.pages[self.page]
+            if row[self.col] == byte:
+                self.redundant_byte_count += 1
+            row[self.col] = byte
+        (col_start, col_end) = self.col_range
+        (page_start, page_end) = self.page_range
+        if self.addressing_mode == Ssd1306Device.PAGE_MODE:
+            self.col = self.col + 1 if self.col < self.num_cols - 1 else 0
+        elif self.addressing_mode == Ssd1306Device.HORIZONTAL_MODE:
+            if self.col < col_end:
+                self.col += 1
+            else:
+                self.col = col_start
+                self.page = self.page + 1 if self.page < page_end else page_start
+        else:
+            if self.page < page_end:
+                self.page += 1
+            else:
+                self.page = page_start
+                self.col = self.col + 1 if self.col < col_end else col_start
+
+    def _write_command(self, byte):
+        if self._command is None:
+            if byte in Ssd1306Device.COMMAND_ARGUMENTS:
+                self._command = byte
+                self._args = []
+                return
+            self.commands.append((byte,))
+            self._execute(byte, [])
+        else:
+            # Arguments may arrive in later writes
+            self._args.append(byte)
+            if len(self._args) == Ssd1306Device.COMMAND_ARGUMENTS[self._command]:
+                self.commands.append(tuple([self._command] + self._args))
+                self._execute(self._command, self._args)
+                self._command = None
+
+    def _execute(self, command, args):
+        if command == 0xAE:
+            self.powered = False
+        elif command == 0xAF:
+            self.powered = True
+        elif command == 0x20:
+            self.addressing_mode = args[0] & 0x03
+        elif command == 0x21:
+            self.col_range = (args[0] & 0x7F, args[1] & 0x7F)
+            self.col = self.col_range[0]
+        elif command == 0x22:
+            self.page_range = (args[0] & 0x07, args[1] & 0x07)
+            self.page = self.page_range[0]
+        elif self.addressing_mode == Ssd1306Device.PAGE_MODE:
+            if 0xB0 <= command <= 0xB7:
+                self.page = command & 0x07
+            elif command <= 0x0F:
+                self.col = (self.col & 0xF0) | command
+            elif command <= 0x1F:
+                self.col = ((command & 0x0F) << 4) | (self.col & 0x0F)
@@ -0,0 +1,63 @@
+import sys
+import os
+import unittest
+# This will stub sip and pi-specific things out
+import ssd1306_test_base
+# Now that things have been stubbed out, ssd1306 may be imported
+from ssd1306 import CoalescingQueue
+import ssd1306
+
+# Make sure the plugin thread stops right away
+ssd1306.lcd_plugin.stop()
+
+class TestCoalescingQueue(unittest.TestCase):
+    def test_fifo_order(self):
+        q = CoalescingQueue()
+        q.put(u"a", 1)
+        q.put(u"b", 2)
+        q.put(u"c", 3)
+        self.assertEqual(3, len(q))
+        self.assertEqual((u"a", 0, [1]), q.pop())
+        self.assertEqual((u"b", 0, [2]), q.pop())
+        self.assertEqual((u"c", 0, [3]), q.pop())
+        self.assertEqual(0, len(q))
+        self.assertFalse(q)
+
+    def test_priority_order(self):
+        q = CoalescingQueue()
+        q.put(u"info", 1)
+        q.put(u"alarm", 2, priority=10)
+        q.put(u"info2", 3)
+        self.assertEqual((u"alarm", 10, [2]), q.pop())
+        self.assertEqual((u"info", 0, [1]), q.pop())
+        self.assertEqual((u"info2", 0, [3]), q.pop())
+
+    def test_replace_coalesces(self):
+        q = CoalescingQueue()
+        q.put(u"a", 1)
+        q.put(u"b", 2)
+        q.put(u"a", 3)
+        q.put(u"a", 4)
+        self.assertEqual(2, len(q))
+        self.assertEqual(2, q.coalesced_count)
+        # Key keeps its original position in the queue
+        self.assertEqual((u"a", 0, [4]), q.pop())
+        self.assertEqual((u"b", 0, [2]), q.pop())
+
+    def test_append_keeps_pending(self):
+        q = CoalescingQueue()
+        q.put(u"a", 1)
+        q.put(u"a", 2, replace=False)
+        q.put(u"a", 3, replace=False)
+        self.assertEqual((u"a", 0, [1, 2, 3]), q.pop())
+        self.assertEqual(0, q.coalesced_count)
+
+    def test_priority_raised(self):
+        q = CoalescingQueue()
+        q.put(u"a", 1)
+        q.put(u"b", 2)
+        q.put(u"b", 3, priority=5, replace=False)
+        self.assertEqual((u"b", 5, [2, 3]), q.pop())
+        self.assertEqual((u"a", 0, [1]), q.pop())
+        with self.assertRaises(IndexError):
+            q.pop()
@@ -0,0 +1,126 @@
+import sys
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest.mock import Mock, MagicMock, patch
+# This will stub sip and pi-specific things out
+from ssd1306_test_base import Ssd1306CustomAssertions
+# Now that things have been stubbed out, ssd1306 may be imported
+from ssd1306 import Font, Screen, ScreenBlock, LcdPlugin, JUSTIFY_LEFT, JUSTIFY_RIGHT
+import ssd1306
+
+# Make sure the plugin thread stops right away
+ssd1306.lcd_plugin.stop()
+
+# A 16 pixel tall font with a narrow "i", a wide "W", and a non-ASCII degree sign
+FONT_DICT = {
+    u"name": u"test16",
+    u"height": 16,
+    u"spacing": 1,
+    u"default": u"?",
+    u"glyphs": {
+        u"i": u"fd" + u"3f",
+        u"W": u"ff1060ff" + u"0f0c0c0f",
+        u"°": u"0609" + u"0000",
+        u"?": u"0201" + u"0000"
+    }
+}
+
+class TestFont_builtin(unittest.TestCase):
+    def test_matches_generated_sequence(self):
+        for size in [1, 3]:
+            font = Font.builtin(size)
+            self.assertEqual(size, font.num_rows)
+            self.assertEqual(ScreenBlock._generate_char_sequence(u"A", size),
+                             font.render_line(u"A"))
+            # Unknown characters use the unknown glyph
+            self.assertEqual(ScreenBlock._generate_char_sequence(u"°", size),
+                             font.render_line(u"°"))
+
+    def test_cached(self):
+        self.assertIs(Font.builtin(2), Font.builtin(2))
+
+class TestFont_from_dict(unittest.TestCase):
+    def test_render_proportional(self):
+        font = Font.from_dict(FONT_DICT)
+        self.assertEqual(2, font.num_rows)
+        self.assertEqual(2 + 5 + 3, font.measure(u"iW°"))
+        self.assertEqual([
+            bytearray([0xfd, 0x00, 0xff, 0x10, 0x60, 0xff, 0x00]),
+            bytearray([0x3f, 0x00, 0x0f, 0x0c, 0x0c, 0x0f, 0x00])
+        ], font.render_line(u"iW"))
+        # Unknown characters are drawn with the default glyph
+        self.assertEqual(font.render_line(u"?"), font.render_line(u"x"))
+
+    def test_invalid_glyph(self):
+        font_dict = dict(FONT_DICT)
+        font_dict[u"glyphs"] = {u"i": u"fd3f00"}
+        with self.assertRaises(ValueError):
+            Font.from_dict(font_dict)
+
+    def test_invalid_default(self):
+        font_dict = dict(FONT_DICT)
+        font_dict[u"default"] = u"x"
+        with self.assertRaises(ValueError):
+            Font.from_dict(font_dict)
+
+class TestFont_load_directory(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        Font._registry.pop(u"test16", None)
+
+    def test_nominal(self):
+        with open(os.path.join(self.directory, u"test16.json"), u"w") as f:
+            json.dump(FONT_DICT, f)
+        with open(os.path.join(self.directory, u"broken.json"), u"w") as f:
+            f.write(u"{")
+        with patch('builtins.print'):
+            self.assertEqual(1, Font.load_directory(self.directory))
+        self.assertEqual(u"test16", Font.get(u"test16").name)
+
+    def test_missing_directory(self):
+        self.assertEqual(0, Font.load_directory(os.path.join(self.directory, u"missing")))
+
+class TestScreen_write_with_font(unittest.TestCase, Ssd1306CustomAssertions):
+    def test_write_line(self):
+        font = Font.from_dict(FONT_DICT)
+        s = Screen(screen_pixel_width=16, screen_pixel_height=32)
+        s.write_line(u"Wi", 1, justification=JUSTIFY_RIGHT, font=font)
+        self.assertScreenBytes([
+            bytearray(16),
+            bytearray(9) + bytearray([0xff, 0x10, 0x60, 0xff, 0x00, 0xfd, 0x00]),
+            bytearray(9) + bytearray([0x0f, 0x0c, 0x0c, 0x0f, 0x00, 0x3f, 0x00]),
+            bytearray(16)
+        ], s)
+
+    def test_write_block(self):
+        font = Font.from_dict(FONT_DICT)
+        s = Screen(screen_pixel_width=8, screen_pixel_height=32)
+        # Text sizes are ignored and lines are stacked by font height
+        s.write_block(u"i\ni\ni", min_text_size=1, max_text_size=1, font=font)
+        self.assertScreenBytes([
+            bytearray([0xfd, 0, 0, 0, 0, 0, 0, 0]),
+            bytearray([0x3f, 0, 0, 0, 0, 0, 0, 0]),
+            bytearray([0xfd, 0, 0, 0, 0, 0, 0, 0]),
+            bytearray([0x3f, 0, 0, 0, 0, 0, 0, 0])
+        ], s)
+
+class TestLcdPlugin_display_font(unittest.TestCase):
+    def tearDown(self):
+        Font._registry.pop(u"test16", None)
+
+    def test_display_signal_font(self):
+        Font.register(Font.from_dict(FONT_DICT))
+        lcd_plugin = LcdPlugin()
+        lcd_plugin._present_screen = MagicMock()
+        lcd_plugin._wake_display = MagicMock()
+        lcd_plugin.display_signal(activator=u"f", txt=u"W°", font=u"test16", delay=None)
+        lcd_plugin._display_custom()
+        expected = Screen()
+        expected.write_block(u"W°", font=Font.get(u"test16"))
+        self.assertEqual(expected.bytes, lcd_plugin._custom_screens[u"f/default"].bytes)
@@ -0,0 +1,101 @@
+import unittest
+from unittest.mock import patch
+# This will stub sip and pi-specific things out
+import ssd1306_test_base
+# Now that things have been stubbed out, ssd1306 may be imported
+from ssd1306 import Lcd, Screen, SmbusBlockTransport, I2cRdwrTransport, JUSTIFY_CENTER
+import ssd1306
+import stub_i2c_simulator
+from stub_i2c_simulator import SimulatedSMBus, Ssd1306Device
+
+# Make sure the plugin thread stops right away
+ssd1306.lcd_plugin.stop()
+
+def make_lcd(bus, transport_class, **kwargs):
+    with patch('ssd1306.smbus.SMBus', return_value=bus):
+        lcd = Lcd(**kwargs)
+    lcd._transport = transport_class(bus, lcd._hw_write_addr)
+    return lcd
+
+class TestSsd1306Device(unittest.TestCase):
+    def setUp(self):
+        self.bus = SimulatedSMBus()
+        self.device = self.bus.attach(0x3C, Ssd1306Device())
+
+    def test_initialization_sequence(self):
+        lcd = make_lcd(self.bus, SmbusBlockTransport)
+        with patch('builtins.print'):
+            lcd.write_initialization_sequence()
+        self.assertTrue(self.device.powered)
+        self.assertEqual(Ssd1306Device.PAGE_MODE, self.device.addressing_mode)
+        self.assertIn((0xA8, 63), self.device.commands)
+        self.assertEqual([bytearray(128)] * 8, self.device.pages)
+
+    def test_write_screen_matches_gddram(self):
+        screen = Screen()
+        screen.write_line(u"Running", 0, 3, JUSTIFY_CENTER)
+        screen.write_line(u"1:36 PM", 6, 1, JUSTIFY_CENTER)
+        for transport_class in [SmbusBlockTransport, I2cRdwrTransport]:
+            with patch('ssd1306.i2c_msg', stub_i2c_simulator.i2c_msg):
+                lcd = make_lcd(self.bus, transport_class)
+                self.assertTrue(lcd.write_screen(screen, force=True))
+            self.assertEqual([bytearray(row) for row in screen.bytes], self.device.pages)
+
+    def test_unchanged_rows_not_rewritten(self):
+        lcd = make_lcd(self.bus, SmbusBlockTransport)
+        screen = Screen()
+        screen.write_line(u"Idle", 0, 3, JUSTIFY_CENTER)
+        lcd.write_screen(screen)
+        self.device.redundant_byte_count = 0
+        self.device.data_byte_count = 0
+        screen.write_line(u"1:36 PM", 6, 1, JUSTIFY_CENTER)
+        lcd.write_screen(screen)
+        # Only the changed row is sent
+        self.assertEqual(128, self.device.data_byte_count)
+        self.assertEqual([bytearray(row) for row in screen.bytes], self.device.pages)
+
+    def test_small_panel(self):
+        device = self.bus.attach(0x3D, Ssd1306Device(height=32))
+        lcd = make_lcd(self.bus, SmbusBlockTransport, i2c_hw_addr=0x7A, screen_pixel_height=32)
+        screen = Screen(screen_pixel_height=32)
+        screen.write_line(u"Hi", 0, 4)
+        lcd.write_screen(screen)
+        self.assertEqual([bytearray(row) for row in screen.bytes], device.pages)
+
+    def test_horizontal_addressing(self):
+        # Set horizontal mode, columns 126-127, pages 0-1, then write 4 bytes of data
+        self.bus.write_i2c_block_data(0x3C, 0x00, [0x20, 0x00, 0x21, 126, 127, 0x22, 0, 1])
+        self.bus.write_i2c_block_data(0x3C, 0x40, [1, 2, 3, 4])
+        self.assertEqual(bytearray([1, 2]), self.device.pages[0][126:])
+        self.assertEqual(bytearray([3, 4]), self.device.pages[1][126:])
+
+class TestSimulatedSMBus(unittest.TestCase):
+    def test_timing(self):
+        bus = SimulatedSMBus(clock_hz=100000, transaction_latency=0.001)
+        bus.attach(0x3C, Ssd1306Device())
+        bus.write_i2c_block_data(0x3C, 0x40, [0] * 31)
+        bus.i2c_rdwr(stub_i2c_simulator.i2c_msg.write(0x3C, bytearray(129)))
+        self.assertEqual(2, bus.transaction_count)
+        self.assertEqual(33 + 130, bus.byte_count)
+        self.assertAlmostEqual(0.002 + 163 * 9 / 100000.0, bus.elapsed)
+
+    def test_missing_device(self):
+        bus = SimulatedSMBus()
+        with self.assertRaises(IOError):
+            bus.write_byte(0x27, 0)
+        lcd = make_lcd(bus, SmbusBlockTransport)
+        with patch('builtins.print'):
+            self.assertFalse(lcd.set_power(True))
+        self.assertEqual(1, lcd.statistics.error_count)
+
+    def test_injected_error(self):
+        bus = SimulatedSMBus()
+        bus.attach(0x3C, Ssd1306Device())
+        bus.inject_errors()
+        with self.assertRaises(IOError):
+            bus.write_byte_data(0x3C, 0x00, 0xAF)
+        bus.write_byte_data(0x3C, 0x00, 0xAF)
+        self.assertEqual(1, bus.transaction_count)
+
+if __name__ == '__main__':
+    unittest.main()
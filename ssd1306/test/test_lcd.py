@@ -227,6 +227,79 @@ class TestLcd__write_sequence(LcdTestCase):
         self.assertEqual(0, self.lcd._bus.write_i2c_block_data.call_count)
         self.assertEqual(0, self.lcd._screen.set_bytes.call_count)
 
+class TestLcd_transport(LcdTestCase):
+    def test_default_block_transport(self):
+        # The stubbed smbus module has no i2c_msg, so SMBus block writes must be selected
+        self.assertIsInstance(self.lcd._transport, ssd1306.SmbusBlockTransport)
+        self.assertEqual(32, self.lcd._transport.max_chunk_size)
+
+    def test_rdwr_transport_selected(self):
+        mocked_bus = Mock()
+        mocked_bus.funcs = ssd1306.I2C_FUNC_I2C
+        with patch('ssd1306.smbus.SMBus', return_value=mocked_bus), \
+            patch('ssd1306.i2c_msg', Mock()), \
+            patch('ssd1306.Screen', return_value=Mock())\
+        :
+            lcd = Lcd()
+        self.assertIsInstance(lcd._transport, ssd1306.I2cRdwrTransport)
+
+    def test_rdwr_transport_not_supported_by_adapter(self):
+        mocked_bus = Mock()
+        mocked_bus.funcs = 0
+        with patch('ssd1306.i2c_msg', Mock()):
+            self.assertFalse(ssd1306.I2cRdwrTransport.is_supported(mocked_bus))
+
+    def test_rdwr_page_write(self):
+        self.lcd._bus.i2c_rdwr = MagicMock()
+        self.lcd._screen.set_bytes = MagicMock(return_value=(0, 0))
+        self.lcd._transport = ssd1306.I2cRdwrTransport(self.lcd._bus, self.lcd._hw_write_addr)
+        with patch('ssd1306.i2c_msg') as mocked_i2c_msg:
+            status = self.lcd._write_data_sequence(bytearray(range(256)))
+        self.assertTrue(status)
+        # 2 pages of 128 bytes each should be written with 2 messages
+        self.assertEqual(2, self.lcd._bus.i2c_rdwr.call_count)
+        mocked_i2c_msg.write.assert_has_calls([
+            call(0x3c, bytearray([Lcd.DATA_BYTE]) + bytearray(range(128))),
+            call(0x3c, bytearray([Lcd.DATA_BYTE]) + bytearray(range(128, 256)))
+        ])
+
+class TestLcd_statistics(LcdTestCase):
+    def test_counts(self):
+        self.lcd._bus.write_i2c_block_data = MagicMock()
+        self.lcd._bus.write_byte_data = MagicMock()
+        self.lcd._screen.set_bytes = MagicMock(return_value=(0, 0))
+        self.lcd._write_control_byte(0xAF)
+        self.lcd._write_data_sequence(bytearray(100))
+        stats = self.lcd.statistics.to_dict()
+        self.assertEqual(5, stats[u"transaction_count"])
+        # 2 bytes for the control byte + 100 data bytes with a command byte for each of 4 chunks
+        self.assertEqual(106, stats[u"byte_count"])
+        self.assertEqual(0, stats[u"error_count"])
+        self.assertIsNone(stats[u"last_error"])
+        self.assertEqual(5, sum(stats[u"latency_histogram"].values()))
+
+    def test_errors(self):
+        self.lcd._bus.write_byte_data = MagicMock(side_effect=IOError('remote I/O error'))
+        self.lcd._write_control_byte(0xAF)
+        self.lcd._write_control_byte(0xAE)
+        stats = self.lcd.statistics.to_dict()
+        self.assertEqual(0, stats[u"transaction_count"])
+        self.assertEqual(2, stats[u"error_count"])
+        self.assertIn(u"remote I/O error", stats[u"last_error"][u"message"])
+
+    def test_histogram(self):
+        stats = ssd1306.I2cStatistics()
+        stats.record(3, 0.0001)
+        stats.record(3, 0.003)
+        stats.record(3, 1.0)
+        histogram = stats.to_dict()[u"latency_histogram"]
+        self.assertEqual(1, histogram[u"<=0.25ms"])
+        self.assertEqual(1, histogram[u"<=5ms"])
+        self.assertEqual(1, histogram[u">50ms"])
+        self.assertEqual(1000.0, stats.to_dict()[u"max_latency_ms"])
+        stats.reset()
+        self.assertEqual(0, stats.transaction_count)
+
 class TestLcd_write_initialization_sequence(LcdTestCase):
     def test_nominal(self):
         self.lcd._screen.set_bytes = MagicMock(return_value=(1,2))
@@ -243,6 +316,16 @@ class TestLcd_write_initialization_sequence(LcdTestCase):
         # Powered on
         self.lcd._bus.write_byte_data.assert_called_with(0x3c, Lcd.CONTROL_BYTE, Lcd.LCD_CONTROL_PWR_ON)
 
+    def test_panel_height(self):
+        with patch('ssd1306.smbus.SMBus', return_value=Mock()):
+            lcd = Lcd(screen_pixel_height=32)
+        lcd.clear = MagicMock()
+        lcd.write_initialization_sequence()
+        init_sequence = list(lcd._bus.write_i2c_block_data.call_args_list[0][0][2])
+        # Multiplex ratio and COM pins configuration follow the panel height
+        self.assertEqual(31, init_sequence[init_sequence.index(0xA8) + 1])
+        self.assertEqual(0x02, init_sequence[init_sequence.index(0xDA) + 1])
+
 class TestLcd_set_power(LcdTestCase):
     def test_set_power_on_success(self):
         self.assertFalse(self.lcd._power_state)
@@ -374,6 +457,21 @@ class TestLcd_write_screen(LcdTestCase):
             call(expected_write),
             call(expected_write)
         ])
+    def test_iter_write_screen(self):
+        screen = Screen()
+        screen.write_line(u"row 0", 0)
+        screen.write_line(u"row 3", 3)
+        with patch('ssd1306.smbus.SMBus', return_value=Mock()):
+            lcd = Lcd()
+        writer = lcd.iter_write_screen(screen)
+        # Each changed row is written when the writer is advanced
+        self.assertTrue(next(writer))
+        self.assertEqual(screen.bytes[0], lcd._screen.bytes[0])
+        self.assertNotEqual(screen.bytes[3], lcd._screen.bytes[3])
+        self.assertTrue(next(writer))
+        self.assertEqual(screen.bytes[3], lcd._screen.bytes[3])
+        self.assertEqual([], list(writer))
+
     def test_set_pointer_failed(self):
         mock_screen = Mock()
         mock_screen.row_start = 0
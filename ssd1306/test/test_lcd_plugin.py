@@ -41,6 +41,9 @@ class TestLcdPlugin___init__(LcdPluginTestCase):
         self.assertIn('_custom_display_queue', self.lcd_plugin.__dict__)
         self.assertIn('_custom_screens', self.lcd_plugin.__dict__)
         self.assertIn('_custom_screens_stack', self.lcd_plugin.__dict__)
+        self.assertIn('_panels', self.lcd_plugin.__dict__)
+        self.assertIn('_frame_condition', self.lcd_plugin.__dict__)
+        self.assertIn('_flush_thread', self.lcd_plugin.__dict__)
 
 class TestLcdPlugin__reset_lcd_state(LcdPluginTestCase):
     def test_nominal(self):
@@ -216,6 +219,311 @@ class TestLcdPlugin__wake_display(LcdPluginTestCase):
         self.assertFalse(self.lcd_plugin._idled)
         self.assertIs(None, self.lcd_plugin._last_idle_state)
 
+class TestLcdPlugin__present_screen(unittest.TestCase):
+    def test_drop_unflushed_frame(self):
+        lcd_plugin = LcdPlugin()
+        first = Screen()
+        first.write_line(u"first", 0)
+        second = Screen()
+        second.write_line(u"second", 0)
+        main_panel = lcd_plugin._panels[ssd1306.MAIN_PANEL]
+        lcd_plugin._present_screen(first)
+        self.assertTrue(main_panel.frame_pending)
+        self.assertEqual(0, lcd_plugin._dropped_frame_count)
+        # Flush thread isn't running, so the first frame gets replaced
+        lcd_plugin._present_screen(second)
+        self.assertEqual(1, lcd_plugin._dropped_frame_count)
+        self.assertEqual(second.bytes, main_panel.back_screen.bytes)
+        self.assertIsNot(second, main_panel.back_screen)
+
+    def test_region_overlay(self):
+        lcd_plugin = LcdPlugin()
+        lcd_plugin._region_settings = {u"top": [0, 1, 0, 127]}
+        lcd_plugin._panels = lcd_plugin._create_panels()
+        main_panel = lcd_plugin._panels[ssd1306.MAIN_PANEL]
+        overlay = Screen()
+        overlay.write_line(u"overlay", 0)
+        overlay.write_line(u"hidden", 4)
+        main_panel.overlays = [(u"top", overlay)]
+        screen = Screen()
+        screen.write_line(u"hidden", 0)
+        screen.write_line(u"state", 4)
+        lcd_plugin._present_screen(screen)
+        expected = Screen()
+        expected.write_line(u"overlay", 0)
+        expected.write_line(u"state", 4)
+        self.assertEqual(expected.bytes, main_panel.back_screen.bytes)
+
+    def test_flush_swaps_buffers(self):
+        lcd_plugin = LcdPlugin()
+        lcd_plugin._lcd = Mock()
+        lcd_plugin._lcd.iter_write_screen = MagicMock(return_value=iter([True]))
+        screen = Screen()
+        screen.write_line(u"flush me", 0)
+        main_panel = lcd_plugin._panels[ssd1306.MAIN_PANEL]
+        back_screen = main_panel.back_screen
+        lcd_plugin._flush_thread.start()
+        try:
+            lcd_plugin._present_screen(screen)
+            sleep(0.1)
+        finally:
+            lcd_plugin._running = False
+            lcd_plugin._frame_condition.acquire()
+            lcd_plugin._frame_condition.notify_all()
+            lcd_plugin._frame_condition.release()
+            lcd_plugin._flush_thread.join(1)
+        self.assertFalse(lcd_plugin._flush_thread.is_alive())
+        self.assertFalse(main_panel.frame_pending)
+        self.assertIs(back_screen, main_panel.front_screen)
+        lcd_plugin._lcd.iter_write_screen.assert_called_once_with(back_screen)
+        self.assertEqual(screen.bytes, back_screen.bytes)
+
+class TestLcdPlugin__write_frames(unittest.TestCase):
+    def test_interleave_by_bus(self):
+        writes = []
+        def make_lcd(name, num_rows):
+            lcd = Mock()
+            lcd.iter_write_screen = MagicMock(
+                side_effect=lambda screen: iter(writes.append((name, i)) or True
+                                                for i in range(num_rows)))
+            return lcd
+        panels = [
+            ssd1306.Panel(u"a", i2c_bus_number=1),
+            ssd1306.Panel(u"b", i2c_bus_number=1, screen_pixel_height=32),
+            ssd1306.Panel(u"c", i2c_bus_number=2)
+        ]
+        LcdPlugin._write_frames([
+            (panels[0], make_lcd(u"a", 3)),
+            (panels[1], make_lcd(u"b", 2)),
+            (panels[2], make_lcd(u"c", 1))
+        ])
+        self.assertEqual([(u"a", 0), (u"c", 0), (u"b", 0), (u"a", 1), (u"b", 1), (u"a", 2)],
+                         writes)
+
+    def test_stop_on_failure(self):
+        lcd = Mock()
+        lcd.iter_write_screen = MagicMock(return_value=iter([True, False, True]))
+        remaining = lcd.iter_write_screen.return_value
+        LcdPlugin._write_frames([(ssd1306.Panel(u"a"), lcd)])
+        self.assertEqual([True], list(remaining))
+
+class TestLcdPlugin_display_signal(unittest.TestCase):
+    def test_coalesce_and_priority(self):
+        lcd_plugin = LcdPlugin()
+        lcd_plugin._present_screen = MagicMock()
+        lcd_plugin._wake_display = MagicMock()
+        lcd_plugin.display_signal(activator=u"info", txt=u"1%", delay=None)
+        lcd_plugin.display_signal(activator=u"info", txt=u"2%", delay=None)
+        lcd_plugin.display_signal(activator=u"alarm", txt=u"ALARM", delay=None, priority=10)
+        lcd_plugin.display_signal(activator=u"info", txt=u"3%", delay=None)
+        self.assertEqual(2, len(lcd_plugin._custom_display_queue))
+        delay = lcd_plugin._display_custom()
+        self.assertIsNone(delay)
+        # Alarm is shown over the info screen even though info was processed last
+        lcd_plugin._present_screen.assert_called_once_with(
+            lcd_plugin._custom_screens[u"alarm/default"], ssd1306.MAIN_PANEL)
+        expected = Screen()
+        expected.write_block(u"3%")
+        self.assertEqual(expected.bytes, lcd_plugin._custom_screens[u"info/default"].bytes)
+        # Once the alarm is cancelled, info is shown
+        lcd_plugin.display_signal(activator=u"alarm", cancel=True)
+        lcd_plugin._display_custom()
+        lcd_plugin._present_screen.assert_called_with(
+            lcd_plugin._custom_screens[u"info/default"], ssd1306.MAIN_PANEL)
+
+class TestLcdPlugin__display_custom_panels(unittest.TestCase):
+    def setUp(self):
+        self.lcd_plugin = LcdPlugin()
+        self.lcd_plugin._panel_settings = [{
+            u"name": u"pressure",
+            u"i2c_hw_address": u"7A",
+            u"height": 32,
+            u"regions": {u"bottom": [2, 3, 0, 127]}
+        }]
+        self.lcd_plugin._region_settings = {u"status": [7, 7, 64, 127]}
+        self.lcd_plugin._panels = self.lcd_plugin._create_panels()
+        self.lcd_plugin._present_screen = MagicMock()
+        self.lcd_plugin._wake_display = MagicMock()
+
+    def test_create_panels(self):
+        panel = self.lcd_plugin._panels[u"pressure"]
+        self.assertEqual([ssd1306.MAIN_PANEL, u"pressure"], list(self.lcd_plugin._panels))
+        self.assertEqual(0x7A, panel.i2c_hw_addr)
+        self.assertEqual(1, panel.i2c_bus_number)
+        self.assertEqual(3, panel.blank_screen.row_end)
+        self.assertEqual((2, 3, 0, 127), panel.regions[u"bottom"])
+
+    def test_invalid_panel_skipped(self):
+        self.lcd_plugin._panel_settings.append({u"name": u"bad", u"regions": {u"r": [0, 8, 0, 0]}})
+        with patch('builtins.print'):
+            panels = self.lcd_plugin._create_panels()
+        self.assertEqual([ssd1306.MAIN_PANEL, u"pressure"], list(panels))
+
+    def test_panel_display(self):
+        self.lcd_plugin.display_signal(activator=u"p", panel=u"pressure", txt=u"40 PSI", delay=None)
+        # The main panel has nothing to show, so it drops back to normal display
+        self.assertEqual(0, self.lcd_plugin._display_custom())
+        screen = self.lcd_plugin._custom_screens[u"pressure:p/default"]
+        self.lcd_plugin._present_screen.assert_called_once_with(screen, u"pressure")
+        expected = Screen(screen_pixel_height=32)
+        expected.write_block(u"40 PSI")
+        self.assertEqual(expected.bytes, screen.bytes)
+        # Nothing changed, so nothing is presented again
+        self.lcd_plugin._display_custom()
+        self.assertEqual(1, self.lcd_plugin._present_screen.call_count)
+        # Once cancelled, the panel is blanked
+        self.lcd_plugin.display_signal(activator=u"p", panel=u"pressure", cancel=True)
+        self.lcd_plugin._display_custom()
+        self.lcd_plugin._present_screen.assert_called_with(
+            self.lcd_plugin._panels[u"pressure"].blank_screen, u"pressure")
+
+    def test_region_display(self):
+        self.lcd_plugin._state_screen_presented = True
+        self.lcd_plugin.display_signal(activator=u"s", region=u"status", txt=u"OK", delay=None)
+        self.assertEqual(0, self.lcd_plugin._display_custom())
+        # The state screen is presented again with the region drawn over it
+        self.assertFalse(self.lcd_plugin._state_screen_presented)
+        self.assertEqual(0, self.lcd_plugin._present_screen.call_count)
+        main_panel = self.lcd_plugin._panels[ssd1306.MAIN_PANEL]
+        screen = self.lcd_plugin._custom_screens[u"s/default"]
+        self.assertEqual([(u"status", screen)], main_panel.overlays)
+        expected = Screen()
+        expected.write_block(u"OK", row_start=7, col_start=64)
+        self.assertEqual(expected.bytes, screen.bytes)
+
+    def test_unknown_region(self):
+        self.lcd_plugin.display_signal(activator=u"s", region=u"nope", txt=u"OK")
+        with patch('builtins.print'):
+            self.lcd_plugin._display_custom()
+        self.assertEqual(0, len(self.lcd_plugin._custom_screens_stack))
+
+class TestLcdPlugin__display_custom(unittest.TestCase):
+    def test_deadline_expiry(self):
+        lcd_plugin = LcdPlugin()
+        lcd_plugin._present_screen = MagicMock()
+        lcd_plugin._wake_display = MagicMock()
+        with patch('ssd1306.monotonic', return_value=100.0) as mocked_monotonic:
+            lcd_plugin.display_signal(activator=u"a", txt=u"a", delay=5)
+            lcd_plugin.display_signal(activator=u"b", txt=u"b", delay=2)
+            lcd_plugin.display_signal(activator=u"c", txt=u"c", delay=None)
+            # Wait until the next screen expires
+            self.assertEqual(2.0, lcd_plugin._display_custom())
+            mocked_monotonic.return_value = 101.5
+            self.assertEqual(0.5, lcd_plugin._display_custom())
+            mocked_monotonic.return_value = 102.0
+            self.assertEqual(3.0, lcd_plugin._display_custom())
+            self.assertEqual([u"a/default", u"c/default"], list(lcd_plugin._custom_screens_stack))
+            # Re-displaying "a" resets its deadline; the old deadline is ignored
+            lcd_plugin.display_signal(activator=u"a", txt=u"a", delay=10)
+            self.assertEqual(10.0, lcd_plugin._display_custom())
+            mocked_monotonic.return_value = 105.0
+            self.assertEqual(7.0, lcd_plugin._display_custom())
+            self.assertIn(u"a/default", lcd_plugin._custom_screens_stack)
+            mocked_monotonic.return_value = 112.0
+            # Only "c" is left which never expires
+            self.assertIsNone(lcd_plugin._display_custom())
+            self.assertEqual([u"c/default"], list(lcd_plugin._custom_screens_stack))
+            lcd_plugin.display_signal(activator=u"c", cancel=True)
+            self.assertEqual(0, lcd_plugin._display_custom())
+
+    def test_cancelled_screen_expiry_ignored(self):
+        lcd_plugin = LcdPlugin()
+        lcd_plugin._present_screen = MagicMock()
+        lcd_plugin._wake_display = MagicMock()
+        with patch('ssd1306.monotonic', return_value=100.0):
+            lcd_plugin.display_signal(activator=u"a", txt=u"a", delay=None)
+            lcd_plugin.display_signal(activator=u"b", txt=u"b", delay=2)
+            self.assertEqual(2.0, lcd_plugin._display_custom())
+            # The cancelled screen's deadline no longer causes a wake up
+            lcd_plugin.display_signal(activator=u"b", cancel=True)
+            self.assertIsNone(lcd_plugin._display_custom())
+            self.assertEqual([], lcd_plugin._custom_screens_expiry)
+
+class TestLcdPlugin_get_statistics(unittest.TestCase):
+    def test_nominal(self):
+        lcd_plugin = LcdPlugin()
+        lcd_plugin._lcd = Mock()
+        lcd_plugin._lcd.statistics.to_dict = MagicMock(return_value={u"transaction_count": 3})
+        lcd_plugin._dropped_frame_count = 7
+        stats = lcd_plugin.get_statistics()
+        self.assertEqual({u"transaction_count": 3}, stats[u"i2c"])
+        self.assertEqual({}, stats[u"panels"])
+        self.assertEqual(7, stats[u"dropped_frame_count"])
+        self.assertEqual(0, stats[u"coalesced_display_count"])
+
+    def test_page(self):
+        with patch('ssd1306.lcd_plugin.get_statistics', return_value={u"i2c": None}):
+            self.assertEqual(u'{"i2c": null}', ssd1306.statistics().GET())
+
+class TestLcdPlugin__render_state_screen(unittest.TestCase):
+    def setUp(self):
+        self.lcd_plugin = LcdPlugin()
+        self.lcd_plugin._present_screen = MagicMock()
+
+    def test_unchanged_state_not_rendered(self):
+        ops = [
+            (u"line", u"Idle", 0, 3, ssd1306.JUSTIFY_CENTER),
+            (u"line", u"", 3, 3, ssd1306.JUSTIFY_LEFT),
+            (u"line", u"1:36 PM", 6, 2, ssd1306.JUSTIFY_CENTER)
+        ]
+        self.lcd_plugin._render_state_screen(ops)
+        self.assertEqual(1, self.lcd_plugin._present_screen.call_count)
+        with patch.object(self.lcd_plugin._state_screen, 'write_line') as mocked_write_line:
+            self.lcd_plugin._render_state_screen(list(ops))
+        self.assertEqual(0, mocked_write_line.call_count)
+        self.assertEqual(1, self.lcd_plugin._present_screen.call_count)
+
+    def test_only_changed_lines_rendered(self):
+        ops = [
+            (u"block", u"1 2", 0, 1, 5, ssd1306.JUSTIFY_CENTER),
+            (u"line", u" ", 5, 1, ssd1306.JUSTIFY_CENTER),
+            (u"line", u"03:59", 6, 2, ssd1306.JUSTIFY_CENTER)
+        ]
+        self.lcd_plugin._render_state_screen(ops)
+        ops[2] = (u"line", u"03:58", 6, 2, ssd1306.JUSTIFY_CENTER)
+        with patch.object(self.lcd_plugin._state_screen, 'write_line') as mocked_write_line,\
+            patch.object(self.lcd_plugin._state_screen, 'write_block') as mocked_write_block\
+        :
+            self.lcd_plugin._render_state_screen(ops)
+        mocked_write_line.assert_called_once_with(u"03:58", 6, 2, ssd1306.JUSTIFY_CENTER)
+        self.assertEqual(0, mocked_write_block.call_count)
+        self.assertEqual(2, self.lcd_plugin._present_screen.call_count)
+
+    def test_presented_after_custom_screen(self):
+        ops = [(u"line", u"OFF", 0, 8, ssd1306.JUSTIFY_CENTER)]
+        self.lcd_plugin._render_state_screen(ops)
+        self.lcd_plugin._state_screen_presented = False
+        self.lcd_plugin._render_state_screen(ops)
+        self.assertEqual(2, self.lcd_plugin._present_screen.call_count)
+        self.lcd_plugin._present_screen.assert_called_with(self.lcd_plugin._state_screen)
+
+class TestStationStateView(unittest.TestCase):
+    def test_cached_until_invalidated(self):
+        view = ssd1306.StationStateView()
+        ps = [[0, 0], [3, 120], [3, 60], [0, 0]]
+        srvals = [0, 1, 1, 0]
+        with patch('ssd1306.gv.ps', ps),\
+            patch('ssd1306.gv.srvals', srvals, create=True),\
+            patch.dict('ssd1306.gv.sd', {u"mas": None})\
+        :
+            self.assertEqual((True, 120, [2, 3]), view.get_running_stations())
+            # Durations are always read live
+            ps[1][1] = 119
+            self.assertEqual((True, 119, [2, 3]), view.get_running_stations())
+            # Station changes are only picked up after a signal
+            srvals[1] = 0
+            self.assertEqual((True, 119, [2, 3]), view.get_running_stations())
+            view.invalidate(u"zone_change")
+            self.assertEqual((True, 60, [3]), view.get_running_stations())
+
+    def test_master_excluded(self):
+        view = ssd1306.StationStateView()
+        with patch('ssd1306.gv.ps', [[1, 30], [1, 40]]),\
+            patch('ssd1306.gv.srvals', [1, 1], create=True),\
+            patch.dict('ssd1306.gv.sd', {u"mas": 1})\
+        :
+            self.assertEqual((True, 40, [2]), view.get_running_stations())
+
 # To test the rest of the plugin, test it as a component
 class TestLcdPluginComponent(unittest.TestCase, Ssd1306CustomAssertions):
     @classmethod
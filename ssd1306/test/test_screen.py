@@ -60,6 +60,22 @@ class TestScreen_copy(unittest.TestCase):
         for from_row, to_row in zip(s._screen_bytes, new_s._screen_bytes):
             self.assertIsNot(from_row, to_row)
 
+class TestScreen_copy_from(unittest.TestCase):
+    def test_copy_from(self):
+        s = Screen(screen_pixel_width=20, screen_pixel_height=16)
+        s.write_line(u"abc", 0)
+        target = Screen(screen_pixel_width=20, screen_pixel_height=16)
+        rows = target.bytes
+        target.copy_from(s)
+        self.assertEqual(s.bytes, target.bytes)
+        # Copy is done in place
+        self.assertIs(rows, target.bytes)
+
+    def test_size_mismatch(self):
+        s = Screen(screen_pixel_width=20, screen_pixel_height=16)
+        with self.assertRaises(ValueError):
+            Screen().copy_from(s)
+
 class TestScreen_properties(unittest.TestCase):
     def test_getters(self):
         s = Screen(screen_pixel_width=128,
@@ -70,6 +86,28 @@ class TestScreen_properties(unittest.TestCase):
         self.assertEqual(127, s.col_end)
         self.assertIs(s.bytes, s._screen_bytes)
 
+class TestScreen_buffer(unittest.TestCase):
+    def test_rows_are_views(self):
+        s = Screen(screen_pixel_width=10,
+                   screen_pixel_height=24)
+        s._screen_bytes[1][3] = 0xAB
+        s._screen_bytes[2][9] = 0xCD
+        self.assertEqual(30, len(s.buffer))
+        self.assertEqual(0xAB, s.buffer[13])
+        self.assertEqual(0xCD, s.buffer[29])
+        s.buffer[0] = 0x12
+        self.assertEqual(0x12, s._screen_bytes[0][0])
+
+    def test_clear_keeps_views(self):
+        s = Screen(screen_pixel_width=10,
+                   screen_pixel_height=16)
+        row = s.bytes[1]
+        row[4] = 0xFF
+        s.clear()
+        self.assertEqual(bytearray(10), row)
+        s.buffer[14] = 0x01
+        self.assertEqual(0x01, row[4])
+
 class TestScreen_set_bytes(unittest.TestCase):
     def test_set_bytes_overflow(self):
         s = Screen(screen_pixel_width=14,